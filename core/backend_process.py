@@ -0,0 +1,114 @@
+"""
+Runs an `OpenInterpreter` in a child process for the GUI (`python main.py --backend-process`).
+
+In the GUI process, user code run in-process and litellm's JSON work hold the GIL and stall the Qt event
+loop. `serve` is the child's entry point. It connects back to the parent over a local socket
+(`multiprocessing.connection`, authenticated with a one-off key) and serves requests. Each message is
+one pickled dict:
+
+    parent -> child: {"op": "chat", "message": ...}, {"op": "stop"}, {"op": "close"}
+                     {"op": "get" | "set" | "call", "id": ..., "path": "llm.apply_config", ...}
+    child -> parent: {"chunk": ...} for every LMC chunk of a turn, then {"done": True} or {"error": ...}
+                     {"reply": id, "value": ...} or {"reply": id, "error": ...}
+                     {"event": "ready" | "failed" | "file_operations" | "token_turn", ...}
+
+Turns run on a thread, so a `stop` is handled while one streams. This module only imports `core.core`
+inside `serve`, so the parent can import it without loading the interpreter.
+"""
+import pickle
+import threading
+import traceback
+from multiprocessing.connection import Client
+
+
+def _resolve(root, path):
+    obj = root
+    for name in path.split(".")[:-1]:
+        obj = getattr(obj, name)
+    return obj, path.split(".")[-1]
+
+
+def serve(address, authkey):
+    connection = Client(address, authkey=authkey)
+    send_lock = threading.Lock()
+
+    def send(message):
+        with send_lock:
+            connection.send(message)
+
+    try:
+        from PyQt6.QtCore import Qt
+        from .core import OpenInterpreter
+        interpreter = OpenInterpreter()
+    except Exception as e:
+        send({"event": "failed", "error": str(e)})
+        connection.close()
+        return
+
+    # There's no event loop in this process. Without a direct connection, a signal emitted on another
+    # thread (the turn's, or the tracker's flush timer) would be queued to this thread and never delivered
+    interpreter.file_tracker.file_operations.connect(
+        lambda batch: send({"event": "file_operations", "batch": batch}),
+        Qt.ConnectionType.DirectConnection,
+    )
+    interpreter.llm.accountant.subscribe(lambda turn: send({"event": "token_turn", "turn": turn}))
+    send({"event": "ready"})
+    threading.Thread(target=interpreter.collect_blobs, daemon=True).start()
+
+    # Set while a turn runs. Cleared before "done" (or the error) is sent, so a turn the parent starts
+    # right after it isn't refused while the finished thread is still exiting
+    turn_running = threading.Event()
+
+    def chat(message):
+        try:
+            for chunk in interpreter.chat(message, display=True, stream=True):
+                send({"chunk": chunk})
+            turn_running.clear()
+            send({"done": True})
+        except Exception as e:
+            print(f"Backend process: Error occurred: {str(e)}")  # Debug print
+            turn_running.clear()
+            send({"error": str(e)})
+
+    chat_thread = None
+    while True:
+        try:
+            request = connection.recv()
+        except (EOFError, OSError):
+            break
+
+        op = request["op"]
+        if op == "chat":
+            if turn_running.is_set():
+                send({"error": "A turn is already running."})
+                continue
+            if chat_thread is not None:
+                chat_thread.join()  # Already sent "done", it's only exiting
+            turn_running.set()
+            chat_thread = threading.Thread(target=chat, args=(request["message"],), daemon=True)
+            chat_thread.start()
+        elif op == "stop":
+            interpreter.stop()
+        elif op == "close":
+            break
+        elif op in ("get", "set", "call"):
+            try:
+                obj, name = _resolve(interpreter, request["path"])
+                if op == "get":
+                    value = getattr(obj, name)
+                elif op == "set":
+                    setattr(obj, name, request["value"])
+                    value = None
+                else:
+                    value = getattr(obj, name)(*request.get("args", ()), **request.get("kwargs", {}))
+                try:
+                    pickle.dumps(value)
+                except Exception:
+                    value = None  # E.g. a thread started by the call, the caller doesn't need it
+                send({"reply": request["id"], "value": value})
+            except Exception:
+                send({"reply": request["id"], "error": traceback.format_exc()})
+
+    interpreter.stop()
+    interpreter.computer.terminate()
+    connection.close()
@@ -0,0 +1,484 @@
+"""
+Drives `OpenInterpreter.chat` end to end against `StubCompletions`, so turn latency, per-chunk
+overhead and memory per turn can be measured offline and compared between changes.
+
+    python -m core.benchmark --turns 50 --tokens-per-second 200 --response-tokens 300
+    python -m core.benchmark --recording streams.jsonl
+    python -m core.benchmark --parse-arguments 50
+    python -m core.benchmark --code-fences 10
+    python -m core.benchmark --blobs 500
+    python -m core.benchmark --frames 200
+    python -m core.benchmark --tables 1000000
+    python -m core.benchmark --compaction 500
+    python -m core.benchmark --conversion 200
+    python -m core.benchmark --stress-scheduler 300
+    python -m core.benchmark --cancel 20
+    python -m core.benchmark --frame-latency 5
+    python -m core.benchmark --file-references 10000
+    python -m core.benchmark --run-many 8
+    python -m core.benchmark --warmup 10
+
+`--parse-arguments KB` instead measures parsing streamed function call arguments (`ArgumentsParser`)
+against re-parsing everything received so far on each delta. `--code-fences MB` fuzzes `CodeFenceParser`
+against a line-by-line parse of the whole text, then measures its throughput. `--blobs N` compares a
+conversation with N screenshots kept inline against one with them in a `BlobStore`. `--frames N` runs
+`FrameFilter` over a synthetic OS-mode session of N screenshots, checks its decisions against the pixels,
+and reports how much of the screen is still sent. `--tables ROWS` compares the text repr of a ROWS-row
+table with its compact preview (needs pyarrow, and pandas for the DataFrame repr). `--compaction TURNS`
+reports the prompt tokens per turn of a TURNS-turn loop with the history trimmed and with it summarized.
+`--conversion TURNS` times `ConversionCache` against converting the whole history every turn, and checks
+that both give the same messages. `--stress-scheduler N` hammers the GUI's `TurnScheduler` with N sends
+and uploads (needs PyQt6) and checks the order of turns, coalescing, backpressure and the history.
+`--cancel N` stops N streaming turns midway and checks that each returns to idle, with a partial message.
+`--frame-latency SECONDS` measures how late the GUI's `FrameMonitor` ticks while CPU-bound code runs on a
+thread of the GUI process (the in-process backend) and in a child process (`--backend-process`). Needs PyQt6.
+`--file-references N` checks the GUI's `FileReferenceMatcher` with N uploaded names against a regex, and
+times it against replacing each name in turn. `--run-many N` times N simulated code blocks run one after
+another and with `ExecutionScheduler`, and how long a cancelled `run_many` takes to let go of them.
+`--warmup N` simulates N code blocks whose kernels start while the rest of the block streams
+(`KernelWarmer`), against starting them when the block runs, and checks that warming is a no-op with a
+terminal it can't use.
+
+Only the chat, `--compaction`, `--stress-scheduler` and `--cancel` modes build an `OpenInterpreter` and
+import it. The other checks are in `core.benchmarks` and import only the modules they measure.
+"""
+import argparse
+import gc
+import random
+import statistics
+import threading
+import time
+import tracemalloc
+
+
+def make_interpreter(completions):
+    from .core import OpenInterpreter
+
+    interpreter = OpenInterpreter(
+        auto_run=True,
+        offline=True,
+        disable_telemetry=True,
+        conversation_history=False,
+    )
+    interpreter.llm.model = "stub"
+    interpreter.llm.completions = completions
+    interpreter.llm.supports_functions = False
+    interpreter.llm.supports_vision = False
+    return interpreter
+
+
+def run_chat_benchmark(interpreter, prompts, turns):
+    """
+    Sends `turns` messages (cycling through `prompts`) and returns per-turn measurements.
+    """
+    completions = interpreter.llm.completions
+    results = []
+
+    tracemalloc.start()
+    try:
+        for turn in range(turns):
+            gc.collect()
+            memory_before = tracemalloc.get_traced_memory()[0]
+            backend_before = getattr(completions, "time_in_backend", 0.0)
+
+            chunks = 0
+            first_chunk = None
+            started = time.perf_counter()
+            for _ in interpreter.chat(prompts[turn % len(prompts)], display=True, stream=True):
+                if first_chunk is None:
+                    first_chunk = time.perf_counter() - started
+                chunks += 1
+            latency = time.perf_counter() - started
+            interpreter.responding = False
+
+            backend = getattr(completions, "time_in_backend", 0.0) - backend_before
+            results.append(
+                {
+                    "latency": latency,
+                    "first_chunk": first_chunk or 0.0,
+                    "chunks": chunks,
+                    # Time spent between the backend and the caller, per chunk
+                    "chunk_overhead": (latency - backend) / chunks if chunks else 0.0,
+                    "memory": tracemalloc.get_traced_memory()[0] - memory_before,
+                }
+            )
+    finally:
+        tracemalloc.stop()
+
+    return results
+
+
+def summarize(results):
+    def ms(values):
+        values = sorted(values)
+        p95 = values[min(len(values) - 1, int(len(values) * 0.95))]
+        return f"mean {statistics.mean(values) * 1000:.2f}ms  p50 {statistics.median(values) * 1000:.2f}ms  p95 {p95 * 1000:.2f}ms"
+
+    return "\n".join(
+        [
+            f"turns:          {len(results)}",
+            f"turn latency:   {ms([r['latency'] for r in results])}",
+            f"first chunk:    {ms([r['first_chunk'] for r in results])}",
+            f"chunk overhead: {statistics.mean(r['chunk_overhead'] for r in results) * 1e6:.1f}us per chunk",
+            f"memory/turn:    {statistics.mean(r['memory'] for r in results) / 1024:.1f}KiB",
+        ]
+    )
+
+
+def run_compaction_benchmark(turns=500, context_window=8000, max_tokens=1000, response_tokens=150):
+    """
+    Runs `turns` turns against StubCompletions with a small context window, once with the history only
+    trimmed and once summarized by `ContextCompactor`, and returns the prompt tokens of every turn.
+    """
+    from .llm.stub_completions import StubCompletions
+
+    results = {}
+    for compact in (False, True):
+        completions = StubCompletions(responses=["word " * response_tokens])
+        interpreter = make_interpreter(completions)
+        interpreter.llm.context_window = context_window
+        interpreter.llm.max_tokens = max_tokens
+        interpreter.llm.compact_context = compact
+        for turn in range(turns):
+            for _ in interpreter.chat(f"Step {turn}: continue the task, keep track of the files.", display=True, stream=True):
+                pass
+            interpreter.responding = False
+            interpreter.llm.compactor.wait()  # So each run compacts at the same turns
+
+        accountant = interpreter.llm.accountant
+        results["summarized" if compact else "trimmed"] = {
+            "prompt_tokens": [turn["prompt_tokens"] for turn in accountant.turns if "kind" not in turn],
+            "summaries": [turn for turn in accountant.turns if turn.get("kind") == "summary"],
+        }
+    return results
+
+
+def summarize_compaction(results):
+    lines = []
+    for name, r in results.items():
+        tokens = r["prompt_tokens"]
+        checkpoints = "  ".join(
+            f"#{i + 1}: {tokens[i]}" for i in sorted({0, 49, 99, 199, 299, 399, len(tokens) - 1}) if i < len(tokens)
+        )
+        lines.append(f"{name:>10}: prompt tokens per turn  mean {statistics.mean(tokens):.0f}  max {max(tokens)}  {checkpoints}")
+        if r["summaries"]:
+            summary_tokens = sum(turn["prompt_tokens"] + turn["completion_tokens"] for turn in r["summaries"])
+            lines.append(f"{'':>10}  {len(r['summaries'])} summaries, {summary_tokens} tokens (charged to the accountant)")
+    return "\n".join(lines)
+
+
+def run_scheduler_stress(submits=300, max_pending=5, seed=0):
+    """
+    Submits `submits` messages and uploads to a `TurnScheduler` at random short intervals, with turns
+    streamed by StubCompletions, and raises AssertionError if:
+    - turns don't run in submission order, with the coalesced messages merged into them,
+    - two turns ever run at once,
+    - backpressure isn't signalled when sends are refused, or isn't released afterwards,
+    - the history interleaves turns, or an upload's note isn't right before its turn,
+    - `cancel(wait=True)` returns while a turn still holds the interpreter.
+    """
+    from PyQt6.QtCore import QCoreApplication, QEventLoop, QTimer
+    from gui.turn_scheduler import TurnScheduler
+    from .llm.stub_completions import StubCompletions
+
+    app = QCoreApplication.instance() or QCoreApplication([])
+    rng = random.Random(seed)
+    interpreter = make_interpreter(StubCompletions(responses=["word " * 40], tokens_per_second=4000, chunk_size=4))
+
+    # What each turn was started with, and how many run at once
+    started = []
+    running = {"now": 0, "peak": 0}
+    lock = threading.Lock()
+    chat = interpreter.chat
+
+    def counting_chat(message=None, **kwargs):
+        with lock:
+            running["now"] += 1
+            running["peak"] = max(running["peak"], running["now"])
+        started.append(message)
+        try:
+            yield from chat(message, **kwargs)
+        finally:
+            with lock:
+                running["now"] -= 1
+
+    interpreter.chat = counting_chat
+
+    scheduler = TurnScheduler(interpreter, max_pending=max_pending, coalesce_seconds=0.05)
+    backpressure = []
+    scheduler.backpressure.connect(backpressure.append)
+    expected = []  # [message, upload note or None] for each turn, in submission order
+    counts = {"coalesced": 0, "refused": 0, "uploads": 0}
+
+    def submit(i):
+        if rng.random() < 0.3:
+            message = f"Analyze this file: file{i}.csv"
+            note = {"role": "assistant", "type": "message", "content": f"A file named 'file{i}.csv' has been uploaded."}
+            if scheduler.submit(message, context=[note], coalesce=False):
+                expected.append([message, note])
+                counts["uploads"] += 1
+            else:
+                counts["refused"] += 1
+            return
+        message = f"Message {i}"
+        queued = len(scheduler.pending)
+        if not scheduler.submit(message):
+            counts["refused"] += 1
+        elif queued and len(scheduler.pending) == queued:
+            expected[-1][0] += "\n\n" + message  # Merged into the last queued turn
+            counts["coalesced"] += 1
+        else:
+            expected.append([message, None])
+
+    delay = 0.0
+    for i in range(submits):
+        delay += rng.expovariate(1 / 0.004)
+        QTimer.singleShot(int(delay * 1000), lambda i=i: submit(i))
+
+    loop = QEventLoop()
+    deadline = time.monotonic() + delay + 120
+
+    def check_done():
+        idle = not scheduler.busy and not scheduler.pending and len(started) == len(expected)
+        if idle or time.monotonic() > deadline:
+            loop.quit()
+
+    poll = QTimer()
+    poll.timeout.connect(check_done)
+    QTimer.singleShot(int(delay * 1000) + 50, lambda: poll.start(10))
+    loop.exec()
+    poll.stop()
+
+    if started != [message for message, _ in expected]:
+        raise AssertionError(f"Turns ran as {started[:5]}..., expected {[m for m, _ in expected][:5]}...")
+    if running["peak"] != 1:
+        raise AssertionError(f"{running['peak']} turns ran at once")
+    if counts["refused"] and (True not in backpressure or backpressure[-1] is not False):
+        raise AssertionError(f"Sends were refused, but backpressure went {backpressure}")
+    if any(a == b for a, b in zip(backpressure, backpressure[1:])):
+        raise AssertionError(f"Backpressure was signalled twice in a row: {backpressure}")
+
+    history = interpreter.messages
+    user_indexes = [i for i, m in enumerate(history) if m.get("role") == "user" and m.get("type") == "message"]
+    if [history[i]["content"] for i in user_indexes] != started:
+        raise AssertionError("The history's user messages don't match the turns")
+    for (message, note), index in zip(expected, user_indexes):
+        if note is not None and history[index - 1] != note:
+            raise AssertionError(f"The upload note for {message!r} isn't right before it")
+    for index, next_index in zip(user_indexes, user_indexes[1:] + [len(history)]):
+        roles = {m.get("role") for m in history[index + 1:next_index]}
+        if "assistant" not in roles:
+            raise AssertionError(f"Turn {history[index]['content']!r} has no response before the next turn")
+
+    # Cancelling with a turn running and more queued
+    for i in range(3):
+        scheduler.submit(f"To be cancelled {i}", coalesce=False)
+    QTimer.singleShot(20, loop.quit)
+    loop.exec()
+    cancelled_while = scheduler.busy
+    if not scheduler.cancel(wait=True):
+        raise AssertionError("cancel(wait=True) returned while the turn was still running")
+    if running["now"] != 0 or scheduler.pending:
+        raise AssertionError("A turn was still running or queued after cancel(wait=True)")
+    app.processEvents()
+
+    return {
+        "submits": submits,
+        "turns": len(started),
+        "peak_running": running["peak"],
+        "cancelled_running_turn": cancelled_while,
+        **counts,
+        "backpressure_signals": len(backpressure),
+    }
+
+
+def _stream_turn(interpreter, message, chunks, finished):
+    try:
+        for chunk in interpreter.chat(message, display=True, stream=True):
+            chunks.append(chunk)
+    finally:
+        interpreter.responding = False
+        finished.set()
+
+
+def run_cancel_check(turns=20, response_tokens=2000, tokens_per_second=400, timeout=2.0):
+    """
+    Stops `turns` turns streamed by StubCompletions after their first few chunks, and raises AssertionError
+    unless each one returns within `timeout` with its partial message ended and stored, the next turn
+    isn't cancelled by the last one's stop, and a stop that arrives before `chat` (after `reset_stop`,
+    when the turn was accepted) still cancels the turn without sending its request. Returns how long the
+    stops took.
+    """
+    from .llm.stub_completions import StubCompletions
+
+    response = "word " * response_tokens
+    interpreter = make_interpreter(StubCompletions(responses=[response], tokens_per_second=tokens_per_second))
+    stop_times = []
+
+    for turn in range(turns):
+        chunks, finished = [], threading.Event()
+        thread = threading.Thread(target=_stream_turn, args=(interpreter, f"Turn {turn}", chunks, finished), daemon=True)
+        interpreter.reset_stop()
+        thread.start()
+        deadline = time.monotonic() + 5
+        while sum(1 for chunk in list(chunks) if chunk.get("role") == "assistant") < 5:
+            if finished.is_set() or time.monotonic() > deadline:
+                raise AssertionError(f"Turn {turn} didn't stream, was it cancelled by the previous stop?")
+            time.sleep(0.005)
+
+        started = time.perf_counter()
+        interpreter.stop()
+        if not finished.wait(timeout):
+            raise AssertionError(f"Turn {turn} didn't return within {timeout}s of the stop")
+        stop_times.append(time.perf_counter() - started)
+        thread.join()
+
+        last = interpreter.messages[-1]
+        if last.get("role") != "assistant" or not last["content"] or len(last["content"]) >= len(response.strip()):
+            raise AssertionError(f"Turn {turn} didn't store a partial response: {last}")
+        if not chunks[-1].get("end"):
+            raise AssertionError(f"Turn {turn} didn't end its partial message: {chunks[-1]}")
+
+    # The race: the turn is accepted, then stopped before its thread gets to `chat`
+    interpreter.reset_stop()
+    interpreter.stop()
+    chunks, finished = [], threading.Event()
+    calls = interpreter.llm._completions.calls
+    _stream_turn(interpreter, "Stopped before it started", chunks, finished)
+    if any(chunk.get("role") == "assistant" and chunk.get("content") for chunk in chunks):
+        raise AssertionError("A stop that arrived before chat didn't cancel the turn")
+    if interpreter.llm._completions.calls != calls:
+        raise AssertionError("A stop that arrived before chat still sent the request")
+    if interpreter.stop_event.is_set():
+        raise AssertionError("The stop outlived the turn it cancelled")
+
+    return {"turns": turns, "stop_times": stop_times}
+
+
+def summarize_cancel(results):
+    stop_times = sorted(results["stop_times"])
+    return "\n".join(
+        [
+            f"turns stopped:  {results['turns']}, all returned to idle with a partial message",
+            f"stop to idle:   mean {statistics.mean(stop_times) * 1000:.1f}ms  max {stop_times[-1] * 1000:.1f}ms",
+            "stop before chat: cancelled the accepted turn",
+        ]
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--recording", help="JSONL written by RecordingCompletions")
+    parser.add_argument("--tokens-per-second", type=float, default=None)
+    parser.add_argument("--chunk-size", type=int, default=1, help="Tokens per chunk")
+    parser.add_argument("--response-tokens", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.0, help="Time to first token, in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--parse-arguments", type=int, metavar="KB", help="Benchmark streamed function call arguments instead")
+    parser.add_argument("--code-fences", type=int, metavar="MB", help="Fuzz and benchmark code fence detection instead")
+    parser.add_argument("--blobs", type=int, metavar="N", help="Compare N screenshots inline and in a blob store instead")
+    parser.add_argument("--frames", type=int, metavar="N", help="Run the screenshot filter over N synthetic frames instead")
+    parser.add_argument("--tables", type=int, metavar="ROWS", help="Compare a ROWS-row table's repr with its preview instead")
+    parser.add_argument("--compaction", type=int, metavar="TURNS", help="Compare prompt tokens per turn with and without compaction instead")
+    parser.add_argument("--conversion", type=int, metavar="TURNS", help="Time cached message conversion per turn instead")
+    parser.add_argument("--stress-scheduler", type=int, metavar="N", help="Hammer the GUI's TurnScheduler with N sends and uploads instead")
+    parser.add_argument("--cancel", type=int, metavar="N", help="Stop N streaming turns midway and check they return to idle instead")
+    parser.add_argument("--frame-latency", type=float, metavar="SECONDS", help="Measure GUI frame latency while CPU-bound code runs instead")
+    parser.add_argument("--file-references", type=int, metavar="N", help="Check and time file name substitution with N uploads instead")
+    parser.add_argument("--run-many", type=int, metavar="N", help="Time N simulated code blocks run concurrently, and their cancellation, instead")
+    parser.add_argument("--warmup", type=int, metavar="N", help="Simulate N code blocks with and without kernel warm-up instead")
+    args = parser.parse_args()
+
+    if args.warmup:
+        from .benchmarks.execution import run_warmup_benchmark, summarize_warmup
+
+        print(summarize_warmup(run_warmup_benchmark(args.warmup)))
+        return
+
+    if args.run_many:
+        from .benchmarks.execution import run_many_benchmark, summarize_run_many
+
+        print(summarize_run_many(run_many_benchmark(args.run_many)))
+        return
+
+    if args.file_references:
+        from .benchmarks.gui import run_file_reference_benchmark, summarize_file_references
+
+        print(summarize_file_references(run_file_reference_benchmark(args.file_references)))
+        return
+
+    if args.frame_latency:
+        from .benchmarks.gui import run_frame_latency, summarize_frame_latency
+
+        print(summarize_frame_latency(run_frame_latency(args.frame_latency)))
+        return
+
+    if args.cancel:
+        print(summarize_cancel(run_cancel_check(args.cancel)))
+        return
+
+    if args.stress_scheduler:
+        print(run_scheduler_stress(args.stress_scheduler))
+        return
+
+    if args.conversion:
+        from .benchmarks.messages import run_conversion_benchmark, summarize_conversion
+
+        print(summarize_conversion(run_conversion_benchmark(args.conversion)))
+        return
+
+    if args.compaction:
+        print(summarize_compaction(run_compaction_benchmark(args.compaction)))
+        return
+
+    if args.tables:
+        from .benchmarks.media import run_tables_benchmark, summarize_tables
+
+        print(summarize_tables(run_tables_benchmark(args.tables)))
+        return
+
+    if args.frames:
+        from .benchmarks.media import run_frames_benchmark, summarize_frames
+
+        results = [{**run_frames_benchmark(args.frames, crop=crop), "crop": crop} for crop in (False, True)]
+        print(summarize_frames(results))
+        return
+
+    if args.blobs:
+        from .benchmarks.media import run_blob_benchmark, summarize_blobs
+
+        print(summarize_blobs(run_blob_benchmark(args.blobs), args.blobs))
+        return
+
+    if args.code_fences:
+        from .benchmarks.streaming import fuzz_code_fences, run_code_fences_benchmark
+
+        print(f"fuzz: {fuzz_code_fences()} cases ok")
+        for r in run_code_fences_benchmark(args.code_fences):
+            print(f"{r['chunk_size']:>3} char chunks: {r['megabytes'] / r['seconds']:.1f}MB/s")
+        return
+
+    if args.parse_arguments:
+        from .benchmarks.streaming import run_arguments_benchmark, summarize_arguments
+
+        print(summarize_arguments(run_arguments_benchmark(args.parse_arguments), args.parse_arguments))
+        return
+
+    from .llm.stub_completions import StubCompletions
+
+    completions = StubCompletions(
+        responses=None if args.recording else ["word " * int(args.response_tokens * 0.8)],
+        recording=args.recording,
+        tokens_per_second=args.tokens_per_second,
+        chunk_size=args.chunk_size,
+        latency=args.latency,
+        seed=args.seed,
+    )
+    interpreter = make_interpreter(completions)
+    results = run_chat_benchmark(interpreter, ["Summarize this CSV."], args.turns)
+    print(summarize(results))
+
+
+if __name__ == "__main__":
+    main()
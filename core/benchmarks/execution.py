@@ -0,0 +1,199 @@
+"""
+Simulated code blocks for `ExecutionScheduler` (concurrent blocks and their cancellation) and
+`KernelWarmer` (kernels started while the block streams). Run through `python -m core.benchmark`.
+"""
+import statistics
+import threading
+import time
+
+from ..computer.terminal.scheduler import ExecutionScheduler
+from ..computer.terminal.warmup import KernelWarmer
+
+
+class _SimulatedTerminal:
+    """
+    Stands in for `Terminal`: each block prints `lines` lines, `delay` seconds apart, until `stop`.
+    The first line comes right away.
+    """
+
+    def __init__(self, lines, delay):
+        self.lines = lines
+        self.delay = delay
+        self.interrupted = threading.Event()
+        self.running = 0
+        self.lock = threading.Lock()
+
+    def run(self, language, code, stream=True):
+        with self.lock:
+            self.running += 1
+        try:
+            for line in range(self.lines):
+                if line and self.interrupted.wait(self.delay):
+                    yield {"type": "console", "format": "output", "content": "KeyboardInterrupt\n"}
+                    return
+                yield {"type": "console", "format": "output", "content": f"{code} {line}\n"}
+        finally:
+            with self.lock:
+                self.running -= 1
+
+    def stop(self):
+        self.interrupted.set()
+
+
+class _SimulatedComputer:
+    def __init__(self, terminal):
+        self.terminal = terminal
+
+    def wait_for_kernel(self, language):
+        pass  # Nothing is warming up
+
+    def stop(self):
+        self.terminal.stop()
+
+
+def run_many_benchmark(blocks=8, languages=4, lines=20, delay=0.01, max_workers=4, silent=2.0):
+    """
+    Runs `blocks` simulated blocks (spread over `languages`, each printing `lines` lines `delay` apart)
+    one after another, then with `ExecutionScheduler`, and checks the merged output. Then cancels a
+    `run_many` of blocks that print a line and compute silently for `silent` seconds, once they're
+    running, and measures until the generator is closed and until every block has stopped.
+    """
+    specs = [{"language": f"language{i % languages}", "code": f"block{i}"} for i in range(blocks)]
+
+    terminal = _SimulatedTerminal(lines, delay)
+    started = time.perf_counter()
+    expected = []
+    for spec in specs:
+        expected.append("".join(chunk["content"] for chunk in terminal.run(spec["language"], spec["code"])).strip())
+    sequential = time.perf_counter() - started
+
+    started = time.perf_counter()
+    chunks = list(ExecutionScheduler(_SimulatedComputer(terminal), max_workers).run(specs))
+    concurrent = time.perf_counter() - started
+    merged = [chunk["content"] for chunk in chunks if "block" not in chunk]
+    for index, (spec, content) in enumerate(zip(specs, merged)):
+        if content != f"[Block {index + 1}: {spec['language']}]\n{expected[index]}\n\n":
+            raise AssertionError(f"Block {index + 1}'s merged output is wrong")
+
+    terminal = _SimulatedTerminal(2, silent)
+    run = ExecutionScheduler(_SimulatedComputer(terminal), max_workers).run(specs)
+    for chunk in run:
+        if chunk.get("format") == "output":
+            break  # The first blocks are running
+    started = time.perf_counter()
+    run.close()  # What `_respond_and_store` does when the turn is stopped
+    closed = time.perf_counter() - started
+    while terminal.running:
+        time.sleep(0.001)
+    stopped = time.perf_counter() - started
+
+    return {
+        "blocks": blocks,
+        "languages": languages,
+        "block_time": (lines - 1) * delay,
+        "silent": silent,
+        "sequential": sequential,
+        "concurrent": concurrent,
+        "cancel_closed": closed,
+        "cancel_stopped": stopped,
+    }
+
+
+def summarize_run_many(results):
+    return "\n".join(
+        [
+            f"blocks:          {results['blocks']} in {results['languages']} languages, ~{results['block_time'] * 1000:.0f}ms each, merged output checked",
+            f"one at a time:   {results['sequential'] * 1000:.0f}ms",
+            f"run_many:        {results['concurrent'] * 1000:.0f}ms ({results['sequential'] / results['concurrent']:.1f}x)",
+            f"cancelled:       closed in {results['cancel_closed'] * 1000:.1f}ms, every block stopped in {results['cancel_stopped'] * 1000:.1f}ms"
+            f" (blocks silent for {results['silent']:.0f}s)",
+        ]
+    )
+
+
+class _SlowLanguage:
+    startup = 1.0
+    started = 0
+
+    def __init__(self):
+        time.sleep(self.startup)  # Like a Jupyter kernel starting
+        type(self).started += 1
+
+    def terminate(self):
+        pass
+
+
+class _WarmableTerminal:
+    """
+    Creates languages like `Terminal.run`: looked up with `get_language`, kept in `_active_languages`.
+    """
+
+    def __init__(self, languages):
+        self.languages = languages
+        self._active_languages = {}
+
+    def get_language(self, name):
+        return self.languages.get(name)
+
+    def run(self, language):
+        if language not in self._active_languages:
+            self._active_languages[language] = self.get_language(language)()
+        return self._active_languages[language]
+
+
+class _WarmupComputer:
+    def __init__(self, terminal):
+        self.terminal = terminal
+        self.verbose = False
+
+
+def run_warmup_benchmark(blocks=10, startup=1.0, generation=1.5):
+    """
+    Each of `blocks` simulated blocks needs a fresh kernel that takes `startup` seconds, and streams for
+    `generation` seconds after its first chunk. Measures the time from the end of the block to its kernel
+    being ready, cold and with `KernelWarmer` (`warm` on the first chunk, `wait` before running). Then
+    checks that with a terminal that has no `_active_languages` / `get_language`, `warm` starts no thread,
+    raises nothing, and `wait` returns at once.
+    """
+    _SlowLanguage.startup = startup
+    results = {"cold": [], "warm": []}
+    for kind in results:
+        for _ in range(blocks):
+            _SlowLanguage.started = 0
+            terminal = _WarmableTerminal({"python": _SlowLanguage})
+            warmer = KernelWarmer(_WarmupComputer(terminal))
+            if kind == "warm":
+                warmer.warm("python")
+            time.sleep(generation)  # The rest of the block streams in
+            finished = time.perf_counter()
+            if kind == "warm":
+                warmer.wait("python")
+            terminal.run("python")
+            results[kind].append(time.perf_counter() - finished)
+            if _SlowLanguage.started != 1:
+                raise AssertionError(f"{_SlowLanguage.started} kernels were started for one block")
+
+    class Bare:
+        pass
+
+    warmer = KernelWarmer(_WarmupComputer(Bare()))
+    threads = threading.active_count()
+    started = time.perf_counter()
+    warmer.warm("python")
+    warmer.wait("python")
+    no_op = time.perf_counter() - started
+    if warmer.supported() or threading.active_count() != threads or warmer._warming:
+        raise AssertionError("KernelWarmer tried to warm a kernel with a terminal it can't use")
+
+    return {"blocks": blocks, "startup": startup, "generation": generation, "no_op": no_op, **results}
+
+
+def summarize_warmup(results):
+    return "\n".join(
+        [
+            f"blocks:          {results['blocks']}, kernel startup {results['startup']:.1f}s, {results['generation']:.1f}s of generation after the block starts",
+            f"ready after block, cold:   mean {statistics.mean(results['cold']) * 1000:.0f}ms",
+            f"ready after block, warmed: mean {statistics.mean(results['warm']) * 1000:.0f}ms",
+            f"unsupported terminal:      warm + wait took {results['no_op'] * 1e6:.0f}us, no thread started",
+        ]
+    )
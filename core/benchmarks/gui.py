@@ -0,0 +1,145 @@
+"""
+Checks for the GUI's `FrameMonitor` (how late it ticks while code runs) and `FileReferenceMatcher`.
+Neither needs the interpreter, and only the frame latency needs PyQt6. Run through `python -m core.benchmark`.
+"""
+import json
+import random
+import re
+import threading
+import time
+
+
+# User code and the JSON work of streaming, as they run in the backend: a pure Python loop (which lets
+# other threads in every sys.getswitchinterval()) and JSON round trips (C calls that hold the GIL throughout)
+CPU_BOUND_SNIPPET = """
+total = sum(i * i for i in range(200_000))
+payload = json.loads(json.dumps([{"id": i, "text": "word " * 20, "values": list(range(20))} for i in range(20_000)]))
+"""
+
+
+def _cpu_bound(seconds, started=None):
+    if started is not None:
+        started.set()
+    code = compile(CPU_BOUND_SNIPPET, "<cpu-bound>", "exec")
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        exec(code, {"json": json})
+
+
+def run_frame_latency(seconds=5.0):
+    """
+    Runs the GUI's `FrameMonitor` for `seconds` each: idle, with `CPU_BOUND_SNIPPET` looping on a thread of
+    this process, and with it looping in a spawned child process. Returns each one's report.
+    """
+    import multiprocessing
+    from PyQt6.QtCore import QCoreApplication, QEventLoop, QTimer
+    from gui.frame_monitor import FrameMonitor
+
+    app = QCoreApplication.instance() or QCoreApplication([])
+    monitor = FrameMonitor()
+
+    def measure(worker=None):
+        loop = QEventLoop()
+        QTimer.singleShot(int(seconds * 1000), loop.quit)
+        monitor.start()
+        loop.exec()
+        monitor.timer.stop()
+        report = monitor.report()
+        if worker is not None:
+            worker.join()
+        return report
+
+    results = {"idle": measure()}
+
+    started = threading.Event()
+    worker = threading.Thread(target=_cpu_bound, args=(seconds, started), daemon=True)
+    worker.start()
+    started.wait()
+    results["thread in the GUI process"] = measure(worker)
+
+    context = multiprocessing.get_context("spawn")  # As RemoteInterpreter starts the backend
+    started = context.Event()
+    worker = context.Process(target=_cpu_bound, args=(seconds, started), daemon=True)
+    worker.start()
+    started.wait()  # Not while the child is still importing
+    results["child process"] = measure(worker)
+
+    app.processEvents()
+    return results
+
+
+def summarize_frame_latency(results):
+    return "\n".join(f"{name + ':':28}{report}" for name, report in results.items())
+
+
+def _file_names(files, rng):
+    # Names that are prefixes, suffixes and extensions of each other, like real uploads
+    names = set()
+    while len(names) < files:
+        stem = f"{rng.choice(['data', 'report', 'sales', 'log', 'image'])}_{rng.randrange(files)}"
+        names.add(rng.choice([stem, f"{stem}.csv", f"{stem}.csv.bak", f"my{stem}.txt", f"old.{stem}.csv"]))
+    return sorted(names)
+
+
+def _file_message(names, kilobytes, rng):
+    words = []
+    size = 0
+    while size < kilobytes * 1024:
+        word = rng.choice(names) if rng.random() < 0.1 else rng.choice(["the", "and", "look", "at", "file", "then"])
+        word += rng.choice(["", "", ",", ".", ".bak", "!", "_x"]) if rng.random() < 0.3 else ""
+        words.append(word)
+        size += len(word) + 1
+    return " ".join(words)
+
+
+def run_file_reference_benchmark(files=10_000, messages=20, message_kb=16, seed=0):
+    """
+    Substitutes paths for `files` uploaded names in `messages` long messages with `FileReferenceMatcher`.
+    Checks each result against a regex (longest name first, with the same boundaries), then times the
+    matcher against the old loop of `message.replace(name, path)` per name.
+    """
+    from gui.file_reference_matcher import FileReferenceMatcher
+
+    rng = random.Random(seed)
+    names = _file_names(files, rng)
+    paths = {name: f"/uploads/{i}/{name}" for i, name in enumerate(names)}
+    texts = [_file_message(names, message_kb, rng) for _ in range(messages)]
+
+    started = time.perf_counter()
+    matcher = FileReferenceMatcher(paths)
+    build = time.perf_counter() - started
+
+    reference = re.compile(
+        r"(?<!\w)(?<![^\W_]\.)("
+        + "|".join(re.escape(name) for name in sorted(names, key=len, reverse=True))
+        + r")(?!\w)(?!\.[^\W_])"
+    )
+    for text in texts:
+        expected = reference.sub(lambda match: paths[match.group(1)], text)
+        if matcher.substitute(text) != expected:
+            raise AssertionError("FileReferenceMatcher and the regex substituted differently")
+
+    started = time.perf_counter()
+    for text in texts:
+        matcher.substitute(text)
+    matched = (time.perf_counter() - started) / messages
+
+    started = time.perf_counter()
+    for text in texts:
+        for name, path in paths.items():
+            if name in text:
+                text = text.replace(name, path)
+    replaced = (time.perf_counter() - started) / messages
+
+    return {"files": files, "message_kb": message_kb, "build": build, "matcher": matched, "replace": replaced}
+
+
+def summarize_file_references(results):
+    return "\n".join(
+        [
+            f"uploaded names: {results['files']:,}, messages of {results['message_kb']}KB, all matched the regex",
+            f"trie build:     {results['build'] * 1000:.1f}ms",
+            f"per message:    matcher {results['matcher'] * 1000:.2f}ms  replace per name {results['replace'] * 1000:.2f}ms"
+            f"  ({results['replace'] / results['matcher']:.0f}x)",
+        ]
+    )
@@ -0,0 +1,249 @@
+"""
+Benchmarks for what large outputs cost in a conversation: screenshots inline against a `BlobStore`,
+`FrameFilter` over a synthetic OS-mode session, and a table's repr against its compact preview.
+Each one imports what it measures, so the frames don't need the blob store or the LLM package.
+Run through `python -m core.benchmark`.
+"""
+import gc
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+from ..frame_filter import Frame, FrameFilter
+
+
+def run_blob_benchmark(screenshots=500, image_kb=300, repeated=0.3, seed=0):
+    """
+    Builds a conversation with `screenshots` base64 screenshots (`repeated` of them identical to an earlier
+    one, like an unchanged screen in OS mode), with the images inline and in a `BlobStore`. Reports the
+    saved JSON size, the memory the messages hold, and the time to save them.
+    """
+    from ..blob_store import BlobStore
+
+    rng = random.Random(seed)
+    frames = []
+    for i in range(screenshots):
+        if frames and rng.random() < repeated:
+            frames.append(rng.choice(frames))
+        else:
+            frames.append(rng.randbytes(image_kb * 768).hex()[:image_kb * 1024])  # Stands in for base64
+    directory = tempfile.mkdtemp()
+    try:
+        store = BlobStore(os.path.join(directory, "blobs"))
+        results = {}
+        for mode in ("inline", "blobs"):
+            gc.collect()
+            tracemalloc.start()
+            messages = []
+            for i, frame in enumerate(frames):
+                messages.append({"role": "assistant", "type": "code", "format": "python", "content": f"computer.display.view() # {i}"})
+                # A fresh str per frame, as a screenshot decoded from the kernel's output would be
+                image = {"role": "computer", "type": "image", "format": "base64.png", "content": frame[:1] + frame[1:]}
+                messages.append(store.store(image) if mode == "blobs" else image)
+            held = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+
+            started = time.perf_counter()
+            path = os.path.join(directory, f"{mode}.json")
+            with open(path, "w") as f:
+                json.dump(messages, f)
+            results[mode] = {
+                "json_bytes": os.path.getsize(path),
+                "held_bytes": held,
+                "save_seconds": time.perf_counter() - started,
+            }
+            del messages
+
+        blob_bytes = 0
+        for root, _, names in os.walk(store.directory):
+            blob_bytes += sum(os.path.getsize(os.path.join(root, name)) for name in names)
+        results["blobs"]["store_bytes"] = blob_bytes
+        results["blobs"]["stored"] = len(set(frames))
+        return results
+    finally:
+        shutil.rmtree(directory)
+
+
+def summarize_blobs(results, screenshots):
+    lines = [f"{screenshots} screenshots"]
+    for mode, r in results.items():
+        line = (
+            f"{mode:>6}: conversation JSON {r['json_bytes'] / 1024 / 1024:.1f}MB  "
+            f"messages hold {r['held_bytes'] / 1024 / 1024:.1f}MB  save {r['save_seconds'] * 1000:.0f}ms"
+        )
+        if "store_bytes" in r:
+            line += f"  store {r['store_bytes'] / 1024 / 1024:.1f}MB ({r['stored']} distinct)"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def _paint(pixels, width, box, value):
+    left, top, right, bottom = box
+    for y in range(top, bottom):
+        pixels[y * width + left:y * width + right] = [value] * (right - left)
+
+
+def _desktop(rng, width, height):
+    pixels = [40] * (width * height)
+    for _ in range(rng.randint(2, 5)):
+        left, top = rng.randrange(width - 40), rng.randrange(height - 30)
+        window = (left, top, rng.randint(left + 40, width), rng.randint(top + 30, height))
+        _paint(pixels, width, window, rng.randint(120, 255))
+    return pixels
+
+
+def _changed_box(before, after, width):
+    changed = [i for i, (a, b) in enumerate(zip(before, after)) if a != b]
+    if not changed:
+        return None
+    xs = [i % width for i in changed]
+    ys = [i // width for i in changed]
+    return (min(xs), min(ys), max(xs) + 1, max(ys) + 1)
+
+
+def synthetic_session(frames=200, width=480, height=270, seed=0):
+    """
+    Yields (pixels, action) for a screen that mostly idles, blinks a cursor, gets typed into, scrolls and
+    sometimes switches to another window.
+    """
+    rng = random.Random(seed)
+    pixels = _desktop(rng, width, height)
+    caret = [rng.randrange(width - 100), rng.randrange(height - 20)]
+    for _ in range(frames):
+        action = rng.choices(["idle", "cursor", "type", "scroll", "switch"], [40, 15, 25, 12, 8])[0]
+        pixels = list(pixels)
+        if action == "cursor":
+            _paint(pixels, width, (caret[0], caret[1], caret[0] + 2, caret[1] + 14), rng.choice([0, 255]))
+        elif action == "type":
+            for _ in range(rng.randint(1, 8)):
+                ink = 255 if pixels[caret[1] * width + caret[0]] < 128 else 0
+                _paint(pixels, width, (caret[0], caret[1], caret[0] + 7, caret[1] + 14), ink)
+                caret[0] = min(caret[0] + 8, width - 8)
+        elif action == "scroll":
+            left, top = rng.randrange(width // 2), rng.randrange(height // 2)
+            _paint(pixels, width, (left, top, left + width // 3, top + height // 3), rng.randint(60, 255))
+        elif action == "switch":
+            pixels = _desktop(rng, width, height)
+            caret = [rng.randrange(width - 100), rng.randrange(height - 20)]
+        yield pixels, action
+
+
+def run_frames_benchmark(frames=200, width=480, height=270, crop=True, seed=0):
+    """
+    Runs `FrameFilter` over `synthetic_session`, and checks that frames with a visible change are never
+    skipped and that crops cover every changed pixel.
+    """
+    frame_filter = FrameFilter(crop=crop)
+    sent_pixels = 0
+    elapsed = 0.0
+    previous = None
+    shown = None  # What the model has seen of the screen
+    for pixels, action in synthetic_session(frames, width, height, seed):
+        started = time.perf_counter()
+        decision = frame_filter.decide(Frame.from_pixels(pixels, width, height, frame_filter.grid))
+        elapsed += time.perf_counter() - started
+
+        if decision == "skip":
+            if previous is not None and action in ("type", "scroll", "switch") and _changed_box(shown, pixels, width):
+                raise AssertionError(f"A frame with a visible change ({action}) was skipped")
+        elif decision == "send":
+            sent_pixels += width * height
+            shown = pixels
+        else:
+            box = decision[1]
+            changed = _changed_box(shown, pixels, width)
+            if changed and not (box[0] <= changed[0] and box[1] <= changed[1] and box[2] >= changed[2] and box[3] >= changed[3]):
+                raise AssertionError(f"The crop {box} doesn't cover the change {changed}")
+            sent_pixels += (box[2] - box[0]) * (box[3] - box[1])
+            shown = pixels
+        previous = pixels
+
+    full_frame_tokens = 1920 * 1080 // 750  # Roughly, for a vision model
+    fraction = sent_pixels / (frames * width * height)
+    return {
+        "frames": frames,
+        "skipped": frame_filter.skipped,
+        "cropped": frame_filter.cropped,
+        "pixels_sent": fraction,
+        "tokens_before": frames * full_frame_tokens,
+        "tokens_after": int(frames * full_frame_tokens * fraction),
+        "ms_per_frame": elapsed / frames * 1000,
+    }
+
+
+def summarize_frames(results):
+    lines = []
+    for r in results:
+        lines.append(
+            f"crop={r['crop']!s:<5}  {r['frames']} frames: {r['skipped']} skipped, {r['cropped']} cropped, "
+            f"{r['pixels_sent'] * 100:.0f}% of the pixels sent, ~{r['tokens_before']} -> ~{r['tokens_after']} "
+            f"image tokens at 1920x1080, compare {r['ms_per_frame']:.2f}ms/frame"
+        )
+    return "\n".join(lines)
+
+
+def run_tables_benchmark(rows=1_000_000, seed=0):
+    """
+    Builds a `rows`-row table (id, price, city, timestamp) and measures the text that used to flow through
+    `_respond_and_store` for it against the preview `tabular` sends instead.
+    """
+    import pyarrow as pa
+    from ..computer.terminal import tabular
+    from ..llm.compaction import estimate_tokens
+
+    rng = random.Random(seed)
+    table = pa.table({
+        "id": list(range(rows)),
+        "price": [rng.random() * 100 for _ in range(rows)],
+        "city": [rng.choice(["Berlin", "Paris", "Rome", "Lisbon"]) for _ in range(rows)],
+        "when": pa.array([1_700_000_000_000_000 + i * 60_000_000 for i in range(rows)], pa.timestamp("us")),
+    })
+
+    texts = {}
+    started = time.perf_counter()
+    texts["list repr"] = repr(list(zip(*(column.to_pylist() for column in table.columns))))
+    elapsed = {"list repr": time.perf_counter() - started}
+    try:
+        frame = table.to_pandas()
+        started = time.perf_counter()
+        texts["DataFrame.to_string()"] = frame.to_string()
+        elapsed["DataFrame.to_string()"] = time.perf_counter() - started
+    except ImportError:
+        pass
+
+    directory = tempfile.mkdtemp()
+    try:
+        started = time.perf_counter()
+        texts["preview"] = tabular.format_preview(tabular.preview(table))
+        elapsed["preview"] = time.perf_counter() - started
+        started = time.perf_counter()
+        path = tabular.export(table, directory)
+        export_seconds = time.perf_counter() - started
+        export_bytes = os.path.getsize(path)
+    finally:
+        shutil.rmtree(directory)
+
+    results = []
+    for name, text in texts.items():
+        results.append({
+            "name": name,
+            "bytes": len(text.encode("utf-8")),
+            "tokens": estimate_tokens([{"content": text}]),
+            "seconds": elapsed[name],
+        })
+    return {"rows": rows, "results": results, "export_seconds": export_seconds, "export_bytes": export_bytes}
+
+
+def summarize_tables(results):
+    lines = [f"{results['rows']:,} rows"]
+    for r in results["results"]:
+        lines.append(f"{r['name']:>22}: {r['bytes'] / 1024:,.1f}KB  ~{r['tokens']:,} tokens  {r['seconds'] * 1000:.0f}ms")
+    lines.append(
+        f"{'Arrow file for the GUI':>22}: {results['export_bytes'] / 1024 / 1024:.1f}MB written in "
+        f"{results['export_seconds'] * 1000:.0f}ms (memory-mapped, not sent)"
+    )
+    return "\n".join(lines)
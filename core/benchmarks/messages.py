@@ -0,0 +1,66 @@
+"""
+Times `ConversionCache` against converting the whole history every turn. Run through `python -m core.benchmark`.
+"""
+import random
+import time
+
+from ..llm.conversion_cache import ConversionCache, convert_to_openai_messages
+
+
+def _conversion_turn(turn, rng):
+    messages = [
+        {"role": "user", "type": "message", "content": f"Step {turn}: look at the data again."},
+        {"role": "assistant", "type": "message", "content": "Let's check. " * rng.randint(5, 40)},
+        {"role": "assistant", "type": "code", "format": "python", "content": f"print(df.head({turn}))\n" * rng.randint(1, 10)},
+        {"role": "computer", "type": "console", "format": "output", "content": "   a  b\n0  1  2\n" * rng.randint(0, 50)},
+    ]
+    if turn % 10 == 0:
+        messages.append({"role": "computer", "type": "image", "format": "base64.png", "content": "iVBORw0KGgo" * 2000})
+    messages.append({"role": "assistant", "type": "message", "content": "Done with this step."})
+    return messages
+
+
+def run_conversion_benchmark(turns=200, function_calling=False, seed=0):
+    """
+    Grows an LMC history turn by turn and converts it with `ConversionCache` and, as the baseline, with
+    `convert_to_openai_messages` on the whole history. Raises if they ever differ.
+    """
+    rng = random.Random(seed)
+    interpreter = type("Settings", (), {
+        "code_output_template": "Code output: {content}\n\nWhat does this output mean / what's next (if anything, or are we done)?",
+        "empty_code_output_template": "The code above was executed on my machine. It produced no text output. what's next (if anything, or are we done)?",
+        "code_output_sender": "user",
+        "shrink_images": False,
+    })()
+    cache = ConversionCache()
+    history = [{"role": "system", "type": "message", "content": "You are a helpful assistant."}]
+    results = []
+    for turn in range(turns):
+        history.extend(_conversion_turn(turn, rng))
+        flags = {"function_calling": function_calling, "vision": True, "shrink_images": False, "interpreter": interpreter}
+
+        started = time.perf_counter()
+        cached = cache.convert(history, **flags)
+        cached_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        full = convert_to_openai_messages(history, **flags)
+        full_seconds = time.perf_counter() - started
+
+        if cached != full:
+            raise AssertionError(f"ConversionCache differs from converting the whole history at turn {turn}")
+        results.append({"messages": len(history), "cached": cached_seconds, "full": full_seconds})
+    return results
+
+
+def summarize_conversion(results):
+    lines = []
+    for i in sorted({0, 9, 49, 99, 149, len(results) - 1}):
+        if i < len(results):
+            r = results[i]
+            lines.append(
+                f"turn {i + 1:>4} ({r['messages']:>5} messages): cached {r['cached'] * 1000:.2f}ms  "
+                f"whole history {r['full'] * 1000:.2f}ms"
+            )
+    lines.append(f"{len(results)} turns, same messages as converting the whole history every turn")
+    return "\n".join(lines)
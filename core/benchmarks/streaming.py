@@ -0,0 +1,181 @@
+"""
+Checks and benchmarks for parsing streamed LLM output: function call arguments (`ArgumentsParser`)
+against re-parsing everything received so far, and code fences (`CodeFenceParser`) fuzzed against a
+line-by-line parse of the whole text. Run through `python -m core.benchmark`.
+"""
+import json
+import random
+import time
+
+from ..llm.streaming_json import ArgumentsParser
+from ..llm.code_fences import CodeFenceParser
+
+
+def _reparse(arguments):
+    """
+    The baseline: close the partial JSON and parse all of it again (json.loads is C, so this is generous).
+    """
+    for ending in ('"}', "}", ""):
+        try:
+            return json.loads(arguments + ending)
+        except ValueError:
+            continue
+    return None
+
+
+def run_arguments_benchmark(code_kb=50, chunk_sizes=(1, 16), baseline=True):
+    """
+    Streams `{"language": ..., "code": ...}` with `code_kb` KB of code in chunks of each size.
+    """
+    line = 'print("value:\\t", data[i], {"k": i})  # \\u00e9\n'
+    code = (line * (code_kb * 1024 // len(line) + 1))[: code_kb * 1024]
+    arguments = json.dumps({"language": "python", "code": code})
+
+    results = []
+    for chunk_size in chunk_sizes:
+        deltas = [arguments[i:i + chunk_size] for i in range(0, len(arguments), chunk_size)]
+
+        started = time.perf_counter()
+        parser = ArgumentsParser()
+        streamed = []
+        for delta in deltas:
+            for key, fragment in parser.feed(delta):
+                if key == "code":
+                    streamed.append(fragment)
+        incremental = time.perf_counter() - started
+        assert "".join(streamed) == code
+
+        reparse = None
+        if baseline:
+            started = time.perf_counter()
+            accumulated = ""
+            for delta in deltas:
+                accumulated += delta
+                _reparse(accumulated)
+            reparse = time.perf_counter() - started
+
+        results.append(
+            {
+                "chunk_size": chunk_size,
+                "deltas": len(deltas),
+                "incremental": incremental,
+                "reparse": reparse,
+            }
+        )
+    return results
+
+
+def summarize_arguments(results, code_kb):
+    lines = [f"arguments: {code_kb}KB of code"]
+    for r in results:
+        line = f"{r['chunk_size']:>3}B chunks ({r['deltas']} deltas): incremental {r['incremental'] * 1000:.1f}ms ({r['incremental'] / r['deltas'] * 1e6:.2f}us/delta)"
+        if r["reparse"] is not None:
+            line += f"  re-parse {r['reparse'] * 1000:.1f}ms"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def _fences_reference(text, default_language="python"):
+    """
+    What `CodeFenceParser` should produce, worked out line by line on the whole text.
+    """
+    blocks = []
+    message = ""
+    code = None
+    language = None
+    fence = 0
+    lines = text.split("\n")
+    for index, line in enumerate(lines):
+        last = index == len(lines) - 1
+        stripped = line.lstrip(" \t")
+        ticks = len(stripped) - len(stripped.lstrip("`"))
+        if code is None:
+            if ticks >= 3:
+                if last:
+                    break
+                if message:
+                    blocks.append(("message", None, message))
+                    message = ""
+                tag = stripped[ticks:].split()
+                language = tag[0] if tag else default_language
+                fence = ticks
+                code = []
+            else:
+                message += line if last else line + "\n"
+        elif ticks >= fence and not stripped[ticks:].strip(" \t\r"):
+            blocks.append(("code", language, "\n".join(code)))
+            code = None
+        else:
+            code.append(line)
+    if code is not None:
+        if code and code[-1] == "":
+            code.pop()
+        blocks.append(("code", language, "\n".join(code)))
+    if message:
+        blocks.append(("message", None, message))
+    return blocks
+
+
+def _fences_streamed(text, chunk_sizes, rng):
+    parser = CodeFenceParser()
+    chunks = []
+    i = 0
+    while i < len(text):
+        size = rng.choice(chunk_sizes)
+        chunks += parser.feed(text[i:i + size])
+        i += size
+    chunks += parser.finish()
+
+    blocks = []
+    block = None
+    for chunk in chunks:
+        if chunk["type"] == "code":
+            if chunk.get("start"):
+                block = ["code", chunk["format"], ""]
+            elif chunk.get("end"):
+                blocks.append(tuple(block))
+                block = None
+            else:
+                block[2] += chunk["content"]
+        elif blocks and blocks[-1][0] == "message":
+            blocks[-1] = ("message", None, blocks[-1][2] + chunk["content"])
+        else:
+            blocks.append(("message", None, chunk["content"]))
+    return blocks
+
+
+def fuzz_code_fences(cases=5000, seed=0):
+    """
+    Streams random markdown in random splits, and checks the result against `_fences_reference`.
+    """
+    rng = random.Random(seed)
+    pieces = ["```", "````", "``", "`", "```python\n", "```js \n", "```` md\n", "   ```\n", "```\n",
+              "\n", "\n\n", " ", "  ", "\t", "\r", "a", "print(1)", "x = `y`"]
+    for _ in range(cases):
+        text = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 40)))
+        expected = _fences_reference(text)
+        streamed = _fences_streamed(text, range(1, 13), rng)
+        if streamed != expected:
+            raise AssertionError(f"CodeFenceParser differs on {text!r}:\n{streamed}\nexpected\n{expected}")
+    return cases
+
+
+def run_code_fences_benchmark(megabytes=10, chunk_sizes=(4, 64)):
+    paragraph = (
+        "Let's load the data and look at it. We'll use `pandas` for this:\n\n"
+        "```python\nimport pandas as pd\ndf = pd.read_csv('data.csv')\nprint(df.describe())\n```\n\n"
+        "Then we check the disk usage:\n\n```shell\ndu -sh ~/data\n```\n"
+    )
+    text = paragraph * (megabytes * 1024 * 1024 // len(paragraph))
+
+    results = []
+    for chunk_size in chunk_sizes:
+        deltas = [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
+        parser = CodeFenceParser()
+        started = time.perf_counter()
+        for delta in deltas:
+            parser.feed(delta)
+        parser.finish()
+        elapsed = time.perf_counter() - started
+        results.append({"chunk_size": chunk_size, "megabytes": len(text) / 1024 / 1024, "seconds": elapsed})
+    return results
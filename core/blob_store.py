@@ -0,0 +1,165 @@
+"""
+Content-addressed storage for images and large outputs in `interpreter.messages`.
+
+Screenshots (especially in OS mode) used to live inline in `messages` as base64. They were kept in
+memory for the whole session and written whole into every save of the conversation JSON.
+`_respond_and_store` now moves a finished message's content into a `BlobStore` file if it's an image
+or an output bigger than `threshold`, and stores a message with a reference in its place:
+
+    {"role": "computer", "type": "image", "format": "base64.png", "content": "blob:sha256:…", "blob": True}
+
+Blobs are named by the SHA-256 of their content, so identical screenshots (across turns and across
+conversations) are stored once. `Llm.run` only loads the content of the messages it actually sends
+(`resolve`), and the GUI loads it when it's displayed. `collect` deletes the blobs that no saved
+conversation refers to anymore.
+"""
+import hashlib
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from terminal_interface.utils.oi_dir import oi_dir
+
+DEFAULT_BLOB_PATH = os.path.join(oi_dir, "blobs")
+PREFIX = "blob:sha256:"
+REFERENCE = re.compile(r"blob:sha256:([0-9a-f]{64})")
+
+
+def is_blob(message):
+    return bool(message.get("blob")) and isinstance(message.get("content"), str)
+
+
+class BlobStore:
+    def __init__(self, directory, threshold=64 * 1024, cache_size=8):
+        self.directory = directory
+        self.threshold = threshold  # Code output at least this long is stored as a blob
+        self.cache_size = cache_size  # Recently loaded blobs kept in memory
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, digest):
+        return os.path.join(self.directory, digest[:2], digest[2:])
+
+    def put(self, content):
+        """
+        Stores `content` (str or bytes) if it isn't stored yet, and returns its reference.
+        """
+        data = content.encode("utf-8") if isinstance(content, str) else content
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        if os.path.exists(path):
+            # Stored already, but used again now, so `collect` keeps it for another grace period
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Written to a temporary file first, so a reader never sees a partial blob
+            fd, temporary = tempfile.mkstemp(dir=os.path.dirname(path))
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(temporary, path)
+            except BaseException:
+                if os.path.exists(temporary):
+                    os.remove(temporary)
+                raise
+        return PREFIX + digest
+
+    def get(self, reference):
+        """
+        Returns the bytes of a blob.
+        """
+        digest = reference[len(PREFIX):]
+        with self._lock:
+            if digest in self._cache:
+                self._cache.move_to_end(digest)
+                return self._cache[digest]
+        with open(self._path(digest), "rb") as f:
+            data = f.read()
+        with self._lock:
+            self._cache[digest] = data
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return data
+
+    def get_text(self, reference):
+        return self.get(reference).decode("utf-8")
+
+    def should_store(self, message):
+        if is_blob(message) or not isinstance(message.get("content"), str):
+            return False
+        if message.get("type") == "image" and str(message.get("format", "")).startswith("base64"):
+            return True
+        # Only code output. What the user and the model wrote is used for titles and search, so it stays inline
+        return message.get("role") == "computer" and len(message["content"]) >= self.threshold
+
+    def store(self, message):
+        """
+        Returns a copy of the message with its content moved into the store, or the message itself if
+        it's small. It's a copy because the original may still be on its way to a display.
+        """
+        if not self.should_store(message):
+            return message
+        return {**message, "content": self.put(message["content"]), "blob": True}
+
+    def resolve(self, message):
+        """
+        Returns the message with its content loaded (a copy), or the message itself if it isn't a blob.
+        """
+        if not is_blob(message):
+            return message
+        resolved = {key: value for key, value in message.items() if key != "blob"}
+        try:
+            resolved["content"] = self.get_text(message["content"])
+        except OSError:
+            # Deleted from the store, send a note instead
+            if message.get("type") == "image":
+                resolved["type"], resolved["format"] = "console", "output"
+                resolved["content"] = "[An image was here, but it's no longer stored]"
+            else:
+                resolved["content"] = "[This output is no longer stored]"
+        return resolved
+
+    def collect(self, directories=(), messages=(), grace=3600):
+        """
+        Deletes blobs that aren't referenced by `messages` or any conversation JSON in `directories`.
+        Blobs younger than `grace` seconds are kept, they may belong to a conversation not saved yet.
+        """
+        referenced = set()
+        for message in messages:
+            if is_blob(message):
+                referenced.add(message["content"][len(PREFIX):])
+        for directory in directories:
+            if not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                if not name.endswith(".json"):
+                    continue
+                try:
+                    with open(os.path.join(directory, name), "r") as f:
+                        referenced.update(REFERENCE.findall(f.read()))
+                except OSError:
+                    continue
+
+        removed = 0
+        now = time.time()
+        if not os.path.isdir(self.directory):
+            return removed
+        for prefix in os.listdir(self.directory):
+            prefix_path = os.path.join(self.directory, prefix)
+            if not os.path.isdir(prefix_path):
+                continue
+            for rest in os.listdir(prefix_path):
+                path = os.path.join(prefix_path, rest)
+                try:
+                    if prefix + rest in referenced or now - os.path.getmtime(path) < grace:
+                        continue
+                    os.remove(path)
+                    removed += 1
+                except OSError:
+                    continue
+        return removed
@@ -94,13 +94,32 @@ Do not import the computer module, or any of its sub-modules. They are already i
         """
         Shortcut for computer.terminal.run
         """
+        self.wait_for_kernel(args[0] if args else kwargs.get("language"))
         return self.terminal.run(*args, **kwargs)
 
+    def wait_for_kernel(self, language):
+        """
+        Waits for the interpreter's KernelWarmer if it's starting this language's kernel.
+        It puts the kernel in terminal._active_languages from its own thread, so this has to happen before
+        Terminal.run looks there, or it would read the dict while it's written and start a second kernel.
+        """
+        kernel_warmer = getattr(self.interpreter, "kernel_warmer", None)
+        if kernel_warmer is not None:
+            kernel_warmer.wait(language)
+
+    def run_many(self, blocks, max_workers=4):
+        """
+        Runs several code blocks concurrently, see ExecutionScheduler
+        """
+        from .terminal.scheduler import ExecutionScheduler
+        return ExecutionScheduler(self, max_workers=max_workers).run(blocks)
+
     def exec(self, code):
         """
         Shortcut for computer.terminal.run("shell", code)
         It has hallucinated this.
         """
+        self.wait_for_kernel("shell")
         return self.terminal.run("shell", code)
 
     def stop(self):
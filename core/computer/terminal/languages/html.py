@@ -1,5 +1,10 @@
+import os
+
 from ..base_language import BaseLanguage
 
+# Renders HTML to a screenshot, set by the GUI (see gui/html_renderer.py). Shared by every HTML instance.
+renderer = None
+
 class HTML(BaseLanguage):
     file_extension = "html"
     name = "HTML"
@@ -16,10 +21,36 @@ class HTML(BaseLanguage):
             "recipient": "both"
         }
 
-        # Inform that HTML is being displayed
+        if renderer is None or not renderer.available:
+            # Inform that HTML is being displayed
+            yield {
+                "type": "console",
+                "format": "output",
+                "content": "HTML code is ready to be displayed.",
+                "recipient": "both"
+            }
+            return
+
+        image, latency = renderer.render(code, base_path=os.getcwd())
+        if image is None:
+            yield {
+                "type": "console",
+                "format": "output",
+                "content": "HTML code is ready to be displayed, but it couldn't be rendered to a screenshot.",
+                "recipient": "both"
+            }
+            return
+
+        # Only the assistant needs the screenshot, the user can see the page
+        yield {
+            "type": "image",
+            "format": "base64.png",
+            "content": image,
+            "recipient": "assistant"
+        }
         yield {
             "type": "console",
             "format": "output",
-            "content": "HTML code is ready to be displayed.",
+            "content": f"HTML rendered in {latency * 1000:.0f} ms, a screenshot of it is attached.",
             "recipient": "both"
         }
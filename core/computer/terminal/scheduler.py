@@ -0,0 +1,141 @@
+"""
+Runs several code blocks from one LLM response concurrently.
+
+Each language has one kernel, so blocks in the same language still run in order. Blocks in different
+languages run in parallel, unless a block lists the blocks it needs (0-based indices) in `depends_on`:
+
+    computer.run_many([
+        {"language": "python", "code": "..."},
+        {"language": "shell", "code": "..."},
+        {"language": "python", "code": "...", "depends_on": [1]},
+    ])
+
+While blocks run, their output is streamed as it arrives, interleaved. Those chunks carry a `block`
+index (with a start and end flag per block) and are for display only. Once every block has finished,
+each block's output is yielded again, merged in block order, so what's stored for the next LLM turn is
+deterministic no matter how the threads were scheduled.
+"""
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue
+
+_DONE = object()
+
+
+class ExecutionScheduler:
+    def __init__(self, computer, max_workers=4):
+        self.computer = computer
+        self.max_workers = max_workers
+
+    def run(self, blocks):
+        blocks = [dict(block) for block in blocks]
+        dependencies = self._dependencies(blocks)
+
+        outputs = [[] for _ in blocks]
+        failed = set()
+        finished = set()
+        started = set()
+        events = Queue()
+        cancelled = threading.Event()
+
+        def execute(index):
+            block = blocks[index]
+            try:
+                self.computer.wait_for_kernel(block["language"])
+                for chunk in self.computer.terminal.run(
+                    block["language"], block["code"], stream=True
+                ):
+                    if cancelled.is_set():
+                        break
+                    events.put((index, chunk))
+            except Exception:
+                failed.add(index)
+                events.put(
+                    (
+                        index,
+                        {
+                            "type": "console",
+                            "format": "output",
+                            "content": traceback.format_exc(),
+                        },
+                    )
+                )
+            events.put((index, _DONE))
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        completed = False
+        try:
+            while len(finished) < len(blocks):
+                # Start (or skip) every block whose dependencies are done
+                for index in range(len(blocks)):
+                    if index in started or not dependencies[index] <= finished:
+                        continue
+                    started.add(index)
+                    yield {"role": "computer", "type": "console", "block": index, "start": True}
+
+                    # Don't run a block whose explicit dependencies failed
+                    failed_dependencies = sorted(dependencies[index] & set(blocks[index].get("depends_on", [])) & failed)
+                    if failed_dependencies:
+                        failed.add(index)
+                        message = f"Skipped, because block {failed_dependencies[0] + 1} failed."
+                        events.put((index, {"type": "console", "format": "output", "content": message}))
+                        events.put((index, _DONE))
+                    else:
+                        executor.submit(execute, index)
+
+                index, chunk = events.get()
+                if chunk is _DONE:
+                    finished.add(index)
+                    yield {"role": "computer", "type": "console", "block": index, "end": True}
+                    continue
+
+                if chunk.get("format") == "output":
+                    outputs[index].append(chunk.get("content", ""))
+                yield {"role": "computer", **chunk, "block": index}
+            completed = True
+        finally:
+            if completed:
+                executor.shutdown(wait=True)
+            else:
+                # The consumer stopped pulling (the turn was cancelled): drop the blocks that haven't
+                # started, interrupt the running ones, and don't wait for them
+                cancelled.set()
+                executor.shutdown(wait=False, cancel_futures=True)
+                self.computer.stop()
+
+        yield from self.merge(blocks, outputs)
+
+    def merge(self, blocks, outputs):
+        """
+        Yields each block's output, in block order, as ordinary console output chunks.
+        """
+        for index, block in enumerate(blocks):
+            content = "".join(outputs[index]).strip()
+            header = f"[Block {index + 1}: {block['language']}]\n"
+            yield {
+                "role": "computer",
+                "type": "console",
+                "format": "output",
+                "content": header + (content or "(no output)") + "\n\n",
+            }
+
+    def _dependencies(self, blocks):
+        """
+        Each block depends on the blocks it lists, and on the previous block in the same language
+        (they share a kernel).
+        """
+        dependencies = []
+        last_by_language = {}
+        for index, block in enumerate(blocks):
+            depends_on = {
+                dependency
+                for dependency in block.get("depends_on", [])
+                if 0 <= dependency < index
+            }
+            language = block["language"].lower()
+            if language in last_by_language:
+                depends_on.add(last_by_language[language])
+            last_by_language[language] = index
+            dependencies.append(depends_on)
+        return dependencies
@@ -0,0 +1,285 @@
+"""
+Compact previews of tabular results in the Python kernel.
+
+A DataFrame, Arrow table, NumPy array or long list that user code evaluates to used to come back as its
+whole text repr: megabytes of `console` output that `_respond_and_store` re-truncated on every chunk,
+and that was then sent to the LLM as text. `install` registers IPython formatters for these types. When
+such a result has at least `min_rows` rows:
+
+- `text/plain` becomes a compact preview (`format_preview`): schema, first and last rows, and per-column
+  stats computed by Arrow. That's what the model sees.
+- `MIME_TYPE` carries the preview and the path of an Arrow IPC file with the whole table (`export`).
+  The GUI memory-maps that file, so its virtualized table view (gui/table_display_window.py) reads the
+  rows it shows without copying or parsing the rest.
+
+The data itself stays in the kernel, in the variables the code put it in. The Python language is meant
+to run `kernel_setup()` when its kernel starts, and to turn a display bundle with a table in it into
+messages with `table_messages`. The kernel may run in another environment (see EnvironmentResolver)
+without this repo on its `sys.path`, so the setup carries this module's source rather than importing it.
+Without pyarrow in the kernel nothing changes.
+"""
+import os
+import tempfile
+import time
+import uuid
+
+MIME_TYPE = "application/vnd.open-interpreter.table+json"
+DEFAULT_TABLE_PATH = os.path.join(tempfile.gettempdir(), "open-interpreter-tables")
+
+
+
+def kernel_setup(verbose=False):
+    """
+    Code for the kernel that loads this module from its source and installs the formatters. With
+    `verbose`, a failure is printed in the kernel instead of being ignored.
+    """
+    with open(__file__, encoding="utf-8") as f:
+        source = f.read()
+    return f"""
+def _oi_setup_tables():
+    import sys, types
+    module = types.ModuleType("_oi_tabular")
+    module.__file__ = {__file__!r}
+    exec(compile({source!r}, module.__file__, "exec"), module.__dict__)
+    sys.modules[module.__name__] = module
+    module.install(get_ipython())
+try:
+    _oi_setup_tables()
+except Exception:
+    if {bool(verbose)!r}:
+        import traceback
+        print("Couldn't set up table previews:")
+        traceback.print_exc()
+del _oi_setup_tables
+"""
+
+
+def to_arrow(obj, min_rows=50):
+    """
+    Returns a pyarrow.Table for a tabular object with at least `min_rows` rows, or None.
+    """
+    try:
+        import pyarrow as pa
+    except ImportError:
+        return None
+
+    module = type(obj).__module__.split(".")[0]
+    name = type(obj).__name__
+    try:
+        if isinstance(obj, pa.Table):
+            table = obj
+        elif isinstance(obj, pa.RecordBatch):
+            table = pa.Table.from_batches([obj])
+        elif module == "pandas" and name == "DataFrame":
+            if len(obj) < min_rows:
+                return None
+            table = pa.Table.from_pandas(obj)
+        elif module == "pandas" and name == "Series":
+            if len(obj) < min_rows:
+                return None
+            table = pa.Table.from_pandas(obj.to_frame())
+        elif module == "numpy" and name == "ndarray":
+            if obj.ndim == 1:
+                table = pa.table({"value": obj})
+            elif obj.ndim == 2:
+                table = pa.table({str(i): obj[:, i] for i in range(obj.shape[1])})
+            else:
+                return None
+        elif isinstance(obj, (list, tuple)):
+            if len(obj) < min_rows:
+                return None
+            first = obj[0]
+            if isinstance(first, dict):
+                table = pa.Table.from_pylist(list(obj))
+            elif isinstance(first, (list, tuple)):
+                table = pa.table({str(i): column for i, column in enumerate(zip(*obj))})
+            else:
+                table = pa.table({"value": list(obj)})
+        else:
+            return None
+    except (pa.ArrowException, TypeError, ValueError):
+        return None  # E.g. a list of mixed types, shown as it was
+    if table.num_rows < min_rows:
+        return None
+    return table
+
+
+def _plain(value):
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)
+
+
+def preview(table, rows=5):
+    """
+    Returns the schema, first and last `rows` rows, and per-column stats of a pyarrow.Table, as plain data.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    stats = {}
+    for name, column in zip(table.column_names, table.columns):
+        column_stats = {"nulls": column.null_count}
+        kind = column.type
+        try:
+            if pa.types.is_integer(kind) or pa.types.is_floating(kind) or pa.types.is_temporal(kind):
+                extremes = pc.min_max(column).as_py()
+                column_stats["min"] = _plain(extremes["min"])
+                column_stats["max"] = _plain(extremes["max"])
+                if not pa.types.is_temporal(kind):
+                    column_stats["mean"] = pc.mean(column).as_py()
+            elif pa.types.is_string(kind) or pa.types.is_large_string(kind) or pa.types.is_boolean(kind):
+                column_stats["distinct"] = pc.count_distinct(column).as_py()
+        except pa.ArrowException:
+            pass
+        stats[name] = column_stats
+
+    head = table.slice(0, rows).to_pylist()
+    tail = table.slice(max(table.num_rows - rows, rows)).to_pylist()
+    return {
+        "rows": table.num_rows,
+        "columns": table.num_columns,
+        "schema": [[field.name, str(field.type)] for field in table.schema],
+        "head": [{key: _plain(value) for key, value in row.items()} for row in head],
+        "tail": [{key: _plain(value) for key, value in row.items()} for row in tail],
+        "stats": stats,
+    }
+
+
+def _cell(value, width=24):
+    text = "null" if value is None else (f"{value:.6g}" if isinstance(value, float) else str(value))
+    return text if len(text) <= width else text[:width - 1] + "…"
+
+
+def format_preview(table_preview):
+    """
+    The text the model sees instead of the table's repr.
+    """
+    lines = [f"Table: {table_preview['rows']:,} rows x {table_preview['columns']} columns (a preview, the data stays in the kernel)"]
+    for name, kind in table_preview["schema"]:
+        column_stats = table_preview["stats"].get(name, {})
+        details = "  ".join(f"{key} {_cell(value)}" for key, value in column_stats.items())
+        lines.append(f"  {name}: {kind}  {details}")
+
+    names = [name for name, _ in table_preview["schema"]]
+    rows = [[_cell(row.get(name)) for name in names] for row in table_preview["head"] + table_preview["tail"]]
+    widths = [max([len(name)] + [len(row[i]) for row in rows]) for i, name in enumerate(names)]
+    lines.append("  ".join(name.rjust(width) for name, width in zip(names, widths)))
+    for i, row in enumerate(rows):
+        if i == len(table_preview["head"]) and table_preview["tail"] and table_preview["rows"] > len(rows):
+            lines.append("...")
+        lines.append("  ".join(value.rjust(width) for value, width in zip(row, widths)))
+    return "\n".join(lines)
+
+
+def export(table, directory=DEFAULT_TABLE_PATH, keep=50):
+    """
+    Writes the table to an Arrow IPC file (uncompressed, so it can be memory-mapped) and returns its path.
+    Only the `keep` newest files are kept.
+    """
+    import pyarrow as pa
+
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{uuid.uuid4().hex}.arrow")
+    with pa.OSFile(path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+    try:
+        names = [os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(".arrow")]
+        names.sort(key=os.path.getmtime, reverse=True)
+        for old in names[keep:]:
+            if time.time() - os.path.getmtime(old) > 60:  # Not while the GUI may still be opening it
+                os.remove(old)
+    except OSError:
+        pass
+    return path
+
+
+def install(ipython, directory=DEFAULT_TABLE_PATH, min_rows=50, rows=5):
+    """
+    Registers the table formatters in an IPython shell (the kernel's `get_ipython()`).
+    """
+    from IPython.core.formatters import JSONFormatter
+
+    formatters = ipython.display_formatter.formatters
+    tables = JSONFormatter(parent=ipython.display_formatter)
+    tables.format_type = MIME_TYPE
+    formatters[MIME_TYPE] = tables
+    plain = formatters["text/plain"]
+    last = {}  # The preview of the object being formatted, so it's computed once for both formats
+    # Don't keep the last (large) table alive after the cell that displayed it
+    ipython.events.register("post_execute", last.clear)
+
+    def table_preview(obj):
+        if last.get("obj") is not obj:
+            table = to_arrow(obj, min_rows)
+            last.clear()
+            last.update(obj=obj, table=table, preview=preview(table, rows) if table is not None else None)
+        return last["table"], last["preview"]
+
+    def as_json(obj):
+        table, table_preview_ = table_preview(obj)
+        if table is None:
+            return None
+        return {"path": export(table, directory), "preview": table_preview_}
+
+    def register(module, name, cls=None):
+        default = None
+        if cls is not None:
+            try:
+                default = plain.lookup_by_type(cls)
+            except KeyError:
+                pass
+
+        def as_text(obj, p, cycle):
+            _, table_preview_ = table_preview(obj)
+            if table_preview_ is not None:
+                p.text(format_preview(table_preview_))
+            elif default is not None:
+                default(obj, p, cycle)
+            else:
+                p.text(repr(obj))
+
+        if cls is not None:
+            plain.for_type(cls, as_text)
+            tables.for_type(cls, as_json)
+        else:
+            plain.for_type_by_name(module, name, as_text)
+            tables.for_type_by_name(module, name, as_json)
+
+    # pandas 3 reports its classes as `pandas.DataFrame`, older versions by the module they're defined in
+    register("pandas", "DataFrame")
+    register("pandas.core.frame", "DataFrame")
+    register("pandas", "Series")
+    register("pandas.core.series", "Series")
+    register("numpy", "ndarray")
+    register("pyarrow.lib", "Table")
+    register("pyarrow.lib", "RecordBatch")
+    register(None, None, list)
+    register(None, None, tuple)
+
+
+def table_messages(data):
+    """
+    Returns the messages for a display bundle (`execute_result` / `display_data` data) with a table in it,
+    or None. The model gets the preview, the GUI the file to show. Checked before the bundle's other formats
+    (a DataFrame also has `text/html`).
+    """
+    table = data.get(MIME_TYPE)
+    if not table:
+        return None
+    return [
+        {
+            "type": "console",
+            "format": "output",
+            "content": data.get("text/plain") or format_preview(table["preview"]),
+            "recipient": "both",
+        },
+        {
+            "type": "table",
+            "format": "arrow",
+            "content": table["path"],
+            "recipient": "user",
+        },
+    ]
@@ -0,0 +1,116 @@
+"""
+Starts a language's kernel while the code for it is still being generated.
+
+`Terminal.run` creates a language (and starts its kernel, which for Jupyter-based languages takes
+seconds) the first time code in it runs, after the model has finished writing the block and the user
+has confirmed it. `_respond_and_store` calls `KernelWarmer.warm` as soon as a code block starts
+streaming, so the kernel starts on a background thread while the rest of the block is generated, and
+`wait` right before the block runs. The language is created the same way `Terminal.run` would create
+it, and put where `Terminal.run` looks for it, so it's used instead of starting another one. That dict
+is written from the warming thread, so everything that runs code (`Computer.run`, `Computer.exec` and
+`ExecutionScheduler`) calls `wait` through `Computer.wait_for_kernel` before `Terminal.run` reads it.
+
+`stats` reports, per language, how long startup took and how much of it overlapped with generation.
+This relies on the terminal's `_active_languages` dict and `get_language`. With a terminal that has
+neither, `warm` and `wait` do nothing (see `python -m core.benchmark --warmup 10`).
+"""
+import threading
+import time
+
+
+class KernelWarmer:
+    def __init__(self, computer):
+        self.computer = computer
+        self.timings = {}  # language -> {"startup", "saved"}
+        self._warming = {}  # language -> (thread, started at)
+        self._lock = threading.Lock()
+        self._unsupported_reported = False
+
+    def supported(self):
+        """
+        Whether the terminal creates languages the way this expects, so a warmed one would be used.
+        """
+        terminal = getattr(self.computer, "terminal", None)
+        return isinstance(getattr(terminal, "_active_languages", None), dict) and callable(
+            getattr(terminal, "get_language", None)
+        )
+
+    def warm(self, language):
+        if not language:
+            return
+        if not self.supported():
+            if self.computer.verbose and not self._unsupported_reported:
+                print("Not warming up kernels, the terminal has no _active_languages or get_language")
+            self._unsupported_reported = True
+            return
+        language = language.lower().strip()  # As respond() passes it to Terminal.run
+        terminal = self.computer.terminal
+        with self._lock:
+            warming = self._warming.get(language)
+            if warming is not None and not warming[0].is_alive() and language not in terminal._active_languages:
+                self._warming.pop(language)  # Warmed, then terminated before it was used
+            if language in terminal._active_languages or language in self._warming:
+                return
+            language_class = terminal.get_language(language)
+            if language_class is None:
+                return
+            thread = threading.Thread(target=self._start, args=(language, language_class), daemon=True)
+            self._warming[language] = (thread, time.perf_counter())
+        thread.start()
+
+    def wait(self, language, timeout=None):
+        """
+        Blocks until a kernel that's warming up is ready, so `Terminal.run` doesn't start a second one.
+        """
+        if not language:
+            return
+        language = language.lower().strip()
+        with self._lock:
+            warming = self._warming.get(language)
+        if warming is None:
+            return
+        thread, started = warming
+        waited_from = time.perf_counter()
+        thread.join(timeout)
+
+        with self._lock:
+            timing = self.timings.get(language)
+            if timing is not None and "saved" not in timing:
+                # The part of startup that didn't happen while we waited
+                timing["saved"] = max(0.0, timing["startup"] - (time.perf_counter() - waited_from))
+            self._warming.pop(language, None)
+
+    def stats(self):
+        with self._lock:
+            return {language: dict(timing) for language, timing in self.timings.items()}
+
+    def _start(self, language, language_class):
+        started = time.perf_counter()
+        try:
+            # Same as Terminal.run: pass in the computer if the language takes it
+            if language_class.__init__.__code__.co_argcount > 1:
+                instance = language_class(self.computer)
+            else:
+                instance = language_class()
+        except Exception as e:
+            if self.computer.verbose:
+                print(f"Failed to warm up {language}: {e}")
+            return
+
+        terminal = self.computer.terminal
+        with self._lock:
+            if language in terminal._active_languages:
+                # Started by Terminal.run in the meantime, don't leave a second kernel running
+                duplicate = instance
+            else:
+                terminal._active_languages[language] = instance
+                duplicate = None
+            self.timings[language] = {"startup": time.perf_counter() - started}
+
+        if duplicate is not None:
+            try:
+                duplicate.terminate()
+            except Exception:
+                pass
+        elif self.computer.verbose:
+            print(f"Warmed up {language} in {self.timings[language]['startup']:.2f}s")
@@ -0,0 +1,189 @@
+"""
+An SQLite index over the saved conversations in `conversation_history_path`.
+
+`_save_conversation` indexes each conversation as it's written, so listing and full-text search never
+have to open the JSON files. `sync` picks up files that were added, changed or deleted outside of
+the interpreter. A conversation's messages are only read from disk when it's opened with `load`.
+"""
+import json
+import os
+import sqlite3
+from datetime import datetime
+
+CATALOG_FILE = ".catalog.db"
+
+
+def _message_text(messages):
+    # Skip images, their content is a path or base64
+    return "\n".join(
+        message["content"]
+        for message in messages
+        if isinstance(message.get("content"), str) and message.get("type") != "image" and not message.get("blob")
+    )
+
+
+def _title(messages, filename):
+    for message in messages:
+        if message.get("role") == "user" and isinstance(message.get("content"), str) and not message.get("blob"):
+            title = " ".join(message["content"].split())
+            if title:
+                return title[:80]
+    return filename.rsplit("__", 1)[0].replace("_", " ")
+
+
+class ConversationCatalog:
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.database_file = os.path.join(directory, CATALOG_FILE)
+        self.full_text = True
+        self.setup_database()
+
+    def _connect(self):
+        return sqlite3.connect(self.database_file)
+
+    def setup_database(self):
+        conn = self._connect()
+        c = conn.cursor()
+        c.execute(
+            """CREATE TABLE IF NOT EXISTS conversations
+               (filename TEXT PRIMARY KEY,
+                title TEXT,
+                created TEXT,
+                updated TEXT,
+                model TEXT,
+                message_count INTEGER,
+                token_count INTEGER,
+                mtime REAL,
+                content TEXT)"""
+        )
+        c.execute("CREATE INDEX IF NOT EXISTS conversations_updated ON conversations (updated)")
+        try:
+            c.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS conversations_fts USING fts5(title, content)"
+            )
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5, search falls back to LIKE
+            self.full_text = False
+        conn.commit()
+        conn.close()
+
+    def index_conversation(self, filename, messages, model=None):
+        conn = self._connect()
+        self._index(conn.cursor(), filename, messages, model)
+        conn.commit()
+        conn.close()
+
+    def remove(self, filename):
+        conn = self._connect()
+        self._remove(conn.cursor(), filename)
+        conn.commit()
+        conn.close()
+
+    def sync(self):
+        """
+        Brings the index up to date with the directory, only reading files whose mtime changed.
+        """
+        conn = self._connect()
+        c = conn.cursor()
+        indexed = dict(c.execute("SELECT filename, mtime FROM conversations").fetchall())
+
+        on_disk = set()
+        for entry in os.scandir(self.directory):
+            if not entry.is_file() or not entry.name.endswith(".json"):
+                continue
+            on_disk.add(entry.name)
+            if indexed.get(entry.name) == entry.stat().st_mtime:
+                continue
+            try:
+                with open(entry.path, "r") as f:
+                    messages = json.load(f)
+            except (OSError, ValueError):
+                continue
+            self._index(c, entry.name, messages)
+
+        for filename in set(indexed) - on_disk:
+            self._remove(c, filename)
+
+        conn.commit()
+        conn.close()
+
+    def _index(self, c, filename, messages, model=None):
+        path = os.path.join(self.directory, filename)
+        mtime = os.path.getmtime(path) if os.path.exists(path) else None
+        # When the file was written, not when it was indexed (`sync` may index old files much later)
+        updated = (datetime.fromtimestamp(mtime) if mtime is not None else datetime.now()).strftime("%Y-%m-%d %H:%M:%S")
+        title = _title(messages, filename)
+        content = _message_text(messages)
+        token_count = len(content) // 4  # Rough estimate, ~4 characters per token
+
+        row = c.execute("SELECT rowid, created FROM conversations WHERE filename = ?", (filename,)).fetchone()
+        created = row[1] if row else updated
+        # The full-text row shares the conversation's rowid
+        if row and self.full_text:
+            c.execute("DELETE FROM conversations_fts WHERE rowid = ?", (row[0],))
+        c.execute(
+            """INSERT OR REPLACE INTO conversations
+               (filename, title, created, updated, model, message_count, token_count, mtime, content)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            # The content column is only needed for the LIKE fallback
+            (filename, title, created, updated, model, len(messages), token_count, mtime, None if self.full_text else content),
+        )
+        if self.full_text:
+            c.execute(
+                "INSERT INTO conversations_fts (rowid, title, content) VALUES (?, ?, ?)",
+                (c.lastrowid, title, content),
+            )
+
+    def _remove(self, c, filename):
+        row = c.execute("SELECT rowid FROM conversations WHERE filename = ?", (filename,)).fetchone()
+        if row:
+            c.execute("DELETE FROM conversations WHERE rowid = ?", (row[0],))
+            if self.full_text:
+                c.execute("DELETE FROM conversations_fts WHERE rowid = ?", (row[0],))
+
+    def list(self, limit=200, offset=0):
+        """
+        Returns (filename, title, updated, model, message_count, token_count) rows, newest first.
+        """
+        conn = self._connect()
+        rows = conn.execute(
+            """SELECT filename, title, updated, model, message_count, token_count FROM conversations
+               ORDER BY updated DESC LIMIT ? OFFSET ?""",
+            (limit, offset),
+        ).fetchall()
+        conn.close()
+        return rows
+
+    def search(self, query, limit=200, offset=0):
+        """
+        Full-text search over titles and message text. Returns the same rows as `list`, best match first.
+        """
+        terms = query.split()
+        if not terms:
+            return self.list(limit, offset)
+
+        conn = self._connect()
+        if self.full_text:
+            # Quote each term and prefix-match it, so user input can't break the FTS syntax
+            match = " ".join('"' + term.replace('"', '""') + '"*' for term in terms)
+            rows = conn.execute(
+                """SELECT c.filename, c.title, c.updated, c.model, c.message_count, c.token_count
+                   FROM conversations_fts f JOIN conversations c ON c.rowid = f.rowid
+                   WHERE conversations_fts MATCH ? ORDER BY rank LIMIT ? OFFSET ?""",
+                (match, limit, offset),
+            ).fetchall()
+        else:
+            where = " AND ".join("(title LIKE ? OR content LIKE ?)" for _ in terms)
+            params = [value for term in terms for value in (f"%{term}%", f"%{term}%")]
+            rows = conn.execute(
+                f"""SELECT filename, title, updated, model, message_count, token_count FROM conversations
+                    WHERE {where} ORDER BY updated DESC LIMIT ? OFFSET ?""",
+                params + [limit, offset],
+            ).fetchall()
+        conn.close()
+        return rows
+
+    def load(self, filename):
+        with open(os.path.join(self.directory, filename), "r") as f:
+            return json.load(f)
@@ -15,25 +15,114 @@ from .default_system_message import default_system_message
 from .respond import respond
 from .utils.telemetry import send_telemetry
 from .utils.truncate_output import truncate_output
+from .utils.environments import EnvironmentResolver
+from .conversation_catalog import ConversationCatalog
+from .loop_controller import LoopController
+from .blob_store import BlobStore, DEFAULT_BLOB_PATH
+from .frame_filter import FrameFilter
+from .computer.terminal.warmup import KernelWarmer
+from terminal_interface.utils.oi_dir import oi_dir
 from PyQt6.QtCore import QObject, pyqtSignal
 import requests
 import builtins
 from .workspace import Workspace
 
+DEFAULT_CONVERSATION_HISTORY_PATH = os.path.join(oi_dir, "conversations")
+
 class FileOperationTracker(QObject):
-    file_operation = pyqtSignal(str, str, str)
+    """
+    Reports files opened for writing and written to by code run through `run_code`.
+
+    Operations on a file are batched for `window` seconds, and a batch carries the number of writes,
+    their total size in bytes and a preview of at most `preview_size` characters, never the written data itself
+    (a loop writing 100 MB would otherwise push all of it through queued signals). Displays read the
+    file from disk if they need more. `file_operations` carries each batch as a dict.
+    """
+    file_operations = pyqtSignal(dict)
+
+    def __init__(self, window=0.25, preview_size=2000):
+        super().__init__()
+        self.window = window
+        self.preview_size = preview_size
+        self.batches = {}  # Path -> batch being collected
+        self.timers = {}  # Path -> timer that flushes its batch when the window is over
+        self.lock = threading.Lock()
 
     def open(self, file, mode='r', *args, **kwargs):
         f = builtins.open(file, mode, *args, **kwargs)
         if 'w' in mode or 'a' in mode:
-            self.file_operation.emit('open', file, f'File opened in {mode} mode')
+            self.record('open', file, mode=mode)
         return f
 
     def write(self, f, data):
         result = f.write(data)
-        self.file_operation.emit('write', f.name, data)
+        self.record('write', f.name, data=data)
         return result
 
+    def record(self, operation, path, mode=None, data=None):
+        path = os.path.abspath(path)
+        now = time.time()
+        with self.lock:
+            batch = self.batches.get(path)
+            if batch is None:
+                batch = self.batches[path] = {
+                    "path": path,
+                    "operations": [],
+                    "mode": None,
+                    "writes": 0,
+                    "size": 0,  # Bytes, text is counted as UTF-8
+                    "preview": "",
+                    "truncated": False,  # Whether the preview is missing some of the data
+                    "started": now,
+                }
+                # Flushed after the window even if nothing else is written, e.g. one write and then a long
+                # computation. A threading.Timer rather than a QTimer: the backend process has no event loop
+                timer = self.timers[path] = threading.Timer(self.window, self._expire, args=(path, batch))
+                timer.daemon = True
+                timer.start()
+            if operation not in batch["operations"]:
+                batch["operations"].append(operation)
+            if mode is not None:
+                batch["mode"] = mode
+            if data is not None:
+                batch["writes"] += 1
+                batch["size"] += len(data.encode("utf-8", errors="replace")) if isinstance(data, str) else len(data)
+                room = self.preview_size - len(batch["preview"])
+                if room > 0:
+                    head = data[:room]
+                    batch["preview"] += head if isinstance(head, str) else head.decode("utf-8", errors="replace")
+                if len(data) > max(room, 0):
+                    batch["truncated"] = True
+            due = now - batch["started"] >= self.window
+        if due:
+            self.flush(path)
+
+    def _expire(self, path, batch):
+        with self.lock:
+            if self.batches.get(path) is not batch:
+                return  # Already flushed
+        self.flush(path)
+
+    def flush(self, path=None):
+        """
+        Emits the batch for `path`, or every batch. Called when a batch's window is over, and after code runs.
+        """
+        with self.lock:
+            if path is None:
+                batches = list(self.batches.values())
+                timers = list(self.timers.values())
+                self.batches = {}
+                self.timers = {}
+            else:
+                batch = self.batches.pop(path, None)
+                batches = [batch] if batch is not None else []
+                timers = [self.timers.pop(path)] if path in self.timers else []
+        for timer in timers:
+            timer.cancel()
+
+        for batch in batches:
+            self.file_operations.emit(batch)
+
 class OpenInterpreter:
     """
     This class (one instance is called an `interpreter`) is the "grand central station" of this project.
@@ -71,10 +160,13 @@ class OpenInterpreter:
                 "Let me know what you'd like to do next.",
                 "Please provide more information.",
             ],
+            loop_done_function=True,
+            prewarm_kernels=True,
             disable_telemetry=os.getenv("DISABLE_TELEMETRY", "false").lower() == "true",
             in_terminal_interface=False,
             conversation_history=True,
             conversation_filename=None,
+            conversation_history_path=DEFAULT_CONVERSATION_HISTORY_PATH,
             os=False,
             speak_messages=False,
             llm=None,
@@ -101,8 +193,9 @@ class OpenInterpreter:
 
         self.messages = [] if messages is None else messages
         self.responding = False
+        self.stop_event = threading.Event()  # Set by `stop` to cancel the current turn
         self.last_messages_count = 0
-        self.file_operation = self.file_tracker.file_operation
+        self.file_operations = self.file_tracker.file_operations
         # Settings
         self.offline = offline
         self.auto_run = auto_run
@@ -120,10 +213,17 @@ class OpenInterpreter:
         self.loop = loop
         self.loop_message = loop_message
         self.loop_breakers = loop_breakers
+        self.loop_done_function = loop_done_function  # Offer a `task_done` function instead of a final "The task is done." turn
+        self.loop_controller = None  # Set while responding in loop mode
+
+        # Start a language's kernel as soon as a code block in it starts streaming
+        self.prewarm_kernels = prewarm_kernels
 
         # Conversation history
         self.conversation_history = conversation_history
         self.conversation_filename = conversation_filename
+        self.conversation_history_path = conversation_history_path
+        self._conversation_catalog = None
 
         # OS control mode related attributes
         self.os = os
@@ -133,6 +233,17 @@ class OpenInterpreter:
         self.computer = Computer(self) if computer is None else computer
         self.sync_computer = sync_computer
         self.computer.import_computer_api = import_computer_api
+        self.kernel_warmer = KernelWarmer(self.computer)
+
+        # Images and large outputs in `messages` are kept here, and referenced (None keeps them inline)
+        self.blobs = BlobStore(DEFAULT_BLOB_PATH)
+
+        # In OS mode, screenshots that didn't change are dropped (and with crop=True, cropped to the change)
+        self.frame_filter = FrameFilter()
+
+        # Python environment that kernels start in (None is the system Python)
+        self.environments = EnvironmentResolver()
+        self.environment = None
 
         # Skills
         if skills_path:
@@ -175,6 +286,24 @@ class OpenInterpreter:
             time.sleep(0.2)
         return self.messages[self.last_messages_count:]
 
+    def stop(self):
+        """
+        Cancels the current turn. Closes the LLM's HTTP stream and interrupts running code,
+        then `_respond_and_store` flushes the partial messages and returns.
+        Safe to call from another thread.
+        """
+        self.stop_event.set()
+        self.llm.cancel()
+        self.computer.stop()
+
+    def reset_stop(self):
+        """
+        Clears a `stop` meant for an earlier turn. Called by whoever accepts the next turn (like the GUI's
+        TurnScheduler) before starting it, not by `chat`: a `stop` that arrives after the turn was accepted
+        but before `chat` runs must still cancel it. `_respond_and_store` clears it at the end of a turn.
+        """
+        self.stop_event.clear()
+
     def chat(self, message=None, display=True, stream=False, blocking=True):
         try:
             self.responding = True
@@ -229,6 +358,8 @@ class OpenInterpreter:
             print(f"Error running code: {str(e)}")  # Debug print
             raise
         finally:
+            # Report the file operations still waiting for their batch window to end
+            self.file_tracker.flush()
             # Change back to original working directory
             os.chdir(original_cwd)
 
@@ -291,6 +422,18 @@ class OpenInterpreter:
         self.last_messages_count = len(self.messages)
         return message
 
+    @property
+    def conversation_catalog(self):
+        """
+        Index of the saved conversations in `conversation_history_path`, see ConversationCatalog
+        """
+        if (
+            self._conversation_catalog is None
+            or self._conversation_catalog.directory != self.conversation_history_path
+        ):
+            self._conversation_catalog = ConversationCatalog(self.conversation_history_path)
+        return self._conversation_catalog
+
     def _save_conversation(self):
         if self.conversation_history and not self.conversation_filename:
             first_few_words = self._get_first_few_words()
@@ -302,6 +445,9 @@ class OpenInterpreter:
                 os.makedirs(self.conversation_history_path)
             with open(os.path.join(self.conversation_history_path, self.conversation_filename), "w") as f:
                 json.dump(self.messages, f)
+            self.conversation_catalog.index_conversation(
+                self.conversation_filename, self.messages, model=self.llm.model
+            )
 
     def _get_first_few_words(self):
         content = self.messages[0]["content"][:25]
@@ -315,19 +461,20 @@ class OpenInterpreter:
     def chat(self, message=None, display=True, stream=False, blocking=True):
         try:
             self.responding = True
-            message = self._handle_message(message)
 
             if not blocking:
                 threading.Thread(target=self.chat, args=(message, display, stream, True)).start()
                 return
 
+            # Added to the history once, here, so `_streaming_chat` gets no message
+            self._handle_message(message)
+
             if stream:
-                return self._streaming_chat(message=message, display=display)
+                return self._streaming_chat(display=display)
 
-            for _ in self._streaming_chat(message=message, display=display):
+            for _ in self._streaming_chat(display=display):
                 pass
 
-            self._save_conversation()
             self.responding = False
             return self.messages[self.last_messages_count:]
 
@@ -343,6 +490,9 @@ class OpenInterpreter:
             if display:
                 yield chunk
 
+        # Saved here so streaming callers (like the GUI) get their conversations saved and indexed too
+        self._save_conversation()
+
     def get_conversation_history(self):
         """
         Returns the current conversation history.
@@ -375,11 +525,17 @@ class OpenInterpreter:
             return "format" in chunk and chunk["format"] == "active_line"
 
         last_flag_base = None
+        self.loop_controller = LoopController(self.loop_breakers) if self.loop else None
+        stream = respond(self)
 
         try:
-            for chunk in respond(self):
-                # For async usage
-                if hasattr(self, "stop_event") and self.stop_event.is_set():
+            while True:
+                # Cancelled with `stop`, stop pulling and flush what we have. Checked before each pull too, as
+                # the first one sends the request and waits for the first token
+                if self.stop_event.is_set():
+                    break
+                chunk = next(stream, None)
+                if chunk is None or self.stop_event.is_set():
                     break
 
                 if chunk["content"] == "":
@@ -395,6 +551,12 @@ class OpenInterpreter:
                     if self.auto_run == False:
                         yield chunk
 
+                    # The code runs once we pull again, let its kernel finish starting first
+                    if isinstance(chunk["content"], dict):
+                        self.kernel_warmer.wait(chunk["content"].get("format"))
+
+                    self._finish_message()
+
                     # We want to append this now, so even if content is never filled, we know that the execution didn't produce output.
                     # ... rethink this though.
                     self.messages.append(
@@ -439,6 +601,12 @@ class OpenInterpreter:
 
                     yield {**last_flag_base, "start": True}
 
+                    self._finish_message()
+
+                    # A code block started, start its kernel while the rest of it streams in
+                    if self.prewarm_kernels and chunk["type"] == "code" and "format" in chunk:
+                        self.kernel_warmer.warm(chunk["format"])
+
                     # Add the chunk as a new message
                     if not is_active_line_chunk(chunk):
                         self.messages.append(chunk)
@@ -446,6 +614,10 @@ class OpenInterpreter:
                 # Yield the chunk itself
                 yield chunk
 
+                # In loop mode, stop generating as soon as a loop breaker has been said
+                if self.loop_controller is not None and self.loop_controller.feed(chunk):
+                    break
+
                 # Truncate output if it's console output
                 if chunk["type"] == "console" and chunk["format"] == "output":
                     self.messages[-1]["content"] = truncate_output(
@@ -460,10 +632,54 @@ class OpenInterpreter:
                 yield {**last_flag_base, "end": True}
         except GeneratorExit:
             raise  # gotta pass this up!
+        except Exception:
+            # Closing the HTTP stream from `stop` makes the pending read fail
+            if not self.stop_event.is_set():
+                raise
+            if last_flag_base:
+                yield {**last_flag_base, "end": True}
+        finally:
+            # Closes the completion stream (and anything else respond() holds) right away
+            stream.close()
+            self.loop_controller = None
+            self._finish_message()
+            # The turn is over, so the next one isn't cancelled by this turn's `stop`
+            self.stop_event.clear()
+
+    def _finish_message(self):
+        """
+        Called when the last message is complete. Drops or crops a screenshot that barely changed (OS mode),
+        then moves images and large outputs to the blob store.
+        """
+        if not self.messages:
+            return
+        first = len(self.messages) - 1
+        if self.os and self.frame_filter is not None and self.messages[-1].get("type") == "image":
+            if not any(message.get("type") == "image" for message in self.messages[:-1]):
+                self.frame_filter.reset()  # The model no longer has the frame it would be compared with
+            self.messages[first:] = self.frame_filter.filter(self.messages[-1])
+        if self.blobs is None:
+            return
+        for index in range(first, len(self.messages)):
+            try:
+                self.messages[index] = self.blobs.store(self.messages[index])
+            except OSError as e:
+                print(f"Failed to store message content as a blob: {e}")  # Kept inline
+
+    def collect_blobs(self):
+        """
+        Deletes stored images and outputs that no saved conversation refers to anymore.
+        """
+        if self.blobs is None:
+            return 0
+        return self.blobs.collect([self.conversation_history_path], self.messages)
 
     def reset(self):
         self.computer.terminate()  # Terminates all languages
         self.computer._has_imported_computer_api = False  # Flag reset
         self.messages = []
         self.last_messages_count = 0
+        self.llm.compactor.reset()
+        if self.frame_filter is not None:
+            self.frame_filter.reset()
 
@@ -0,0 +1,187 @@
+"""
+Skips or crops OS-mode screenshots that barely changed since the last one sent to the LLM.
+
+In OS mode, the model looks at the screen after every action, and most actions change little or nothing
+of it. `FrameFilter` reduces each screenshot to a `grid` x `grid` thumbnail of mean luminances (`Frame`),
+and compares it with the last frame it let through:
+
+- A dHash of the thumbnail rejects most different screens cheaply (a window switch, a new page). Those
+  frames are sent whole.
+- Otherwise, the thumbnail cells that changed by more than `tolerance` give the changed region. Without
+  any, the screenshot is replaced with a short note that the screen is unchanged.
+- With `crop`, a changed region of at most `max_crop_area` of the screen is sent alone, at full
+  resolution, as a `"crop": [left, top, right, bottom]` image. After `max_crops` crops in a row a whole
+  frame is sent again, so the model's picture of the screen doesn't drift (`Llm.run` keeps the last two
+  whole screenshots and the crops after them).
+
+The comparison only needs the thumbnails, so it can be tested with synthetic frames
+(`Frame.from_pixels`, see `python -m core.benchmark --frames 200`).
+"""
+import base64
+import io
+
+
+def box_means(pixels, width, height, columns, rows):
+    """
+    Downsamples a grayscale image (a flat list, row by row) to `columns` x `rows` mean values.
+    """
+    means = []
+    for row in range(rows):
+        y0 = row * height // rows
+        y1 = max((row + 1) * height // rows, y0 + 1)
+        for column in range(columns):
+            x0 = column * width // columns
+            x1 = max((column + 1) * width // columns, x0 + 1)
+            total = 0
+            for y in range(y0, y1):
+                offset = y * width
+                total += sum(pixels[offset + x0:offset + x1])
+            means.append(total / ((y1 - y0) * (x1 - x0)))
+    return means
+
+
+def dhash(cells, grid, hash_size=8):
+    """
+    Difference hash: one bit per horizontally adjacent pair of a (hash_size + 1) x hash_size downsample.
+    """
+    means = box_means(cells, grid, grid, hash_size + 1, hash_size)
+    value = 0
+    for row in range(hash_size):
+        for column in range(hash_size):
+            left = means[row * (hash_size + 1) + column]
+            value = (value << 1) | (left < means[row * (hash_size + 1) + column + 1])
+    return value
+
+
+class Frame:
+    __slots__ = ("width", "height", "grid", "cells", "hash")
+
+    def __init__(self, width, height, grid, cells, hash_size=8):
+        self.width = width
+        self.height = height
+        self.grid = grid
+        self.cells = cells
+        self.hash = dhash(cells, grid, hash_size)
+
+    @classmethod
+    def from_pixels(cls, pixels, width, height, grid=32, hash_size=8):
+        return cls(width, height, grid, box_means(pixels, width, height, grid, grid), hash_size)
+
+    @classmethod
+    def from_image(cls, image, grid=32, hash_size=8):
+        """
+        From a PIL image, downsampled in C.
+        """
+        from PIL import Image
+
+        thumbnail = image.convert("L").resize((grid, grid), Image.BOX)
+        return cls(image.width, image.height, grid, list(thumbnail.getdata()), hash_size)
+
+    def box(self, cells, margin=1):
+        """
+        The pixel box (left, top, right, bottom) that covers the given cell indexes, plus `margin` cells.
+        """
+        columns = [cell % self.grid for cell in cells]
+        rows = [cell // self.grid for cell in cells]
+        left = max(min(columns) - margin, 0)
+        top = max(min(rows) - margin, 0)
+        right = min(max(columns) + 1 + margin, self.grid)
+        bottom = min(max(rows) + 1 + margin, self.grid)
+        return (
+            left * self.width // self.grid,
+            top * self.height // self.grid,
+            right * self.width // self.grid,
+            bottom * self.height // self.grid,
+        )
+
+
+class FrameFilter:
+    def __init__(self, grid=32, hash_size=8, hash_distance=12, tolerance=1.0, crop=False, max_crop_area=0.25, max_crops=4):
+        self.grid = grid
+        self.hash_size = hash_size
+        self.hash_distance = hash_distance  # Hashes further apart than this are different screens
+        self.tolerance = tolerance  # Mean luminance change of a cell that counts as a change
+        self.crop = crop
+        self.max_crop_area = max_crop_area
+        self.max_crops = max_crops
+        self.reset()
+
+        self.frames = 0
+        self.skipped = 0
+        self.cropped = 0
+
+    def reset(self):
+        """
+        Forgets the last frame, e.g. when the messages it was sent in are gone.
+        """
+        self.last = None
+        self.crops = 0
+
+    def compare(self, frame):
+        """
+        Returns ("new", None), ("unchanged", None) or ("changed", box), against the last frame let through.
+        """
+        last = self.last
+        if last is None or (last.width, last.height, last.grid) != (frame.width, frame.height, frame.grid):
+            return "new", None
+        if bin(last.hash ^ frame.hash).count("1") > self.hash_distance:
+            return "new", None
+        changed = [i for i, (a, b) in enumerate(zip(last.cells, frame.cells)) if abs(a - b) > self.tolerance]
+        if not changed:
+            return "unchanged", None
+        return "changed", frame.box(changed)
+
+    def decide(self, frame):
+        """
+        Returns "skip", ("crop", box) or "send" for the next frame, and remembers it if it's let through.
+        """
+        self.frames += 1
+        kind, box = self.compare(frame)
+        if kind == "unchanged":
+            self.skipped += 1
+            return "skip"
+        if kind == "changed" and self.crop and self.crops < self.max_crops:
+            left, top, right, bottom = box
+            if (right - left) * (bottom - top) <= self.max_crop_area * frame.width * frame.height:
+                # The crop carries every change, so the model's picture now matches this frame
+                self.last = frame
+                self.crops += 1
+                self.cropped += 1
+                return ("crop", box)
+        self.last = frame
+        self.crops = 0
+        return "send"
+
+    def filter(self, message):
+        """
+        Returns the messages to keep in place of a screenshot message.
+        """
+        if message.get("type") != "image" or not str(message.get("format", "")).startswith("base64"):
+            return [message]
+        try:
+            from PIL import Image
+
+            image = Image.open(io.BytesIO(base64.b64decode(message["content"])))
+            image.load()
+            decision = self.decide(Frame.from_image(image, self.grid, self.hash_size))
+        except Exception as e:
+            print(f"FrameFilter: Couldn't compare the screenshot: {str(e)}")  # Debug print
+            return [message]
+
+        if decision == "send":
+            return [message]
+        note = {"role": message.get("role", "computer"), "type": "console", "format": "output"}
+        if decision == "skip":
+            return [{**note, "content": "The screen hasn't changed since the last screenshot."}]
+
+        box = decision[1]
+        output = io.BytesIO()
+        image.crop(box).save(output, format="PNG")
+        return [
+            {
+                **note,
+                "content": f"Only part of the screen changed since the last screenshot. This is the region from "
+                f"({box[0]}, {box[1]}) to ({box[2]}, {box[3]}), at full resolution:",
+            },
+            {**message, "format": "base64.png", "content": base64.b64encode(output.getvalue()).decode("utf-8"), "crop": list(box)},
+        ]
@@ -0,0 +1,183 @@
+"""
+Streaming markdown code fence detection, for models without function calling.
+
+`run_text_llm` has to turn a stream of text into message and code chunks. `CodeFenceParser` does it
+in one pass over each delta: the text of a line is passed through as soon as it arrives, and only
+the start of a line (indentation and backticks, which could be a fence) is held back until it's
+clear whether it is one. Nothing that was already emitted is scanned again.
+
+- A fence is 3 or more backticks at the start of a line (after optional indentation), and the rest
+  of the opening line is its language tag. The default language is used when there is none.
+- A block is closed by a line of at least as many backticks as it was opened with, so ``` inside a
+  ```` block is code, as are backticks that don't start a line.
+- The newline before the closing fence isn't part of the code.
+- `finish` ends an unterminated block at the end of the stream.
+
+`feed` and `finish` return chunks: `{"type": "message", "content": ...}` for text, and for each code
+block `{"type": "code", "format": language, "start": True}`, its content chunks, then `"end": True`.
+"""
+
+# Modes
+_MESSAGE = 0
+_OPENING = 1  # In the language tag of an opening fence
+_CODE = 2
+_CLOSING = 3  # After what could be a closing fence, waiting to see if the rest of the line is blank
+
+
+class CodeFenceParser:
+    def __init__(self, default_language="python"):
+        self.default_language = default_language
+        self.language = None
+        self._mode = _MESSAGE
+        self._line_start = True
+        self._pending = ""  # Start of the current line, held back in case it's a fence
+        self._ticks = 0  # Backticks in _pending
+        self._fence = 0  # Backticks the current block was opened with
+        self._info = ""
+        self._newline = False  # Newline held back in code, in case the next line closes the block
+        self._chunks = []
+
+    def feed(self, text):
+        i = 0
+        n = len(text)
+
+        while i < n:
+            mode = self._mode
+
+            if mode == _OPENING:
+                end = text.find("\n", i)
+                if end == -1:
+                    self._info += text[i:]
+                    break
+                self._info += text[i:end]
+                i = end + 1
+                self._open()
+                continue
+
+            if mode == _CLOSING:
+                while i < n and text[i] in " \t\r":
+                    self._pending += text[i]
+                    i += 1
+                if i == n:
+                    break
+                if text[i] == "\n":
+                    i += 1
+                    self._close()
+                else:
+                    # Not a closing fence after all
+                    self._mode = _CODE
+                    self._flush_pending()
+                continue
+
+            if self._line_start:
+                # Collect indentation and backticks until something else shows up
+                while i < n:
+                    char = text[i]
+                    if char == "`":
+                        self._ticks += 1
+                    elif char not in " \t" or self._ticks:
+                        break
+                    self._pending += char
+                    i += 1
+                if i == n:
+                    break
+
+                if mode == _MESSAGE and self._ticks >= 3:
+                    self._mode = _OPENING
+                    self._fence = self._ticks
+                    self._info = ""
+                    self._pending = ""
+                    self._ticks = 0
+                    self._line_start = False
+                elif mode == _CODE and self._ticks >= self._fence:
+                    self._mode = _CLOSING
+                    self._line_start = False
+                else:
+                    self._flush_pending()
+                continue
+
+            # In the middle of a line, pass everything up to the next newline through
+            end = text.find("\n", i)
+            if end == -1:
+                self._emit(text[i:])
+                break
+            if mode == _MESSAGE:
+                self._emit(text[i:end + 1])
+            else:
+                self._emit(text[i:end])
+                self._newline = True
+            self._line_start = True
+            i = end + 1
+
+        return self._take()
+
+    def finish(self):
+        """
+        Ends the stream, flushing what was held back and closing an unterminated block.
+        """
+        mode = self._mode
+        if mode == _OPENING or mode == _MESSAGE and self._ticks >= 3:
+            # A fence with nothing after it
+            self._mode = _MESSAGE
+            self._info = ""
+            self._pending = ""
+            self._ticks = 0
+        elif mode == _CLOSING or mode == _CODE and self._ticks >= self._fence:
+            self._close()
+        else:
+            if self._pending:
+                self._flush_pending()
+            if self._mode == _CODE:
+                self._close()
+        return self._take()
+
+    def _open(self):
+        tag = self._info.split()
+        self.language = tag[0] if tag else self.default_language
+        self._info = ""
+        self._mode = _CODE
+        self._line_start = True
+        self._newline = False
+        self._chunks.append({"type": "code", "format": self.language, "start": True})
+
+    def _close(self):
+        # The newline before the fence, and the fence itself, are dropped
+        self._chunks.append({"type": "code", "format": self.language, "end": True})
+        self._mode = _MESSAGE
+        self._line_start = True
+        self._pending = ""
+        self._ticks = 0
+        self._newline = False
+        self.language = None
+
+    def _flush_pending(self):
+        pending = self._pending
+        self._pending = ""
+        self._ticks = 0
+        self._line_start = False
+        if pending:
+            self._emit(pending)
+
+    def _emit(self, content):
+        if self._mode == _MESSAGE:
+            chunk_type, chunk_format = "message", None
+        else:
+            chunk_type, chunk_format = "code", self.language
+            if self._newline:
+                self._newline = False
+                content = "\n" + content
+        if not content:
+            return
+
+        chunks = self._chunks
+        if chunks and chunks[-1]["type"] == chunk_type and "content" in chunks[-1]:
+            chunks[-1]["content"] += content
+        elif chunk_type == "message":
+            chunks.append({"type": "message", "content": content})
+        else:
+            chunks.append({"type": "code", "format": chunk_format, "content": content})
+
+    def _take(self):
+        chunks = self._chunks
+        self._chunks = []
+        return chunks
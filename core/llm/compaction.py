@@ -0,0 +1,184 @@
+"""
+Summarizing context compaction, for long-running conversations (mainly `loop=True`).
+
+Without it, once the history outgrows the context window `tt.trim` drops the oldest messages, and
+the task state in them is lost. `ContextCompactor` instead watches the size of what's sent. Once it
+passes `high_water` of the budget, it summarizes the older messages on a background thread, ahead of
+actually running out of room. When the summary is ready, later turns send one compact memory message
+in place of those older messages. The summary is cached and extended incrementally (old summary +
+newly compacted messages), so tokens per turn level off instead of growing until trim cuts them.
+"""
+import hashlib
+import json
+import threading
+import time
+
+SUMMARY_PROMPT = """You maintain the memory of a long-running coding session between a user and an AI that runs code on the user's machine.
+Summarize the conversation below (which may start with the previous summary) so the AI can continue the task without it.
+Keep: the user's goal and constraints, what has been done and verified, important file paths, commands, values and errors, and what's left to do.
+Drop pleasantries and output that no longer matters. Be concise, use bullet points."""
+
+MEMORY_PREFIX = "Summary of our conversation so far (older messages were compacted to save space):\n\n"
+
+
+def estimate_tokens(messages):
+    """
+    Cheap estimate (~4 characters per token), good enough to decide when to compact.
+    """
+    total = 0
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, str):
+            total += len(content) // 4
+        elif isinstance(content, list):
+            for part in content:
+                if part.get("type") == "text":
+                    total += len(part.get("text", "")) // 4
+                else:
+                    total += 800  # Roughly what an image costs
+        if message.get("function_call"):
+            total += len(json.dumps(message["function_call"])) // 4
+        total += 4  # Per-message overhead
+    return total
+
+
+def _digest(message):
+    return hashlib.sha256(json.dumps(message, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _transcript(messages):
+    lines = []
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, list):
+            content = " ".join(
+                part.get("text", "") if part.get("type") == "text" else "[image]"
+                for part in content
+            )
+        if message.get("function_call"):
+            content = (content or "") + json.dumps(message["function_call"])
+        lines.append(f"{message.get('role')}: {content}")
+    return "\n\n".join(lines)
+
+
+class ContextCompactor:
+    def __init__(self, llm):
+        self.llm = llm
+        self.high_water = 0.75  # Start summarizing past this fraction of the budget
+        self.keep_recent = 0.3  # Fraction of the budget kept verbatim after compacting
+        self.summary_tokens = 1000
+
+        self._summary = None  # (prefix length, digest of the prefix's last message, summary text)
+        self._pending = None
+        self._lock = threading.Lock()
+
+    def compact(self, messages, system_message, budget):
+        """
+        `messages` are OpenAI messages without the system message. Returns them with the summarized
+        prefix (if there is one) replaced by a memory message, and starts a new summary if needed.
+        """
+        with self._lock:
+            summary = self._summary
+
+        base, summary_text = 0, None
+        if summary is not None:
+            prefix_length, prefix_digest, text = summary
+            if len(messages) > prefix_length and _digest(messages[prefix_length - 1]) == prefix_digest:
+                base, summary_text = prefix_length, text
+            else:
+                # The history was replaced (reset, another conversation loaded...)
+                with self._lock:
+                    self._summary = None
+
+        compacted = messages[base:]
+        if summary_text is not None:
+            compacted = [{"role": "user", "content": MEMORY_PREFIX + summary_text}] + compacted
+
+        used = estimate_tokens([{"content": system_message}]) + estimate_tokens(compacted)
+        if used > self.high_water * budget:
+            self._start_summary(messages, base, summary_text, budget)
+
+        return compacted
+
+    def wait(self, timeout=None):
+        """
+        Blocks until a summary in progress is done.
+        """
+        pending = self._pending
+        if pending is not None:
+            pending.join(timeout)
+
+    def reset(self):
+        with self._lock:
+            self._summary = None
+
+    def _start_summary(self, messages, base, summary_text, budget):
+        with self._lock:
+            if self._pending is not None and self._pending.is_alive():
+                return
+
+        # Keep the most recent messages that fit in `keep_recent` of the budget
+        cut = len(messages)
+        kept = 0
+        while cut > base + 1:
+            kept += estimate_tokens([messages[cut - 1]])
+            if kept > self.keep_recent * budget:
+                break
+            cut -= 1
+
+        # Don't separate a function result from its call
+        while cut < len(messages) - 1 and messages[cut].get("role") == "function":
+            cut += 1
+        if cut <= base or cut >= len(messages):
+            return
+
+        to_summarize = messages[base:cut]
+        if summary_text is not None:
+            to_summarize = [{"role": "user", "content": MEMORY_PREFIX + summary_text}] + to_summarize
+
+        thread = threading.Thread(
+            target=self._summarize,
+            args=(to_summarize, cut, _digest(messages[cut - 1])),
+            daemon=True,
+        )
+        with self._lock:
+            self._pending = thread
+        thread.start()
+
+    def _summarize(self, messages, prefix_length, prefix_digest):
+        params = {
+            "model": self.llm.model,
+            "messages": [
+                {"role": "system", "content": SUMMARY_PROMPT},
+                {"role": "user", "content": _transcript(messages)},
+            ],
+            "stream": True,
+            "max_tokens": self.summary_tokens,
+        }
+        if self.llm.api_key:
+            params["api_key"] = self.llm.api_key
+        if self.llm.api_base:
+            params["api_base"] = self.llm.api_base
+        if self.llm.api_version:
+            params["api_version"] = self.llm.api_version
+
+        # The raw completion function: a summary isn't a response to replay from the cache, and doesn't
+        # get the loop's `task_done` function
+        started = time.time()
+        try:
+            text = ""
+            for chunk in self.llm._completions(**params):
+                if "choices" not in chunk or len(chunk["choices"]) == 0:
+                    continue
+                text += chunk["choices"][0]["delta"].get("content") or ""
+        except Exception as e:
+            if self.llm.interpreter.verbose:
+                print(f"Failed to summarize the conversation: {e}")
+            return
+        finally:
+            # Charged as its own turn, the current one may still be streaming
+            self.llm.accountant.record(self.llm.model, params["messages"], text, kind="summary", started=started)
+
+        if text.strip():
+            with self._lock:
+                self._summary = (prefix_length, prefix_digest, text.strip())
@@ -0,0 +1,111 @@
+"""
+Memoizes `convert_to_openai_messages` per LMC message.
+
+`Llm.run` converts the whole history every turn, which means re-encoding every image to base64
+and re-rendering every code block. `ConversionCache.convert` converts each message on its own and
+remembers the result, keyed by the message object, a fingerprint of its contents (so messages that
+were mutated, like one still being streamed into, are converted again) and the conversion flags.
+Each turn then only converts new or changed messages, and converted image payloads are shared
+between turns instead of being rebuilt.
+
+Without function calling, the converter merges consecutive messages that end up with the same role.
+Those runs are converted again together, by the converter itself, so the result is the same as
+converting the whole history at once (`python -m core.benchmark --conversion 200` checks this).
+Settings of the interpreter that change the conversion (`SETTINGS`) are part of the cache key.
+"""
+from .utils.convert_to_openai_messages import convert_to_openai_messages
+
+SETTINGS = ("code_output_template", "empty_code_output_template", "code_output_sender")
+
+
+def _fingerprint(message):
+    content = message.get("content")
+    # str caches its hash, so this is O(1) for content that hasn't changed
+    content_key = hash(content) if isinstance(content, str) else id(content)
+    return (
+        message.get("role"),
+        message.get("type"),
+        message.get("format"),
+        message.get("recipient"),
+        content_key,
+    )
+
+
+class ConversionCache:
+    def __init__(self):
+        self._entries = {}  # id(message) -> (message, fingerprint, flags, converted messages)
+        self._runs = {}  # ((id, fingerprint), ...) of a run of same-role messages -> merged messages
+        self.converted = 0  # Messages actually converted, useful to benchmarks
+        self.reused = 0
+
+    def clear(self):
+        self._entries = {}
+        self._runs = {}
+
+    def convert(self, messages, function_calling=True, vision=False, shrink_images=True, interpreter=None, resolve=None):
+        """
+        `resolve` loads the content of a message that's stored elsewhere (see BlobStore), only when it has
+        to be converted.
+        """
+        settings = tuple(getattr(interpreter, name, None) for name in SETTINGS)
+        flags = (function_calling, vision, shrink_images, settings)
+
+        def convert(lmc_messages):
+            return convert_to_openai_messages(
+                [resolve(message) if resolve is not None else message for message in lmc_messages],
+                function_calling=function_calling,
+                vision=vision,
+                shrink_images=shrink_images,
+                interpreter=interpreter,
+            )
+
+        entries = {}
+        results = []
+        for message in messages:
+            fingerprint = _fingerprint(message)
+            entry = self._entries.get(id(message))
+            if (
+                entry is not None
+                and entry[0] is message
+                and entry[1] == fingerprint
+                and entry[2] == flags
+            ):
+                result = entry[3]
+                self.reused += 1
+            else:
+                result = convert([message])
+                self.converted += 1
+            entries[id(message)] = (message, fingerprint, flags, result)
+            results.append((message, fingerprint, result))
+
+        # Messages that are gone from the history are dropped from the cache
+        self._entries = entries
+
+        if function_calling:
+            groups = [[item] for item in results]
+        else:
+            # Runs of messages that convert to the same role, the converter merges them into one
+            groups = []
+            for item in results:
+                if not item[2]:
+                    continue  # Nothing to send (e.g. a message for the user only)
+                if groups and groups[-1][-1][2][-1]["role"] == item[2][0]["role"]:
+                    groups[-1].append(item)
+                else:
+                    groups.append([item])
+
+        runs = {}
+        converted = []
+        for group in groups:
+            if len(group) == 1:
+                result = group[0][2]
+            else:
+                key = (flags,) + tuple((id(message), fingerprint) for message, fingerprint, _ in group)
+                result = self._runs.get(key)
+                if result is None:
+                    result = convert([message for message, _, _ in group])
+                runs[key] = result
+            # Shallow copies, so callers can't change what's cached (payloads are shared, not copied)
+            converted.extend(dict(new_message) for new_message in result)
+        self._runs = runs
+        return converted
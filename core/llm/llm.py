@@ -6,6 +6,7 @@ import litellm
 litellm.suppress_debug_info = True
 import json
 import subprocess
+import threading
 import time
 import uuid
 
@@ -15,11 +16,17 @@ import tokentrim as tt
 from terminal_interface.utils.display_markdown_message import (
     display_markdown_message,
 )
+from .compaction import ContextCompactor
+from .conversion_cache import ConversionCache
+from .model_registry import ModelRegistry
+from .token_accounting import TokenAccountant
 from .run_function_calling_llm import run_function_calling_llm
 
 # from .run_tool_calling_llm import run_tool_calling_llm
 from .run_text_llm import run_text_llm
-from .utils.convert_to_openai_messages import convert_to_openai_messages
+
+# The Llm whose `run` is executing on this thread, so the completion transport can register its streams
+_running = threading.local()
 
 
 class Llm:
@@ -34,6 +41,23 @@ class Llm:
         # OpenAI-compatible chat completions "endpoint"
         self.completions = fixed_litellm_completions
 
+        # Opt-in cache of responses, e.g. `llm.response_cache = ResponseCache()`
+        self.response_cache = None
+        self._prompts = None  # What the user typed in the messages being sent, see ResponseCache
+
+        # Context window and max tokens. Unless they're set explicitly (`explicit_limits`), they follow the
+        # model: `load` looks them up, and `ModelRegistry.restore` brings back the ones of a warm model
+        self._context_window = 100000
+        self._max_tokens = 4096
+        self.explicit_limits = set()
+
+        # Models that are already loaded, so switching between them is instant
+        self.model_registry = ModelRegistry(self)
+
+        # Open completion streams, closed by `cancel`
+        self._streams = set()
+        self._streams_lock = threading.Lock()
+
         # Settings
         self.model = "gpt-4o"
         self.temperature = 0
@@ -47,15 +71,21 @@ class Llm:
         self.execution_instructions = "To execute code on the user's machine, write a markdown code block. Specify the language after the ```. You will receive the output. Use any programming language."  # If supports_functions is False, this will be added to the system message
 
         # Optional settings
-        self.context_window = 100000
-        self.max_tokens = 4096
         self.api_base = None
         self.api_key = None
         self.api_version = None
         self._is_loaded = False
 
-        # Budget manager powered by LiteLLM
+        # Budget manager powered by LiteLLM, and enforced before each request by the accountant
         self.max_budget = None
+        self.accountant = TokenAccountant()
+
+        # Summarize old messages instead of trimming them. None means only in loop mode
+        self.compact_context = None
+        self.compactor = ContextCompactor(self)
+
+        # Converted OpenAI messages, so each turn only converts new messages
+        self.conversion_cache = ConversionCache()
 
     def run(self, messages):
         """
@@ -77,7 +107,7 @@ class Llm:
             print(
                 "Warning: max_tokens is larger than context_window. Setting max_tokens to be 0.2 times the context_window."
             )
-            self.max_tokens = int(0.2 * self.context_window)
+            self._max_tokens = int(0.2 * self.context_window)
 
         # Assertions
         assert (
@@ -93,9 +123,9 @@ class Llm:
         if model == "i":
             model = "openai/i"
             if not hasattr(self.interpreter, "conversation_id"):  # Only do this once
-                self.context_window = 7000
+                self._context_window = 7000
                 self.api_key = "x"
-                self.max_tokens = 1000
+                self._max_tokens = 1000
                 self.api_base = "https://api.openinterpreter.com/v0"
                 self.interpreter.conversation_id = str(uuid.uuid4())
 
@@ -119,13 +149,18 @@ class Llm:
             except:
                 self.supports_vision = False
 
+        # Images and large outputs may be in the blob store, they're loaded only when they're converted
+        blobs = getattr(self.interpreter, "blobs", None)
+
         # Trim image messages if they're there
         image_messages = [msg for msg in messages if msg["type"] == "image"]
         if self.supports_vision:
             if self.interpreter.os:
-                # Keep only the last two images if the interpreter is running in OS mode
-                if len(image_messages) > 1:
-                    for img_msg in image_messages[:-2]:
+                # Keep only the last two screenshots if the interpreter is running in OS mode,
+                # and the cropped regions sent after them (see FrameFilter)
+                whole = [i for i, img_msg in enumerate(image_messages) if "crop" not in img_msg]
+                if len(whole) > 1:
+                    for img_msg in image_messages[:whole[-2]]:
                         messages.remove(img_msg)
                         if self.interpreter.verbose:
                             print("Removing image message!")
@@ -153,8 +188,9 @@ class Llm:
                         postcursor = ""
 
                     try:
-                        image_description = self.vision_renderer(lmc=img_msg)
-                        ocr = self.interpreter.computer.vision.ocr(lmc=img_msg)
+                        lmc = blobs.resolve(img_msg) if blobs is not None else img_msg
+                        image_description = self.vision_renderer(lmc=lmc)
+                        ocr = self.interpreter.computer.vision.ocr(lmc=lmc)
 
                         # It would be nice to format this as a message to the user and display it like: "I see: image_description"
 
@@ -167,26 +203,47 @@ class Llm:
                             + postcursor
                         )
                         img_msg["format"] = "description"
+                        img_msg.pop("blob", None)
 
                     except ImportError:
                         print(
                             "\nTo use local vision, run `pip install 'open-interpreter[local]'`.\n"
                         )
                         img_msg["format"] = "description"
+                        img_msg.pop("blob", None)
                         img_msg["content"] = ""
 
-        # Convert to OpenAI messages format
-        messages = convert_to_openai_messages(
+        # The response cache normalizes these, and nothing else (code outputs are user messages too)
+        self._prompts = {
+            message["content"]
+            for message in messages
+            if message["role"] == "user" and message["type"] == "message" and isinstance(message.get("content"), str)
+        }
+
+        # Convert to OpenAI messages format (only new or changed messages are actually converted)
+        messages = self.conversion_cache.convert(
             messages,
             function_calling=self.supports_functions,
             vision=self.supports_vision,
             shrink_images=self.interpreter.shrink_images,
             interpreter=self.interpreter,
+            resolve=blobs.resolve if blobs is not None else None,
         )
 
         system_message = messages[0]["content"]
         messages = messages[1:]
 
+        # Compact messages (trimming below is then a fallback)
+        compact_context = self.compact_context
+        if compact_context is None:
+            compact_context = self.interpreter.loop
+        if compact_context:
+            if self.context_window and self.max_tokens:
+                budget = self.context_window - self.max_tokens - 25
+            else:
+                budget = self.context_window or 8000
+            messages = self.compactor.compact(messages, system_message, budget)
+
         # Trim messages
         try:
             if self.context_window and self.max_tokens:
@@ -269,6 +326,10 @@ Continuing...
         if hasattr(self.interpreter, "conversation_id"):
             params["conversation_id"] = self.interpreter.conversation_id
 
+        # Count the prompt, and refuse the request if it could go over budget
+        self.accountant.start_turn(model, messages)
+        self.accountant.check_budget(self.max_budget, self.max_tokens)
+
         # Set some params directly on LiteLLM
         if self.max_budget:
             litellm.max_budget = self.max_budget
@@ -286,13 +347,66 @@ Continuing...
             print("\n\n\n")
             time.sleep(5)
 
-        if self.supports_functions:
-            yield from run_function_calling_llm(self, params)
-            # yield from run_tool_calling_llm(self, params)
-        else:
-            yield from run_text_llm(self, params)
+        previous_llm = getattr(_running, "llm", None)
+        _running.llm = self
+        try:
+            # Stopped while the messages were being prepared, don't send the request
+            if self.cancelled:
+                return
+            if self.supports_functions:
+                chunks = run_function_calling_llm(self, params)
+                # chunks = run_tool_calling_llm(self, params)
+            else:
+                chunks = run_text_llm(self, params)
+            for chunk in chunks:
+                if isinstance(chunk.get("content"), str):
+                    self.accountant.add_completion(chunk["content"])
+                yield chunk
+        finally:
+            _running.llm = previous_llm
+            self.accountant.end_turn()
+
+    # Responses report their usage to the accountant, go through the cache, if there is one, and in loop
+    # mode get the `task_done` function
+    @property
+    def completions(self):
+        completions = self.accountant.wrap(self._completions)
+        if self.response_cache is not None:
+            completions = self.response_cache.wrap(
+                completions, prompts=self._prompts, on_hit=self.accountant.mark_cached
+            )
+        loop_controller = getattr(self.interpreter, "loop_controller", None)
+        if loop_controller is not None and self.interpreter.loop_done_function:
+            completions = loop_controller.done_function_completions(completions)
+        return completions
+
+    @completions.setter
+    def completions(self, value):
+        self._completions = value
 
-    # If you change model, set _is_loaded to false
+    @property
+    def cancelled(self):
+        return self.interpreter.stop_event.is_set()
+
+    def cancel(self):
+        """
+        Closes every open completion stream. Called from another thread by `interpreter.stop`,
+        the pending read in the streaming thread then fails and the turn ends.
+        """
+        with self._streams_lock:
+            streams = list(self._streams)
+        for stream in streams:
+            _close_stream(stream)
+
+    def _open_stream(self, stream):
+        with self._streams_lock:
+            self._streams.add(stream)
+
+    def _release_stream(self, stream):
+        with self._streams_lock:
+            self._streams.discard(stream)
+
+    # If you change model, set _is_loaded to false (unless the registry has it warm)
     @property
     def model(self):
         return self._model
@@ -300,12 +414,56 @@ Continuing...
     @model.setter
     def model(self, value):
         self._model = value
-        self._is_loaded = False
+        self._is_loaded = self.model_registry.restore(value)
+        if not self._is_loaded:
+            # The previous model's limits don't apply, `load` looks up this one's
+            if "context_window" not in self.explicit_limits:
+                self._context_window = 100000
+            if "max_tokens" not in self.explicit_limits:
+                self._max_tokens = 4096
+
+    @property
+    def context_window(self):
+        return self._context_window
+
+    @context_window.setter
+    def context_window(self, value):
+        self._context_window = value
+        self.explicit_limits.add("context_window")
+
+    @property
+    def max_tokens(self):
+        return self._max_tokens
+
+    @max_tokens.setter
+    def max_tokens(self, value):
+        self._max_tokens = value
+        self.explicit_limits.add("max_tokens")
+
+    def _derives(self, limit):
+        return limit not in self.explicit_limits or getattr(self, limit) is None
+
+    def apply_config(self, changes):
+        """
+        Applies changed GUI settings (see `ConfigManager.subscribe`) without restarting the interpreter.
+        A new model is loaded on the next `run`.
+        """
+        if "model" in changes:
+            self.model = changes["model"]
+        for key in ("temperature", "context_window", "api_base", "api_key"):
+            if key in changes:
+                setattr(self, key, changes[key])
 
     def load(self):
         if self._is_loaded:
             return
 
+        # It may have been preloaded in the background (or be preloading right now)
+        self.model_registry.wait(self.model)
+        if self.model_registry.restore(self.model):
+            self._is_loaded = True
+            return
+
         if self.model.startswith("ollama/"):
             model_name = self.model.replace("ollama/", "")
             try:
@@ -332,7 +490,7 @@ Continuing...
                 subprocess.run(["ollama", "pull", model_name], check=True)
 
             # Get context window if not set
-            if self.context_window == None:
+            if self._derives("context_window"):
                 response = requests.post(
                     "http://localhost:11434/api/show", json={"name": model_name}
                 )
@@ -343,34 +501,40 @@ Continuing...
                         context_length = model_info[key]
                         break
                 if context_length is not None:
-                    self.context_window = context_length
-            if self.max_tokens == None:
+                    self._context_window = context_length
+            if self._derives("max_tokens"):
                 if self.context_window != None:
-                    self.max_tokens = int(self.context_window * 0.2)
+                    self._max_tokens = int(self.context_window * 0.2)
 
             # Send a ping, which will actually load the model
             print(f"Loading {model_name}...\n")
 
-            old_max_tokens = self.max_tokens
-            self.max_tokens = 1
+            old_max_tokens = self._max_tokens
+            self._max_tokens = 1
             self.interpreter.computer.ai.chat("ping")
-            self.max_tokens = old_max_tokens
+            self._max_tokens = old_max_tokens
 
             self.interpreter.display_message("*Model loaded.*\n")
 
         # Validate LLM should be moved here!!
 
-        if self.context_window == None:
+        if self._derives("context_window") and not self.model.startswith("ollama/"):
             try:
                 model_info = litellm.get_model_info(model=self.model)
-                self.context_window = model_info["max_input_tokens"]
-                if self.max_tokens == None:
-                    self.max_tokens = min(
+                self._context_window = model_info["max_input_tokens"]
+                if self._derives("max_tokens"):
+                    self._max_tokens = min(
                         int(self.context_window * 0.2), model_info["max_output_tokens"]
                     )
             except:
                 pass
 
+        # Only the limits that follow the model are cached for it
+        self.model_registry.remember(
+            self.model,
+            context_window=None if "context_window" in self.explicit_limits else self.context_window,
+            max_tokens=None if "max_tokens" in self.explicit_limits else self.max_tokens,
+        )
         self._is_loaded = True
 
 
@@ -394,12 +558,19 @@ def fixed_litellm_completions(**params):
     # Run completion
     attempts = 4
     first_error = None
+    llm = getattr(_running, "llm", None)
 
     for attempt in range(attempts):
+        response = None
         try:
-            yield from litellm.completion(**params)
+            response = litellm.completion(**params)
+            if llm is not None:
+                llm._open_stream(response)
+            yield from response
             return  # If the completion is successful, exit the function
         except Exception as e:
+            if llm is not None and llm.cancelled:
+                return  # The stream was closed on purpose, don't retry
             if attempt == 0:
                 # Store the first error
                 first_error = e
@@ -415,6 +586,24 @@ def fixed_litellm_completions(**params):
             if attempt == 1:
                 # Try turning up the temperature?
                 params["temperature"] = params.get("temperature", 0.0) + 0.1
+        finally:
+            if response is not None:
+                if llm is not None:
+                    llm._release_stream(response)
+                _close_stream(response)
 
     if first_error is not None:
         raise first_error  # If all attempts fail, raise the first error
+
+
+def _close_stream(response):
+    """
+    Closes a litellm streaming response and the HTTP response underneath it.
+    """
+    for stream in (response, getattr(response, "completion_stream", None)):
+        close = getattr(stream, "close", None)
+        if callable(close):
+            try:
+                close()
+            except Exception:
+                pass
@@ -0,0 +1,143 @@
+import subprocess
+import threading
+
+import litellm
+import requests
+
+OLLAMA_API = "http://localhost:11434/api"
+
+
+class ModelRegistry:
+    """
+    Keeps track of models that are already warm, so `Llm` can switch between them without reloading.
+
+    A model is warm once `Llm.load` has finished for it, or once `preload` has cached its context window
+    info in the background (for Ollama, only for a model that's already downloaded, also loading it into
+    memory). A model `preload` couldn't get info for isn't marked warm, so `Llm.load` still loads it.
+    """
+
+    def __init__(self, llm):
+        self.llm = llm
+        self.keep_alive = "30m"  # How long Ollama keeps a preloaded model in memory
+        self._entries = {}
+        self._preloading = {}
+        self._lock = threading.Lock()
+
+    def is_warm(self, model):
+        with self._lock:
+            return model in self._entries
+
+    def remember(self, model, context_window=None, max_tokens=None):
+        with self._lock:
+            entry = self._entries.setdefault(model, {})
+            if context_window is not None:
+                entry["context_window"] = context_window
+            if max_tokens is not None:
+                entry["max_tokens"] = max_tokens
+
+    def forget(self, model):
+        with self._lock:
+            self._entries.pop(model, None)
+
+    def restore(self, model):
+        """
+        Applies the model's cached context window and max tokens, except the ones set explicitly
+        (`Llm.explicit_limits`). Returns True if the model is warm and doesn't need loading.
+        """
+        with self._lock:
+            entry = self._entries.get(model)
+        if entry is None:
+            return False
+        explicit = self.llm.explicit_limits
+        if "context_window" not in explicit and entry.get("context_window") is not None:
+            self.llm._context_window = entry["context_window"]
+        if "max_tokens" not in explicit:
+            if entry.get("max_tokens") is not None:
+                self.llm._max_tokens = entry["max_tokens"]
+            elif entry.get("context_window") is not None:
+                self.llm._max_tokens = int(entry["context_window"] * 0.2)
+        return True
+
+    def preload(self, model):
+        """
+        Warms `model` on a background thread. Does nothing if it's warm or already being preloaded.
+        """
+        if not model:
+            return None
+        with self._lock:
+            if model in self._entries:
+                return None
+            thread = self._preloading.get(model)
+            if thread is not None:
+                return thread
+            thread = threading.Thread(target=self._preload, args=(model,), daemon=True)
+            self._preloading[model] = thread
+        thread.start()
+        return thread
+
+    def wait(self, model, timeout=None):
+        """
+        Blocks until a running preload of `model` finishes.
+        """
+        with self._lock:
+            thread = self._preloading.get(model)
+        if thread is not None:
+            thread.join(timeout)
+
+    def _preload(self, model):
+        try:
+            if model.startswith("ollama/"):
+                info = self._warm_ollama(model.replace("ollama/", ""))
+            else:
+                info = self._model_info(model)
+            if info:
+                self.remember(model, **info)
+            elif self.llm.interpreter.verbose:
+                print(f"Didn't preload {model}, Llm.load will load it")
+        except Exception as e:
+            if self.llm.interpreter.verbose:
+                print(f"Failed to preload {model}: {e}")
+        finally:
+            with self._lock:
+                self._preloading.pop(model, None)
+
+    def _warm_ollama(self, model_name):
+        result = subprocess.run(
+            ["ollama", "list"], capture_output=True, text=True, check=True
+        )
+        names = [
+            line.split()[0].replace(":latest", "")
+            for line in result.stdout.split("\n")[1:]
+            if line.strip()
+        ]
+        if model_name not in names:
+            return None  # Not downloaded. Downloads can be gigabytes, `Llm.load` does it visibly
+
+        context_window = None
+        response = requests.post(f"{OLLAMA_API}/show", json={"name": model_name})
+        model_info = response.json().get("model_info", {})
+        for key in model_info:
+            if "context_length" in key:
+                context_window = model_info[key]
+                break
+
+        # An empty generate request loads the model into memory without producing tokens
+        requests.post(
+            f"{OLLAMA_API}/generate",
+            json={"model": model_name, "keep_alive": self.keep_alive},
+        ).raise_for_status()
+
+        return {"context_window": context_window}
+
+    def _model_info(self, model):
+        try:
+            model_info = litellm.get_model_info(model=model)
+        except Exception:
+            return None
+        context_window = model_info.get("max_input_tokens")
+        if not context_window:
+            return None
+        max_tokens = None
+        if context_window and model_info.get("max_output_tokens"):
+            max_tokens = min(int(context_window * 0.2), model_info["max_output_tokens"])
+        return {"context_window": context_window, "max_tokens": max_tokens}
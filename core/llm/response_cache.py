@@ -0,0 +1,257 @@
+"""
+An opt-in cache of LLM responses, for users who send the same few requests over and over.
+
+    interpreter.llm.response_cache = ResponseCache()
+    interpreter.llm.response_cache = ResponseCache(similarity_threshold=0.95)  # Also match similar requests
+
+Responses are stored as the raw chunks the completions backend streamed, keyed on the (already
+trimmed) message list, model and temperature. Only the text the user typed is normalized (whitespace
+and case); the system message, code and outputs are hashed verbatim, since a changed indent or value
+in them can change the right response. A hit replays those chunks through the same
+`llm.completions` interface, so `run_text_llm` / `run_function_calling_llm`, `_respond_and_store`
+and the GUI can't tell a cached response from a live one.
+
+With `similarity_threshold` set, a miss on a user's prompt falls back to comparing an embedding of it
+against cached responses that share the same earlier messages, model and temperature. Embeddings
+come from a local sentence-transformers model (or any `embed(text) -> list[float]` callable).
+
+Entries live in an SQLite file in the Open Interpreter dir and are evicted least-recently-used
+once their total size passes `max_bytes`.
+"""
+import hashlib
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from terminal_interface.utils.oi_dir import oi_dir
+from ..utils.lazy_import import lazy_import
+
+# Lazy import, only needed for the similarity tier
+sentence_transformers = lazy_import("sentence_transformers")
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _normalize_text(text):
+    return _WHITESPACE.sub(" ", text).strip().lower()
+
+
+def _normalize_message(message, prompts):
+    """
+    The message as it's hashed, and whether it's one of the user's `prompts` (None: any user message).
+    Code outputs are user messages too for models without function calling, so the role isn't enough.
+    """
+    if message.get("role") != "user":
+        return message, False
+
+    def is_prompt(text):
+        return prompts is None or text in prompts
+
+    content = message.get("content")
+    if isinstance(content, str):
+        if not is_prompt(content):
+            return message, False
+        return {**message, "content": _normalize_text(content)}, True
+    if isinstance(content, list):
+        # Vision messages: normalize the prompt's text parts, images stay as they are
+        parts = [
+            {**part, "text": _normalize_text(part["text"])}
+            if part.get("type") == "text" and isinstance(part.get("text"), str) and is_prompt(part["text"])
+            else part
+            for part in content
+        ]
+        return {**message, "content": parts}, parts != content
+    return message, False
+
+
+def _digest(value):
+    return hashlib.sha256(
+        json.dumps(value, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+def _chunk_to_dict(chunk):
+    if isinstance(chunk, dict):
+        return chunk
+    if hasattr(chunk, "model_dump"):
+        return chunk.model_dump()
+    return json.loads(json.dumps(chunk, default=lambda o: getattr(o, "__dict__", str(o))))
+
+
+def _finished(chunks):
+    try:
+        return chunks[-1]["choices"][0].get("finish_reason") is not None
+    except (IndexError, KeyError, TypeError):
+        return False
+
+
+def _cosine(a, b):
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        path=None,
+        max_bytes=50 * 1024 * 1024,
+        similarity_threshold=None,
+        embedding_model="all-MiniLM-L6-v2",
+        embed=None,
+    ):
+        self.path = path or os.path.join(oi_dir, "response_cache.db")
+        self.max_bytes = max_bytes
+        self.similarity_threshold = similarity_threshold
+        self.embedding_model = embedding_model
+        self._embed = embed
+        self._encoder = None
+        self._lock = threading.Lock()
+
+        # Stats
+        self.hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS responses
+               (key TEXT PRIMARY KEY,
+                context_key TEXT,
+                chunks TEXT,
+                embedding TEXT,
+                size INTEGER,
+                last_used REAL)"""
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS responses_context ON responses (context_key)"
+        )
+        self._conn.commit()
+
+    def wrap(self, completions, prompts=None, on_hit=None):
+        """
+        Returns a completions function that serves hits from the cache and records misses into it.
+        `prompts` is the set of texts the user typed, the only ones normalized in the keys. Without it,
+        every user message's text is. `on_hit` is called before a hit is replayed (the accountant doesn't
+        charge it).
+        """
+
+        def cached_completions(**params):
+            key, context_key, prompt = self._keys(params, prompts)
+
+            chunks = self.get(key, context_key, prompt)
+            if chunks is not None:
+                if on_hit is not None:
+                    on_hit()
+                yield from chunks
+                return
+
+            recorded = []
+            for chunk in completions(**params):
+                recorded.append(_chunk_to_dict(chunk))
+                yield chunk
+            # Don't cache a stream that was cut short (e.g. cancelled)
+            if _finished(recorded):
+                self.put(key, context_key, prompt, recorded)
+
+        return cached_completions
+
+    def get(self, key, context_key, prompt):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT chunks FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                self._touch(key)
+                self.hits += 1
+                return json.loads(row[0])
+
+        if self.similarity_threshold is not None and prompt:
+            embedding = self._embedding(prompt)
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT key, chunks, embedding FROM responses WHERE context_key = ? AND embedding IS NOT NULL",
+                    (context_key,),
+                ).fetchall()
+                best_key, best_chunks, best_score = None, None, self.similarity_threshold
+                for row_key, chunks, row_embedding in rows:
+                    score = _cosine(embedding, json.loads(row_embedding))
+                    if score >= best_score:
+                        best_key, best_chunks, best_score = row_key, chunks, score
+                if best_key is not None:
+                    self._touch(best_key)
+                    self.similar_hits += 1
+                    return json.loads(best_chunks)
+
+        self.misses += 1
+        return None
+
+    def put(self, key, context_key, prompt, chunks):
+        embedding = None
+        if self.similarity_threshold is not None and prompt:
+            embedding = json.dumps(self._embedding(prompt))
+        data = json.dumps(chunks)
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, context_key, chunks, embedding, size, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, context_key, data, embedding, len(data), time.time()),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def _keys(self, params, prompts=None):
+        normalized = [_normalize_message(message, prompts) for message in params.get("messages", [])]
+        messages = [message for message, _ in normalized]
+        settings = {
+            "model": params.get("model"),
+            "temperature": params.get("temperature", 0),
+            "functions": params.get("functions"),
+            "tools": params.get("tools"),
+        }
+        key = _digest({**settings, "messages": messages})
+        context_key = _digest({**settings, "messages": messages[:-1]})
+
+        # Only a user's prompt is compared by similarity, never e.g. a code output
+        prompt = ""
+        if normalized and normalized[-1][1]:
+            content = messages[-1]["content"]
+            if isinstance(content, list):
+                content = " ".join(part["text"] for part in content if part.get("type") == "text")
+            prompt = content
+        return key, context_key, prompt
+
+    def _touch(self, key):
+        self._conn.execute(
+            "UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key)
+        )
+        self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM responses ORDER BY last_used ASC"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+
+    def _embedding(self, text):
+        if self._embed is not None:
+            return list(self._embed(text))
+        if self._encoder is None:
+            self._encoder = sentence_transformers.SentenceTransformer(self.embedding_model)
+        return [float(x) for x in self._encoder.encode(text)]
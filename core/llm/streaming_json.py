@@ -0,0 +1,250 @@
+"""
+Incremental parser for the JSON arguments of a streamed function call.
+
+The arguments of an `execute` call arrive as many small deltas of one JSON object, e.g.
+`{"language": "python", "code": "print(1)\\n..."}`. Re-parsing everything received so far on each
+delta costs O(n²) over a long code block. `ArgumentsParser` keeps its state between deltas instead,
+so each character is looked at once. String values are decoded as they stream, and `feed` returns the
+new part of each one, so code can be shown (and run) as it's written:
+
+    parser = ArgumentsParser()
+    for delta in deltas:
+        for key, fragment in parser.feed(delta):
+            if key == "code":
+                yield {"type": "code", "format": parser.values.get("language"), "content": fragment}
+
+`values` holds the decoded values, including strings that are still streaming, and `complete` the keys
+whose value has ended. Non-string values (numbers, nested objects...) are decoded once they end. It's
+lenient where models commonly aren't valid JSON: raw newlines and tabs inside strings are kept as they are.
+"""
+import json
+import re
+
+_STRING_SPECIAL = re.compile(r'["\\]')
+_SIMPLE_ESCAPES = {
+    '"': '"',
+    "\\": "\\",
+    "/": "/",
+    "b": "\b",
+    "f": "\f",
+    "n": "\n",
+    "r": "\r",
+    "t": "\t",
+}
+
+# States
+_START = 0  # Before the opening brace
+_KEY_OR_END = 1  # Expecting a key or the closing brace
+_KEY = 2  # In a key
+_COLON = 3
+_VALUE = 4  # Expecting a value
+_STRING = 5  # In a string value
+_RAW = 6  # In a non-string value
+_AFTER_VALUE = 7  # Expecting a comma or the closing brace
+_DONE = 8
+
+
+class ArgumentsParser:
+    def __init__(self):
+        self.values = {}
+        self.complete = set()
+        self.done = False
+        self.error = None
+
+        self._state = _START
+        self._key = None
+        self._key_parts = []
+        self._escape = None  # Escape sequence split across deltas
+        self._high_surrogate = None
+        self._raw_parts = []
+        self._raw_depth = 0
+        self._raw_in_string = False
+        self._raw_escaped = False
+
+    def feed(self, text):
+        """
+        Consumes the next delta, returns [(key, new part of its string value), ...].
+        """
+        fragments = []
+        i = 0
+        n = len(text)
+
+        while i < n and self._state != _DONE:
+            state = self._state
+
+            if state == _STRING or state == _KEY:
+                i, closed, fragment = self._read_string(text, i)
+                if state == _KEY:
+                    self._key_parts.append(fragment)
+                    if closed:
+                        self._key = "".join(self._key_parts)
+                        self._key_parts = []
+                        self._state = _COLON
+                else:
+                    if fragment:
+                        self.values[self._key] += fragment
+                        if fragments and fragments[-1][0] == self._key:
+                            fragments[-1] = (self._key, fragments[-1][1] + fragment)
+                        else:
+                            fragments.append((self._key, fragment))
+                    if closed:
+                        self.complete.add(self._key)
+                        self._state = _AFTER_VALUE
+                continue
+
+            if state == _RAW:
+                i = self._read_raw(text, i)
+                continue
+
+            char = text[i]
+            i += 1
+            if char in " \t\r\n":
+                continue
+
+            if state == _START:
+                if char == "{":
+                    self._state = _KEY_OR_END
+                else:
+                    self._fail(f"expected '{{', got {char!r}")
+            elif state == _KEY_OR_END:
+                if char == '"':
+                    self._state = _KEY
+                elif char == "}":
+                    self._finish()
+                else:
+                    self._fail(f"expected a key, got {char!r}")
+            elif state == _COLON:
+                if char == ":":
+                    self._state = _VALUE
+                else:
+                    self._fail(f"expected ':', got {char!r}")
+            elif state == _VALUE:
+                if char == '"':
+                    self.values[self._key] = ""
+                    self._state = _STRING
+                else:
+                    self._raw_parts = [char]
+                    self._raw_depth = 1 if char in "{[" else 0
+                    self._raw_in_string = False
+                    self._raw_escaped = False
+                    self._state = _RAW
+            elif state == _AFTER_VALUE:
+                if char == ",":
+                    self._state = _KEY_OR_END
+                elif char == "}":
+                    self._finish()
+                else:
+                    self._fail(f"expected ',' or '}}', got {char!r}")
+
+        return fragments
+
+    def _read_string(self, text, i):
+        """
+        Reads string content from `text[i:]`. Returns (next index, whether the string ended, decoded text).
+        """
+        parts = []
+        n = len(text)
+        while i < n:
+            if self._escape is not None:
+                i = self._read_escape(text, i, parts)
+                continue
+
+            match = _STRING_SPECIAL.search(text, i)
+            if match is None:
+                self._append(parts, text[i:])
+                return n, False, "".join(parts)
+
+            end = match.start()
+            if end > i:
+                self._append(parts, text[i:end])
+            i = end + 1
+            if match.group() == '"':
+                self._flush_surrogate(parts)
+                return i, True, "".join(parts)
+            self._escape = ""
+        return i, False, "".join(parts)
+
+    def _read_escape(self, text, i, parts):
+        if self._escape == "":
+            char = text[i]
+            i += 1
+            if char == "u":
+                self._escape = "u"
+            else:
+                self._escape = None
+                self._append(parts, _SIMPLE_ESCAPES.get(char, char))
+            return i
+
+        # Collecting the 4 hex digits of \uXXXX
+        needed = 5 - len(self._escape)
+        self._escape += text[i:i + needed]
+        i += min(needed, len(text) - i)
+        if len(self._escape) == 5:
+            try:
+                code = int(self._escape[1:], 16)
+            except ValueError:
+                code = 0xFFFD
+            self._escape = None
+            if 0xD800 <= code <= 0xDBFF:
+                self._flush_surrogate(parts)
+                self._high_surrogate = code
+            elif 0xDC00 <= code <= 0xDFFF and self._high_surrogate is not None:
+                parts.append(chr(0x10000 + ((self._high_surrogate - 0xD800) << 10) + (code - 0xDC00)))
+                self._high_surrogate = None
+            else:
+                self._append(parts, chr(code))
+        return i
+
+    def _append(self, parts, text):
+        self._flush_surrogate(parts)
+        parts.append(text)
+
+    def _flush_surrogate(self, parts):
+        # A high surrogate that wasn't followed by a low one
+        if self._high_surrogate is not None:
+            parts.append("\ufffd")
+            self._high_surrogate = None
+
+    def _read_raw(self, text, i):
+        n = len(text)
+        start = i
+        while i < n:
+            char = text[i]
+            if self._raw_in_string:
+                if self._raw_escaped:
+                    self._raw_escaped = False
+                elif char == "\\":
+                    self._raw_escaped = True
+                elif char == '"':
+                    self._raw_in_string = False
+            elif char == '"':
+                self._raw_in_string = True
+            elif char in "{[":
+                self._raw_depth += 1
+            elif char in "}]" and self._raw_depth > 0:
+                self._raw_depth -= 1
+            elif self._raw_depth == 0 and char in ", \t\r\n}":
+                self._raw_parts.append(text[start:i])
+                self._end_raw()
+                return i  # The delimiter is handled by the AFTER_VALUE state
+            i += 1
+        self._raw_parts.append(text[start:i])
+        return i
+
+    def _end_raw(self):
+        raw = "".join(self._raw_parts)
+        self._raw_parts = []
+        try:
+            self.values[self._key] = json.loads(raw)
+        except ValueError:
+            self.values[self._key] = raw
+        self.complete.add(self._key)
+        self._state = _AFTER_VALUE
+
+    def _finish(self):
+        self.done = True
+        self._state = _DONE
+
+    def _fail(self, message):
+        self.error = message
+        self._state = _DONE
@@ -0,0 +1,177 @@
+"""
+A local, deterministic stand-in for `fixed_litellm_completions`.
+
+    interpreter.llm.completions = StubCompletions(["Hello!"], tokens_per_second=50)
+
+It yields OpenAI-style streaming chunks through the same interface, either replayed from a recording
+(see `RecordingCompletions`) or synthesized from canned responses at a configurable token rate,
+chunk size and time-to-first-token distribution. Nothing touches the network, so `Llm.run` and
+everything downstream of it can be measured offline.
+"""
+import json
+import random
+import time
+
+from .llm import _running
+
+
+class StubCompletions:
+    def __init__(
+        self,
+        responses=None,
+        recording=None,
+        tokens_per_second=None,
+        chunk_size=1,
+        chars_per_token=4,
+        latency=0.0,
+        seed=0,
+        speed=1.0,
+    ):
+        """
+        responses: Strings (or {"function_call": {"name": ..., "arguments": ...}} dicts) returned in turn, one per call.
+        recording: Path to a JSONL file written by `RecordingCompletions`, one stream per line, replayed in turn.
+        tokens_per_second: Streaming rate for synthesized responses. None streams as fast as possible.
+        chunk_size: Tokens per synthesized chunk.
+        latency: Time to first token, in seconds. Either a number, or ("uniform", low, high),
+            ("normal", mean, stddev) or ("lognormal", mu, sigma).
+        speed: Playback speed for recorded delays (2.0 replays twice as fast, 0 skips delays).
+        """
+        if responses is None and recording is None:
+            responses = ["This is a stub response."]
+        self.responses = responses
+        self.streams = self._load_recording(recording) if recording else None
+        self.tokens_per_second = tokens_per_second
+        self.chunk_size = chunk_size
+        self.chars_per_token = chars_per_token
+        self.latency = latency
+        self.speed = speed
+        self.random = random.Random(seed)
+
+        # Stats, useful to benchmarks
+        self.calls = 0
+        self.chunks = 0
+        self.time_in_backend = 0.0  # Seconds spent producing chunks, including simulated delays
+        self.last_params = None
+
+    def __call__(self, **params):
+        index = self.calls
+        self.calls += 1
+        self.last_params = params
+
+        if self.streams is not None:
+            stream = self._replay(self.streams[index % len(self.streams)])
+        else:
+            response = self.responses[index % len(self.responses)]
+            stream = self._synthesize(response, params.get("model", "stub"), index)
+
+        llm = getattr(_running, "llm", None)
+        while True:
+            started = time.perf_counter()
+            chunk = next(stream, None)
+            self.time_in_backend += time.perf_counter() - started
+            if chunk is None:
+                return
+            if llm is not None and llm.cancelled:
+                return
+            self.chunks += 1
+            yield chunk
+
+    def _sleep(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def _first_token_delay(self):
+        if isinstance(self.latency, (int, float)):
+            return self.latency
+        distribution, a, b = self.latency
+        if distribution == "uniform":
+            return self.random.uniform(a, b)
+        if distribution == "normal":
+            return max(0.0, self.random.gauss(a, b))
+        if distribution == "lognormal":
+            return self.random.lognormvariate(a, b)
+        raise ValueError(f"Unknown latency distribution: {distribution}")
+
+    def _replay(self, stream):
+        for item in stream:
+            if self.speed:
+                self._sleep(item.get("delay", 0) / self.speed)
+            yield item["chunk"]
+
+    def _synthesize(self, response, model, index):
+        def chunk(delta, finish_reason=None):
+            return {
+                "id": f"stub-{index}",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [
+                    {"index": 0, "delta": delta, "finish_reason": finish_reason}
+                ],
+            }
+
+        piece_length = max(1, self.chunk_size * self.chars_per_token)
+        interval = 0.0
+        if self.tokens_per_second:
+            interval = self.chunk_size / self.tokens_per_second
+
+        self._sleep(self._first_token_delay())
+
+        if isinstance(response, dict) and "function_call" in response:
+            function_call = response["function_call"]
+            arguments = function_call.get("arguments", "")
+            if not isinstance(arguments, str):
+                arguments = json.dumps(arguments)
+            yield chunk(
+                {
+                    "role": "assistant",
+                    "function_call": {"name": function_call.get("name", "execute"), "arguments": ""},
+                }
+            )
+            for start in range(0, len(arguments), piece_length):
+                self._sleep(interval)
+                yield chunk({"function_call": {"arguments": arguments[start : start + piece_length]}})
+            yield chunk({}, finish_reason="function_call")
+            return
+
+        yield chunk({"role": "assistant", "content": ""})
+        for start in range(0, len(response), piece_length):
+            self._sleep(interval)
+            yield chunk({"content": response[start : start + piece_length]})
+        yield chunk({}, finish_reason="stop")
+
+    def _load_recording(self, path):
+        with open(path) as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+
+class RecordingCompletions:
+    """
+    Wraps a completions function (e.g. `fixed_litellm_completions`) and records every stream, with the
+    delay before each chunk, to a JSONL file that `StubCompletions(recording=path)` can replay.
+    """
+
+    def __init__(self, completions, path):
+        self.completions = completions
+        self.path = path
+
+    def __call__(self, **params):
+        recorded = []
+        last = time.perf_counter()
+        try:
+            for chunk in self.completions(**params):
+                now = time.perf_counter()
+                recorded.append({"delay": now - last, "chunk": _chunk_to_dict(chunk)})
+                last = now
+                yield chunk
+        finally:
+            with open(self.path, "a") as f:
+                f.write(json.dumps(recorded) + "\n")
+
+
+def _chunk_to_dict(chunk):
+    if isinstance(chunk, dict):
+        return chunk
+    if hasattr(chunk, "model_dump"):
+        return chunk.model_dump()
+    return json.loads(json.dumps(chunk, default=lambda o: getattr(o, "__dict__", str(o))))
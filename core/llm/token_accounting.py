@@ -0,0 +1,187 @@
+"""
+Per-turn and per-session token and cost accounting for `Llm.run`.
+
+Prompt tokens are counted on the messages actually sent (after compaction and trimming), and the
+completion text is counted once the turn ends. When the provider reports `usage` in its stream (see
+`wrap`), those numbers are used instead. Both are priced with litellm's local cost map, and a turn
+answered from the response cache isn't charged at all. `check_budget` runs before a request is sent, so a turn that could push the session past
+`llm.max_budget` is refused instead of being paid for. Subscribers (e.g. the GUI's `UsageTracker`)
+are called with each finished turn.
+"""
+import threading
+import time
+
+import litellm
+
+
+class BudgetExceededError(Exception):
+    def __init__(self, projected_cost, max_budget):
+        self.projected_cost = projected_cost
+        self.max_budget = max_budget
+        super().__init__(
+            f"This request could bring the session's cost to ${projected_cost:.4f}, over the budget of ${max_budget:.4f}."
+        )
+
+
+def _cost(model, prompt_tokens, completion_tokens):
+    try:
+        prompt_cost, completion_cost = litellm.cost_per_token(
+            model=model,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+        )
+        return prompt_cost + completion_cost
+    except Exception:
+        return 0.0  # Not in the cost map (e.g. local models)
+
+
+class TokenAccountant:
+    def __init__(self):
+        self.session_id = str(int(time.time() * 1000))
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost = 0.0
+        self.turns = []
+        self.current = None
+        self._completion = []  # Text of the current turn's completion
+        self._usage = None  # (prompt_tokens, completion_tokens) the provider reported for the current turn
+        self._cached = False  # Whether the current turn came from the response cache
+        self._subscribers = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback):
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def count_tokens(self, model, messages=None, text=None):
+        try:
+            if text is not None:
+                return len(litellm.encode(model=model, text=text))
+            return litellm.token_counter(model=model, messages=messages)
+        except Exception:
+            # Unknown tokenizer, ~4 characters per token
+            if text is not None:
+                return max(1, len(text) // 4) if text else 0
+            return sum(len(str(message.get("content", ""))) // 4 + 4 for message in messages)
+
+    def start_turn(self, model, messages):
+        prompt_tokens = self.count_tokens(model, messages=messages)
+        self.current = {
+            "session_id": self.session_id,
+            "model": model,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": 0,
+            "cost": 0.0,
+            "started": time.time(),
+        }
+        self._completion = []
+        self._usage = None
+        self._cached = False
+        return prompt_tokens
+
+    def check_budget(self, max_budget, max_tokens=None):
+        """
+        Raises BudgetExceededError if the current turn, at its longest, would take the session over `max_budget`.
+        """
+        if not max_budget or self.current is None:
+            return
+        worst_case = _cost(
+            self.current["model"], self.current["prompt_tokens"], max_tokens or 0
+        )
+        if self.cost + worst_case > max_budget:
+            self.current = None
+            raise BudgetExceededError(self.cost + worst_case, max_budget)
+
+    def add_completion(self, text):
+        # Counted in end_turn, once, and only if the provider didn't report usage
+        if self.current is None or not text:
+            return
+        self._completion.append(text)
+
+    def add_usage(self, usage):
+        """
+        Takes the provider's token counts for the current turn, from a stream chunk's `usage`.
+        """
+        if self.current is None or not usage:
+            return
+        get = usage.get if isinstance(usage, dict) else lambda key: getattr(usage, key, None)
+        prompt_tokens, completion_tokens = get("prompt_tokens"), get("completion_tokens")
+        if prompt_tokens or completion_tokens:
+            self._usage = (prompt_tokens or 0, completion_tokens or 0)
+
+    def mark_cached(self):
+        """
+        The current turn is answered from the response cache, so nothing was sent or paid for.
+        """
+        if self.current is not None:
+            self._cached = True
+
+    def wrap(self, completions):
+        """
+        Returns a completions function that reports the `usage` the provider includes in its stream.
+        """
+
+        def counted_completions(**params):
+            for chunk in completions(**params):
+                usage = chunk.get("usage") if isinstance(chunk, dict) else getattr(chunk, "usage", None)
+                if usage:
+                    self.add_usage(usage)
+                yield chunk
+
+        return counted_completions
+
+    def end_turn(self):
+        if self.current is None:
+            return None
+        turn, self.current = self.current, None
+        if self._cached:
+            return None  # Not charged, and not a request to the provider
+        if self._usage is not None:
+            turn["prompt_tokens"], turn["completion_tokens"] = self._usage
+        elif self._completion:
+            turn["completion_tokens"] = self.count_tokens(turn["model"], text="".join(self._completion))
+        return self._add(turn)
+
+    def record(self, model, messages, completion, kind, started=None):
+        """
+        Charges a request made outside of `Llm.run`'s turns (e.g. a context summary, on another thread)
+        as a turn of its own, marked with `kind`.
+        """
+        turn = {
+            "session_id": self.session_id,
+            "model": model,
+            "kind": kind,
+            "prompt_tokens": self.count_tokens(model, messages=messages),
+            "completion_tokens": self.count_tokens(model, text=completion) if completion else 0,
+            "started": started if started is not None else time.time(),
+        }
+        return self._add(turn)
+
+    def _add(self, turn):
+        turn["cost"] = _cost(turn["model"], turn["prompt_tokens"], turn["completion_tokens"])
+        turn["duration"] = time.time() - turn.pop("started")
+
+        with self._lock:
+            self.prompt_tokens += turn["prompt_tokens"]
+            self.completion_tokens += turn["completion_tokens"]
+            self.cost += turn["cost"]
+            self.turns.append(turn)
+
+        for callback in list(self._subscribers):
+            try:
+                callback(turn)
+            except Exception as e:
+                print(f"Token accounting subscriber failed: {e}")
+        return turn
+
+    def totals(self):
+        with self._lock:
+            return {
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "cost": self.cost,
+                "turns": len(self.turns),
+            }
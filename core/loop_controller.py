@@ -0,0 +1,169 @@
+"""
+Detects the end of a `loop=True` task while the response is still streaming.
+
+`LoopController.feed` runs every assistant message chunk through an Aho-Corasick automaton over the
+`loop_breakers`. The automaton keeps its state between chunks, so a breaker split across chunks is
+still found, and nothing already streamed is scanned twice. As soon as a breaker has been fully
+emitted, `_respond_and_store` stops generation instead of waiting for the response to finish.
+
+With function calling, the model is also offered a `task_done` function (`done_function_completions`).
+A call to it is turned into the matching breaker text, so the model can finish in the same response as
+its last piece of work, instead of needing another round trip just to say "The task is done."
+"""
+import json
+from collections import deque
+
+DONE_FUNCTION_NAME = "task_done"
+
+
+class StreamingMatcher:
+    """
+    Aho-Corasick automaton that's fed text incrementally.
+    """
+
+    def __init__(self, patterns):
+        self.patterns = [pattern for pattern in patterns if pattern]
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [None]  # Longest pattern ending at each state
+
+        for pattern in self.patterns:
+            state = 0
+            for char in pattern:
+                if char not in self._goto[state]:
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append(None)
+                    self._goto[state][char] = len(self._goto) - 1
+                state = self._goto[state][char]
+            self._output[state] = pattern
+
+        # Breadth-first, so failure links of shorter prefixes are ready first
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                if self._output[next_state] is None:
+                    self._output[next_state] = self._output[self._fail[next_state]]
+
+        self.state = 0
+
+    def reset(self):
+        self.state = 0
+
+    def feed(self, text):
+        """
+        Returns the first pattern completed by `text`, or None.
+        """
+        goto, fail, output = self._goto, self._fail, self._output
+        state = self.state
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state] is not None:
+                self.state = state
+                return output[state]
+        self.state = state
+        return None
+
+
+class LoopController:
+    def __init__(self, loop_breakers):
+        self.loop_breakers = list(loop_breakers)
+        self.matcher = StreamingMatcher(self.loop_breakers)
+        self.breaker = None
+        self._saw_code = False
+
+    def feed(self, chunk):
+        """
+        Feeds one LMC chunk. Returns True when generation should stop now.
+        """
+        if chunk.get("role") == "computer":
+            # A new response starts after code runs
+            self._saw_code = False
+            self.matcher.reset()
+            return False
+
+        if chunk.get("type") == "code":
+            self._saw_code = True
+            return False
+
+        if chunk.get("role") != "assistant" or chunk.get("type") != "message":
+            return False
+        if "start" in chunk or "end" in chunk:
+            return False
+
+        breaker = self.matcher.feed(chunk.get("content", ""))
+        if breaker is None:
+            return False
+        self.breaker = breaker
+        # Code written earlier in this response still has to run, so let the response finish
+        return not self._saw_code
+
+    def done_function(self):
+        return {
+            "name": DONE_FUNCTION_NAME,
+            "description": "Call this instead of writing a final message when the task is over, or can't continue.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "status": {
+                        "type": "string",
+                        "enum": self.loop_breakers,
+                        "description": "Why the loop is ending.",
+                    }
+                },
+                "required": ["status"],
+            },
+        }
+
+    def done_function_completions(self, completions):
+        """
+        Wraps a completions function: offers `task_done` alongside the other functions, and replaces a call
+        to it with the chosen breaker as plain message content.
+        """
+
+        def completions_with_done_function(**params):
+            if params.get("functions"):
+                params = {**params, "functions": list(params["functions"]) + [self.done_function()]}
+
+            calling_done = False
+            arguments = ""
+            for chunk in completions(**params):
+                try:
+                    choice = chunk["choices"][0]
+                    function_call = choice["delta"].get("function_call")
+                except (KeyError, IndexError, TypeError, AttributeError):
+                    yield chunk
+                    continue
+
+                if function_call is not None:
+                    name = function_call.get("name") if isinstance(function_call, dict) else getattr(function_call, "name", None)
+                    if name == DONE_FUNCTION_NAME:
+                        calling_done = True
+                    if calling_done:
+                        delta_arguments = function_call.get("arguments") if isinstance(function_call, dict) else getattr(function_call, "arguments", None)
+                        arguments += delta_arguments or ""
+                        continue
+
+                if calling_done and choice.get("finish_reason"):
+                    break
+                yield chunk
+
+            if calling_done:
+                try:
+                    status = json.loads(arguments).get("status")
+                except (ValueError, AttributeError):
+                    status = None
+                if status not in self.loop_breakers:
+                    status = self.loop_breakers[0]
+                yield {"choices": [{"index": 0, "delta": {"role": "assistant", "content": status}, "finish_reason": None}]}
+                yield {"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+
+        return completions_with_done_function
@@ -16,6 +16,16 @@ class UsageTracker:
                 action TEXT,
                 duration REAL)"""
         )
+        c.execute(
+            """CREATE TABLE IF NOT EXISTS token_usage
+               (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp TEXT,
+                session_id TEXT,
+                model TEXT,
+                prompt_tokens INTEGER,
+                completion_tokens INTEGER,
+                cost REAL)"""
+        )
         conn.commit()
         conn.close()
 
@@ -29,6 +39,28 @@ class UsageTracker:
         conn.commit()
         conn.close()
 
+    def track_tokens(self, turn):
+        conn = sqlite3.connect(self.database_file)
+        c = conn.cursor()
+        c.execute(
+            "INSERT INTO token_usage (timestamp, session_id, model, prompt_tokens, completion_tokens, cost) VALUES (?, ?, ?, ?, ?, ?)",
+            (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), turn["session_id"], turn["model"],
+             turn["prompt_tokens"], turn["completion_tokens"], turn["cost"])
+        )
+        conn.commit()
+        conn.close()
+
+    def get_token_statistics(self):
+        conn = sqlite3.connect(self.database_file)
+        c = conn.cursor()
+        c.execute(
+            """SELECT model, COUNT(*), SUM(prompt_tokens), SUM(completion_tokens), SUM(cost)
+               FROM token_usage GROUP BY model ORDER BY SUM(cost) DESC"""
+        )
+        results = c.fetchall()
+        conn.close()
+        return results
+
     def get_usage_statistics(self):
         conn = sqlite3.connect(self.database_file)
         c = conn.cursor()
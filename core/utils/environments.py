@@ -0,0 +1,225 @@
+"""
+Discovers Python environments (system, venv, conda) that code can be executed in.
+
+Discovery runs once, off the GUI thread, and the result is cached in the Open Interpreter dir.
+Each environment records its interpreter path and the environment variables that "activating" it
+would set, so a kernel can be started with `subprocess.Popen(**resolver.popen_kwargs(name))`
+directly in that environment, without a shell or `conda activate`.
+"""
+import json
+import os
+import shutil
+import subprocess
+import sys
+import threading
+
+from terminal_interface.utils.oi_dir import oi_dir
+
+CACHE_FILE = os.path.join(oi_dir, "environments.json")
+
+
+def _bin_dirs(prefix):
+    if os.name == "nt":
+        return [
+            prefix,
+            os.path.join(prefix, "Library", "bin"),
+            os.path.join(prefix, "Scripts"),
+        ]
+    return [os.path.join(prefix, "bin")]
+
+
+def _python_path(prefix):
+    if os.name == "nt":
+        return os.path.join(prefix, "python.exe")
+    return os.path.join(prefix, "bin", "python")
+
+
+def _environment(name, kind, prefix, python=None):
+    python = python or _python_path(prefix)
+    if not os.path.exists(python):
+        return None
+
+    env = {"PATH": os.pathsep.join(_bin_dirs(prefix))}  # Prepended to PATH
+    if kind == "conda":
+        env["CONDA_PREFIX"] = prefix
+        env["CONDA_DEFAULT_ENV"] = name
+    elif kind == "venv":
+        env["VIRTUAL_ENV"] = prefix
+
+    return {"name": name, "kind": kind, "prefix": prefix, "python": python, "env": env}
+
+
+class EnvironmentResolver:
+    def __init__(self, cache_file=CACHE_FILE):
+        self.cache_file = cache_file
+        self.search_paths = []  # Extra directories (e.g. a workspace) to look for .venv / venv in
+        self._environments = None
+        self._lock = threading.Lock()
+        self._discovery = None
+
+    @property
+    def environments(self):
+        """
+        Known environments, keyed by name, from the disk cache. Empty until `discover_in_background`
+        has found them if there isn't one: discovery runs `conda env list`, which takes seconds, and this
+        is read on the GUI thread.
+        """
+        with self._lock:
+            if self._environments is None:
+                self._environments = self._load_cache()
+            environments = self._environments
+        if environments is None:
+            self.discover_in_background()
+            return {}
+        return environments
+
+    def get(self, name=None):
+        environments = self.environments
+        if name is None:
+            return environments.get("system")
+        return environments.get(name)
+
+    def env(self, name=None):
+        """
+        Returns a copy of `os.environ` as it would be after activating the environment.
+        """
+        env = dict(os.environ)
+        environment = self.get(name)
+        if environment is None:
+            return env
+        for key, value in environment["env"].items():
+            if key == "PATH":
+                env["PATH"] = value + os.pathsep + env.get("PATH", "")
+            else:
+                env[key] = value
+        return env
+
+    def popen_kwargs(self, name=None):
+        """
+        Keyword arguments for `subprocess.Popen` that start a process inside the environment.
+        """
+        environment = self.get(name)
+        return {
+            "executable": environment["python"] if environment else sys.executable,
+            "env": self.env(name),
+        }
+
+    def discover(self):
+        environments = {}
+        for environment in self._discover_system() + self._discover_venvs() + self._discover_conda():
+            if environment is not None and environment["name"] not in environments:
+                environments[environment["name"]] = environment
+
+        with self._lock:
+            self._environments = environments
+        self._save_cache(environments)
+        return environments
+
+    def discover_in_background(self, callback=None, refresh=False):
+        """
+        Runs `discover` on a daemon thread, unless the environments are already cached (or `refresh` is set).
+        `callback` receives the environments when they're available.
+        """
+        if not refresh:
+            with self._lock:
+                if self._environments is None:
+                    self._environments = self._load_cache()
+                environments = self._environments
+            if environments is not None:
+                if callback:
+                    callback(environments)
+                return None
+
+        def run():
+            environments = self.discover()
+            if callback:
+                callback(environments)
+
+        with self._lock:
+            if self._discovery is not None and self._discovery.is_alive():
+                return self._discovery
+            self._discovery = threading.Thread(target=run, daemon=True)
+        self._discovery.start()
+        return self._discovery
+
+    def _discover_system(self):
+        python = shutil.which("python3") or shutil.which("python") or sys.executable
+        return [_environment("system", "system", sys.base_prefix, python=python)]
+
+    def _discover_venvs(self):
+        prefixes = []
+        if os.environ.get("VIRTUAL_ENV"):
+            prefixes.append(os.environ["VIRTUAL_ENV"])
+        for directory in self.search_paths:
+            for name in (".venv", "venv"):
+                prefixes.append(os.path.join(directory, name))
+
+        # Named after the project they belong to, e.g. "myproject/.venv"
+        return [
+            _environment(
+                os.path.basename(os.path.dirname(prefix)) + "/" + os.path.basename(prefix),
+                "venv",
+                prefix,
+            )
+            for prefix in prefixes
+            if os.path.exists(os.path.join(prefix, "pyvenv.cfg"))
+        ]
+
+    def _discover_conda(self):
+        prefixes = []
+        conda = os.environ.get("CONDA_EXE") or shutil.which("conda")
+        if conda:
+            try:
+                result = subprocess.run(
+                    [conda, "env", "list", "--json"],
+                    capture_output=True,
+                    text=True,
+                    check=True,
+                    timeout=30,
+                )
+                prefixes = json.loads(result.stdout).get("envs", [])
+            except Exception:
+                prefixes = []
+
+        if not prefixes:
+            # Conda keeps a plain list of environments it has created
+            environments_txt = os.path.join(os.path.expanduser("~"), ".conda", "environments.txt")
+            if os.path.exists(environments_txt):
+                with open(environments_txt) as f:
+                    prefixes = [line.strip() for line in f if line.strip()]
+
+        environments = []
+        for prefix in prefixes:
+            # Named environments live in <root>/envs/<name>. The root install is "base" (only it has
+            # condabin/), and environments created with `--prefix` anywhere else go by their path
+            if os.path.basename(os.path.dirname(prefix)) == "envs":
+                name = os.path.basename(prefix)
+            elif os.path.isdir(os.path.join(prefix, "condabin")):
+                name = "base"
+            else:
+                name = prefix
+            environments.append(_environment(name, "conda", prefix))
+        return environments
+
+    def _load_cache(self):
+        try:
+            with open(self.cache_file) as f:
+                environments = json.load(f)
+        except (OSError, ValueError):
+            return None
+        # Drop environments that were deleted since they were cached
+        return {
+            name: environment
+            for name, environment in environments.items()
+            if os.path.exists(environment["python"])
+        }
+
+    def _save_cache(self, environments):
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            temp_file = self.cache_file + ".tmp"
+            with open(temp_file, "w") as f:
+                json.dump(environments, f)
+            os.replace(temp_file, self.cache_file)
+        except OSError:
+            pass
@@ -0,0 +1,32 @@
+"""
+Defines a `BackendLoader` thread that imports and constructs the interpreter off the GUI thread.
+
+Importing `core.core` pulls in litellm (and its cost map), tokentrim, requests and the whole `Computer`
+tree, which takes seconds. Doing it here lets `main.py` put the window on screen first. The
+`loaded` signal carries the `OpenInterpreter` once it's ready, and `failed` carries the error message.
+"""
+from PyQt6.QtCore import QThread, QCoreApplication, pyqtSignal
+
+class BackendLoader(QThread):
+    loaded = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, interpreter_factory=None):
+        super().__init__()
+        self.interpreter_factory = interpreter_factory
+
+    def run(self):
+        try:
+            if self.interpreter_factory is None:
+                from core.core import OpenInterpreter
+                interpreter = OpenInterpreter()
+            else:
+                interpreter = self.interpreter_factory()
+
+            # QObjects created here belong to this thread, which is about to exit
+            interpreter.file_tracker.moveToThread(QCoreApplication.instance().thread())
+        except Exception as e:
+            print(f"BackendLoader: Error occurred: {str(e)}")  # Debug print
+            self.failed.emit(str(e))
+            return
+        self.loaded.emit(interpreter)
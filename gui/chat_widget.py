@@ -1,21 +1,12 @@
 import os
 from PyQt6.QtWidgets import QWidget, QVBoxLayout, QTextEdit, QLineEdit, QPushButton, QHBoxLayout, QScrollBar
-from PyQt6.QtCore import pyqtSignal, Qt, QThread
+from PyQt6.QtCore import pyqtSignal, Qt
 from PyQt6.QtGui import QTextCursor, QColor, QTextCharFormat, QImage, QPixmap
-from gui.interpreter_thread import InterpreterThread
+from gui.turn_scheduler import TurnScheduler
 from gui.image_display_window import ImageDisplayWindow
-
-class InterpreterThread(QThread):
-    output_received = pyqtSignal(dict)
-
-    def __init__(self, interpreter, message):
-        super().__init__()
-        self.interpreter = interpreter
-        self.message = message
-
-    def run(self):
-        for response in self.interpreter.chat(self.message, display=True, stream=True):
-            self.output_received.emit(response)
+from gui.table_display_window import TableDisplayWindow
+from gui.file_reference_matcher import FileReferenceMatcher
+from core.blob_store import BlobStore, DEFAULT_BLOB_PATH, is_blob
 
 class ChatWidget(QWidget):
     """
@@ -24,6 +15,7 @@ class ChatWidget(QWidget):
     This signal is emitted by the `ChatWidget` class when the user sends a message through the chat interface. The signal carries the message text as a string.
     """
     message_sent = pyqtSignal(str)
+    turn_finished = pyqtSignal()
     file_operation_occurred = pyqtSignal(str, str, str)
 
     def __init__(self, interpreter):
@@ -32,7 +24,10 @@ class ChatWidget(QWidget):
         self.current_message = {"role": "", "content": ""}
         self.file_list_widget = None  # Will be set later
         self.uploaded_files = {}
+        self.file_matcher = FileReferenceMatcher()
         self.main_window = None  # Will be set later
+        self.scheduler = TurnScheduler(interpreter)
+        self.blobs = BlobStore(DEFAULT_BLOB_PATH)  # Large outputs of saved conversations are read from here
 
         layout = QVBoxLayout()
 
@@ -52,12 +47,37 @@ class ChatWidget(QWidget):
         self.send_button.clicked.connect(self.send_message)
         input_layout.addWidget(self.send_button)
 
+        self.stop_button = QPushButton("Stop")
+        self.stop_button.clicked.connect(self.stop_response)
+        self.stop_button.setEnabled(False)
+        input_layout.addWidget(self.stop_button)
+
         layout.addLayout(input_layout)
 
         self.setLayout(layout)
 
+        # Turns run one at a time, in order
+        self.scheduler.output_received.connect(self.handle_interpreter_output)
+        self.scheduler.turn_started.connect(self.update_stop_button)
+        self.scheduler.turn_finished.connect(self.update_stop_button)
+        self.scheduler.turn_finished.connect(self.turn_finished)
+        self.scheduler.queue_changed.connect(self.update_stop_button)
+        self.scheduler.backpressure.connect(self.handle_backpressure)
+
         self.message_sent.connect(self.handle_message)
-        self.interpreter.file_tracker.file_operation.connect(self.handle_file_operation)
+        if interpreter is not None:
+            self.set_interpreter(interpreter)
+        else:
+            # Still being constructed in the background
+            self.input_field.setEnabled(False)
+            self.send_button.setEnabled(False)
+
+    def set_interpreter(self, interpreter):
+        self.interpreter = interpreter
+        self.scheduler.interpreter = interpreter
+        self.interpreter.file_tracker.file_operations.connect(self.handle_file_operations)
+        self.input_field.setEnabled(True)
+        self.send_button.setEnabled(True)
 
     def set_file_list_widget(self, file_list_widget):
         self.file_list_widget = file_list_widget
@@ -75,39 +95,43 @@ class ChatWidget(QWidget):
         """
         Handles a message sent by the user in the chat interface.
         
-        This method is called when the user sends a message through the chat interface. It appends the message to the chat display, adds the message to the interpreter's message history, and then processes the message to generate a response.
+        This method is called when the user sends a message through the chat interface. It appends the message to the chat display and then processes the message to generate a response. The interpreter adds it to its message history when its turn starts.
         
         Args:
             message (str): The text of the message sent by the user.
         """
         self.append_message("User", message)
-        self.interpreter.messages.append({
-            "role": "user",
-            "type": "message",
-            "content": message
-        })
         self.process_message(message)
 
     def process_message(self, message):
         """
         Processes a message sent by the user in the chat interface.
         
-        This method checks if the message contains any file names that have been uploaded, and replaces those file names with the corresponding file paths. It then creates a new `InterpreterThread` instance, passing the interpreter and the message as arguments, and starts the thread. The `output_received` signal from the `InterpreterThread` instance is connected to the `handle_interpreter_output` method, which will handle the output from the interpreter.
+        This method replaces any uploaded file names in the message with the corresponding file paths in a single pass (longest name wins, and names only match on word boundaries). It then queues the message on the `TurnScheduler`, which runs it once the turns before it are done (or merges it into a queued turn sent just before). The scheduler's `output_received` signal is connected to the `handle_interpreter_output` method, which will handle the output from the interpreter.
         
         Args:
             message (str): The text of the message sent by the user.
         """
         print(f"Processing message: {message}")  # Debug print
         # Check if the message contains a file name
-        for file_name, file_path in self.uploaded_files.items():
-            if file_name in message:
-                message = message.replace(file_name, file_path)
-        
+        message = self.file_matcher.substitute(message)
+
         print(f"Modified message: {message}")  # Debug print
-        self.interpreter_thread = InterpreterThread(self.interpreter, message)
-        self.interpreter_thread.output_received.connect(self.handle_interpreter_output)
-        self.interpreter_thread.start()
-        print("InterpreterThread started")  # Debug print
+        if not self.scheduler.submit(message):
+            self.append_message("System", "Too many messages are waiting, this one wasn't sent. Wait for a response or press Stop.")
+
+    def stop_response(self):
+        """
+        Cancels the response in progress, and the queued messages. The LLM stream is closed and running code is interrupted; whatever was already streamed stays in the chat.
+        """
+        self.scheduler.cancel()
+
+    def update_stop_button(self, *args):
+        self.stop_button.setEnabled(self.scheduler.busy or bool(self.scheduler.pending))
+
+    def handle_backpressure(self, saturated):
+        self.send_button.setEnabled(not saturated)
+        self.input_field.setPlaceholderText("Waiting for queued messages..." if saturated else "")
 
 
 
@@ -141,6 +165,10 @@ class ChatWidget(QWidget):
 
           If the output is console output, the method appends the output directly to the chat display.
           """
+          # Live output of one of several blocks running at once (see ExecutionScheduler). The merged
+          # output that follows it has the same lines, so only that is shown
+          if "block" in response:
+              return
           if response['type'] == 'message':
               if response.get('start', False):
                   self.current_message = {"role": "assistant", "content": ""}
@@ -157,6 +185,8 @@ class ChatWidget(QWidget):
                   self.current_message = {"role": "", "content": ""}
           elif response['type'] == 'console' and response.get('format') == 'output':
               self.append_console_output(response.get('content', ''))
+          elif response['type'] == 'table' and response.get('format') == 'arrow' and response.get('content'):
+              self.display_table(response['content'])
 
     def append_message(self, sender, content):
         """
@@ -226,24 +256,33 @@ class ChatWidget(QWidget):
     def handle_file_upload(self, file_paths, file_names):
         for file_name, file_path in zip(file_names, file_paths):
             self.uploaded_files[file_name] = file_path
+            self.file_matcher.add(file_name, file_path)
         self.append_message("System", f"File uploaded: {file_name}")
-        self.interpreter.messages.append({
+        # Added to the history when the turn starts, not while another turn is running
+        note = {
             "role": "assistant",
             "type": "message",
             "content": f"A file named '{file_name}' has been uploaded. You can refer to it in your responses."
-        })
-        self.process_message(f"Analyze this file: {file_name}")
+        }
+        if not self.scheduler.submit(self.file_matcher.substitute(f"Analyze this file: {file_name}"), context=[note], coalesce=False):
+            self.append_message("System", "Too many messages are waiting, the file wasn't analyzed.")
 
-    def handle_file_operation(self, operation, filename, content):
+    def handle_file_operations(self, batch):
         """
         Emits a signal to indicate that a file operation has occurred.
         
         Args:
-            operation (str): The type of file operation that occurred (e.g. "upload", "download", "delete").
-            filename (str): The name of the file involved in the operation.
-            content (bytes): The content of the file, if applicable (e.g. for upload or download operations).
+            batch (dict): The operations on one file, as batched by `FileOperationTracker`. It's reported as
+                "write" with the number of writes, their size and the preview, or as "open" with the mode.
         """
-        self.file_operation_occurred.emit(operation, filename, content)
+        if batch["writes"]:
+            summary = f"{batch['writes']} write(s), {batch['size']} bytes"
+            if batch["preview"]:
+                truncated = "\n[...]" if batch["truncated"] else ""
+                summary += f":\n{batch['preview']}{truncated}"
+            self.file_operation_occurred.emit('write', batch["path"], summary)
+        else:
+            self.file_operation_occurred.emit('open', batch["path"], f'File opened in {batch["mode"]} mode')
 
     def display_image(self, file_path):
         """
@@ -259,12 +298,42 @@ class ChatWidget(QWidget):
         image_window.show()
         self.append_message("System", f"Opened image: {file_path}")
 
+    def display_table(self, table_path):
+        """
+        Displays a table result of the Python kernel in a separate window. Only the rows on screen are read.
+        """
+        table_window = TableDisplayWindow(table_path, self)
+        table_window.show()
+        self.append_message("System", f"Opened table: {table_path}")
+
+    def load_conversation(self, messages):
+        """
+        Replaces the chat display with a saved conversation.
+        """
+        self.chat_display.clear()
+        for message in messages:
+            content = message.get("content")
+            if not isinstance(content, str) or message.get("type") == "image":
+                continue
+            if is_blob(message):
+                content = self.blobs.resolve(message)["content"]
+            if message.get("type") == "message":
+                self.append_message("User" if message.get("role") == "user" else message.get("role", "assistant"), content)
+            elif message.get("type") == "code":
+                self.append_code(content, message.get("format", "python"))
+            elif message.get("type") == "console" and message.get("format") == "output":
+                self.append_console_output(content)
+
     def clear_chat(self):
         """
         Clears the chat display, resets the interpreter's message history, and clears the uploaded files dictionary.
         
         This method is used to reset the state of the chat widget, removing all previous messages, file uploads, and interpreter history. It is typically called when the user wants to start a new conversation or clear the chat display.
         """
+        if not self.scheduler.cancel(wait=True):
+            self.append_message("System", "The current turn is still stopping, the chat wasn't cleared. Try again in a moment.")
+            return
         self.chat_display.clear()
         self.interpreter.messages = []
         self.uploaded_files = {}
+        self.file_matcher.clear()
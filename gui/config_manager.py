@@ -1,7 +1,16 @@
 import json
 import os
+import tempfile
 
 class ConfigManager:
+    """
+    Loads and saves `config.json`.
+
+    The parsed config is cached in memory and only re-read when the file's mtime or size changes,
+    so callers can use `load_config` freely. Saves are atomic (temp file + rename), and subscribers
+    registered with `subscribe` are called with a dict of the keys whose values changed.
+    """
+
     def __init__(self, config_file='config.json'):
         self.config_file = config_file
         self.default_config = {
@@ -14,14 +23,64 @@ class ConfigManager:
             'site_url': '',
             'site_name': ''
         }
+        self._cache = None
+        self._cache_stamp = None
+        self._subscribers = []
+
+    def subscribe(self, callback):
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
 
     def save_config(self, config):
-        with open(self.config_file, 'w') as f:
-            json.dump(config, f)
+        previous = self.load_config()
+
+        directory = os.path.dirname(os.path.abspath(self.config_file))
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.config-', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(config, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.config_file)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        self._cache = {**self.default_config, **config}
+        self._cache_stamp = self._file_stamp()
+        self._notify(previous, self._cache)
 
     def load_config(self):
+        stamp = self._file_stamp()
+        if self._cache is None or stamp != self._cache_stamp:
+            previous = self._cache
+            self._cache = self._read_config()
+            self._cache_stamp = stamp
+            if previous is not None:
+                self._notify(previous, self._cache)
+        return dict(self._cache)
+
+    def _read_config(self):
         if os.path.exists(self.config_file):
             with open(self.config_file, 'r') as f:
                 user_config = json.load(f)
                 return {**self.default_config, **user_config}
-        return self.default_config
+        return dict(self.default_config)
+
+    def _file_stamp(self):
+        try:
+            stat = os.stat(self.config_file)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _notify(self, previous, current):
+        changed = {key: value for key, value in current.items() if previous.get(key) != value}
+        if not changed:
+            return
+        for callback in list(self._subscribers):
+            callback(changed)
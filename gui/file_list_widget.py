@@ -1,6 +1,7 @@
 import os
-from PyQt6.QtWidgets import QWidget, QVBoxLayout, QPushButton, QListWidget, QListWidgetItem, QFileDialog
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QPushButton, QListWidget, QListWidgetItem, QFileDialog, QLabel
 from PyQt6.QtCore import pyqtSignal, Qt
+from gui.workspace_tree import WorkspaceTreeWidget
 
 class FileListWidget(QWidget):
     file_uploaded = pyqtSignal(list, list)  # Emit lists of file paths and file names
@@ -13,10 +14,18 @@ class FileListWidget(QWidget):
         
         layout = QVBoxLayout()
 
-        # File list
+        # Workspace files, kept up to date as code creates and deletes them
+        self.workspace_label = QLabel("Workspace")
+        layout.addWidget(self.workspace_label)
+        self.workspace_tree = WorkspaceTreeWidget()
+        self.workspace_tree.file_selected.connect(self.file_selected)
+        layout.addWidget(self.workspace_tree, 3)
+
+        # Uploaded files
+        layout.addWidget(QLabel("Uploads"))
         self.file_list = QListWidget()
         self.file_list.itemClicked.connect(self.on_file_selected)
-        layout.addWidget(self.file_list)
+        layout.addWidget(self.file_list, 1)
 
         # Upload button
         self.upload_button = QPushButton("Upload Files")
@@ -25,6 +34,11 @@ class FileListWidget(QWidget):
 
         self.setLayout(layout)
 
+    def set_workspace(self, path):
+        self.workspace_label.setText(f"Workspace: {path}")
+        self.workspace_label.setToolTip(path)
+        self.workspace_tree.set_root(path)
+
     def upload_files(self):
         file_paths, _ = QFileDialog.getOpenFileNames(self, "Upload Files")
         file_names = [os.path.basename(file_path) for file_path in file_paths]
@@ -0,0 +1,123 @@
+"""
+Defines a `FileReferenceMatcher` that swaps uploaded file names for their paths in a user message.
+
+Names are kept in a character trie that grows as files are uploaded, so no rebuild is needed per upload.
+Substitution is a single left-to-right pass: at every word boundary the trie is walked as far as the
+message allows, and the longest name that also ends on a word boundary wins. That way `data.csv`
+never matches inside `mydata.csv`, and `report.csv` is preferred over `report` when both are uploaded.
+A `.` followed by a letter or digit continues a name (`data.csv.bak`, `old.data.csv`), a `.` that ends
+a sentence doesn't.
+"""
+
+_END = object()  # Trie key marking the end of a file name, value is the file path
+
+
+def _is_word_char(char):
+    return char.isalnum() or char == "_"
+
+
+def _continues_before(message, i):
+    """
+    Whether the text before `message[i]` runs into it, so a name can't start there.
+    """
+    if i == 0:
+        return False
+    char = message[i - 1]
+    return _is_word_char(char) or (char == "." and i > 1 and message[i - 2].isalnum())
+
+
+def _continues_after(message, j):
+    """
+    Whether the text from `message[j]` on continues what's before it, so a name can't end there.
+    """
+    if j == len(message):
+        return False
+    char = message[j]
+    return _is_word_char(char) or (char == "." and j + 1 < len(message) and message[j + 1].isalnum())
+
+
+class FileReferenceMatcher:
+    def __init__(self, files=None):
+        self._root = {}
+        self._count = 0
+        if files:
+            for file_name, file_path in files.items():
+                self.add(file_name, file_path)
+
+    def __len__(self):
+        return self._count
+
+    def add(self, file_name, file_path):
+        if not file_name:
+            return
+        node = self._root
+        for char in file_name:
+            node = node.setdefault(char, {})
+        if _END not in node:
+            self._count += 1
+        node[_END] = file_path
+
+    def remove(self, file_name):
+        path = [self._root]
+        for char in file_name:
+            node = path[-1].get(char)
+            if node is None:
+                return
+            path.append(node)
+        if path[-1].pop(_END, None) is None:
+            return
+        self._count -= 1
+
+        # Prune branches that no longer lead to any name
+        for depth in range(len(file_name), 0, -1):
+            if path[depth]:
+                break
+            del path[depth - 1][file_name[depth - 1]]
+
+    def clear(self):
+        self._root = {}
+        self._count = 0
+
+    def substitute(self, message):
+        """
+        Returns `message` with every uploaded file name replaced by its path.
+        """
+        if not self._count or not message:
+            return message
+
+        root = self._root
+        length = len(message)
+        pieces = []
+        copied_up_to = 0
+        i = 0
+
+        while i < length:
+            if message[i] not in root or _continues_before(message, i):
+                i += 1
+                continue
+
+            node = root
+            j = i
+            match_end = -1
+            match_path = None
+            while j < length:
+                node = node.get(message[j])
+                if node is None:
+                    break
+                j += 1
+                if _END in node and not _continues_after(message, j):
+                    match_end = j
+                    match_path = node[_END]
+
+            if match_end == -1:
+                i += 1
+                continue
+
+            pieces.append(message[copied_up_to:i])
+            pieces.append(match_path)
+            copied_up_to = i = match_end
+
+        if not pieces:
+            return message
+        pieces.append(message[copied_up_to:])
+        return "".join(pieces)
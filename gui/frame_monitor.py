@@ -0,0 +1,45 @@
+"""
+Defines a `FrameMonitor` that measures how responsive the Qt event loop is.
+
+A timer is set to fire every `interval_ms` (one 60 Hz frame). When the event loop is busy, or blocked
+by another thread holding the GIL, the timer fires late, and the lateness is what a user sees as a
+stalled UI. Run `python main.py --profile-frames` (with or without `--backend-process`) and run some
+CPU-bound code. The frame latency of each turn is printed when it finishes. `python -m core.benchmark
+--frame-latency 5` measures it without the GUI, with CPU-bound code on a thread and in a child process.
+"""
+import statistics
+import time
+from PyQt6.QtCore import QObject, QTimer, Qt
+
+class FrameMonitor(QObject):
+    def __init__(self, interval_ms=16):
+        super().__init__()
+        self.interval = interval_ms / 1000
+        self.delays = []
+        self.last = None
+        self.timer = QTimer(self)
+        self.timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.timer.setInterval(interval_ms)
+        self.timer.timeout.connect(self.tick)
+
+    def start(self):
+        self.last = time.perf_counter()
+        self.timer.start()
+
+    def tick(self):
+        now = time.perf_counter()
+        self.delays.append(max(0.0, now - self.last - self.interval))
+        self.last = now
+
+    def report(self):
+        """
+        Returns a summary of the delays since the last report, and starts over.
+        """
+        delays, self.delays = sorted(self.delays), []
+        if not delays:
+            return "frames: none"
+        p95 = delays[min(len(delays) - 1, int(len(delays) * 0.95))]
+        return (
+            f"frames: {len(delays)}  late by: mean {statistics.mean(delays) * 1000:.1f}ms  "
+            f"p95 {p95 * 1000:.1f}ms  max {delays[-1] * 1000:.1f}ms"
+        )
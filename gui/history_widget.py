@@ -0,0 +1,141 @@
+"""
+Defines a `HistoryWidget` that lists and searches saved conversations through the interpreter's `ConversationCatalog`.
+
+Rows are fetched from the catalog in pages as the list is scrolled (`canFetchMore` / `fetchMore`), so
+thousands of conversations list instantly. Searching is debounced, and a conversation's messages are
+only read from disk when it's opened. What's already indexed is listed right away, while `CatalogSync`
+indexes new and changed files on a background thread (the first sync reads every conversation).
+"""
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QLineEdit, QListView
+from PyQt6.QtCore import Qt, QAbstractListModel, QModelIndex, QThread, QTimer, pyqtSignal
+
+class CatalogSync(QThread):
+    synced = pyqtSignal()
+
+    def __init__(self, catalog):
+        super().__init__()
+        self.catalog = catalog
+
+    def run(self):
+        try:
+            self.catalog.sync()  # Each call opens its own SQLite connection, so this is safe off the GUI thread
+        except Exception as e:
+            print(f"CatalogSync: Error occurred: {str(e)}")  # Debug print
+            return
+        self.synced.emit()
+
+class ConversationListModel(QAbstractListModel):
+    page_size = 200
+
+    def __init__(self):
+        super().__init__()
+        self.catalog = None
+        self.query = ""
+        self.rows = []
+        self.exhausted = True
+
+    def set_catalog(self, catalog):
+        self.catalog = catalog
+        self.refresh()
+
+    def set_query(self, query):
+        self.query = query
+        self.refresh()
+
+    def refresh(self):
+        self.beginResetModel()
+        self.rows = []
+        self.exhausted = self.catalog is None
+        self.endResetModel()
+        self.fetchMore(QModelIndex())
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def canFetchMore(self, parent):
+        return not parent.isValid() and not self.exhausted
+
+    def fetchMore(self, parent):
+        if parent.isValid() or self.exhausted:
+            return
+        if self.query:
+            page = self.catalog.search(self.query, limit=self.page_size, offset=len(self.rows))
+        else:
+            page = self.catalog.list(limit=self.page_size, offset=len(self.rows))
+        self.exhausted = len(page) < self.page_size
+        if not page:
+            return
+        self.beginInsertRows(QModelIndex(), len(self.rows), len(self.rows) + len(page) - 1)
+        self.rows.extend(page)
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        filename, title, updated, model, message_count, token_count = self.rows[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return f"{title}\n{updated}"
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return f"{filename}\nModel: {model or 'Unknown'}\nMessages: {message_count}\nTokens: ~{token_count}"
+        if role == Qt.ItemDataRole.UserRole:
+            return filename
+        return None
+
+class HistoryWidget(QWidget):
+    conversation_selected = pyqtSignal(str, list)  # Emit filename and messages when a conversation is opened
+
+    def __init__(self):
+        super().__init__()
+        self.catalog = None
+        self.sync_thread = None
+
+        layout = QVBoxLayout()
+
+        # Search box
+        self.search_field = QLineEdit()
+        self.search_field.setPlaceholderText("Search conversations...")
+        self.search_field.textChanged.connect(self.schedule_search)
+        layout.addWidget(self.search_field)
+
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(150)
+        self.search_timer.timeout.connect(self.run_search)
+
+        # Conversation list
+        self.model = ConversationListModel()
+        self.list_view = QListView()
+        self.list_view.setModel(self.model)
+        self.list_view.setUniformItemSizes(True)
+        self.list_view.activated.connect(self.open_conversation)
+        layout.addWidget(self.list_view)
+
+        self.setLayout(layout)
+
+    def set_catalog(self, catalog):
+        self.catalog = catalog
+        self.model.set_catalog(catalog)
+        # Queued to the GUI thread, the list is refreshed once the files are indexed
+        self.sync_thread = CatalogSync(catalog)
+        self.sync_thread.synced.connect(self.refresh)
+        self.sync_thread.start()
+
+    def refresh(self):
+        if self.catalog is not None:
+            self.model.refresh()
+
+    def schedule_search(self, _text):
+        self.search_timer.start()
+
+    def run_search(self):
+        if self.catalog is not None:
+            self.model.set_query(self.search_field.text().strip())
+
+    def open_conversation(self, index):
+        filename = index.data(Qt.ItemDataRole.UserRole)
+        try:
+            messages = self.catalog.load(filename)
+        except (OSError, ValueError) as e:
+            print(f"HistoryWidget: Failed to load {filename}: {str(e)}")  # Debug print
+            return
+        self.conversation_selected.emit(filename, messages)
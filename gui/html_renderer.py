@@ -0,0 +1,136 @@
+"""
+Defines an `HtmlRenderer` that renders HTML offscreen with QtWebEngine and returns a PNG screenshot of it.
+
+The HTML language uses it to give the model a picture of what it wrote. Views are pooled and reused
+across runs, so only the first render pays for starting the web engine. `render` can be called from
+any thread (code runs on the interpreter's thread); the rendering itself is always done on the GUI
+thread, which the calling thread waits on. Import it after the QApplication only if
+`AA_ShareOpenGLContexts` was set before it (main.py does), it's what QtWebEngine needs.
+"""
+import base64
+import threading
+import time
+from PyQt6.QtCore import QObject, QThread, QTimer, QUrl, QBuffer, QByteArray, QIODevice, QEventLoop, Qt, pyqtSignal
+from PyQt6.QtWidgets import QApplication
+
+try:
+    from PyQt6.QtWebEngineWidgets import QWebEngineView
+except ImportError:
+    QWebEngineView = None
+
+class HtmlRenderer(QObject):
+    render_requested = pyqtSignal(object)
+
+    def __init__(self, pool_size=2, width=1280, height=800, settle_ms=150, timeout=15):
+        super().__init__()  # Must be created on the GUI thread
+        self.available = QWebEngineView is not None and QApplication.instance() is not None
+        self.pool_size = pool_size
+        self.width = width
+        self.height = height
+        self.settle_ms = settle_ms  # Time for scripts and fonts to settle after the page loads
+        self.timeout = timeout  # For a page to load, then it's captured as it is
+        # Callers wait longer than a page may load, so a capture at the load timeout still reaches them
+        self.wait_timeout = timeout + settle_ms / 1000 + 5
+        self.views = []
+        self.idle = []
+        self.queue = []
+        self.latencies = []
+        self.render_requested.connect(self.start_render, Qt.ConnectionType.QueuedConnection)
+
+    def render(self, html, base_path=None):
+        """
+        Returns (base64 PNG, seconds it took), or (None, None) if it couldn't be rendered.
+        """
+        if not self.available:
+            return None, None
+
+        request = {
+            "html": html,
+            "base_path": base_path,
+            "started": time.perf_counter(),
+            "done": threading.Event(),
+            "image": None,
+            "loop": None,
+            "abandoned": False,
+        }
+        if QThread.currentThread() == self.thread():
+            # Can't block the GUI thread, so spin an event loop until the render is done
+            request["loop"] = QEventLoop()
+            self.start_render(request)
+            if not request["done"].is_set():
+                QTimer.singleShot(int(self.wait_timeout * 1000), request["loop"].quit)
+                request["loop"].exec()
+        else:
+            self.render_requested.emit(request)
+            request["done"].wait(self.wait_timeout)
+
+        if not request["done"].is_set():
+            request["abandoned"] = True  # E.g. it waited in the queue, it's dropped rather than rendered late
+            return None, None
+        if request["image"] is None:
+            return None, None
+        latency = request["latency"]
+        self.latencies.append(latency)
+        return request["image"], latency
+
+    def start_render(self, request):
+        if self.idle:
+            view = self.idle.pop()
+        elif len(self.views) < self.pool_size:
+            view = self.create_view()
+        else:
+            self.queue.append(request)
+            return
+        self.load(view, request)
+
+    def create_view(self):
+        view = QWebEngineView()
+        view.setAttribute(Qt.WidgetAttribute.WA_DontShowOnScreen, True)
+        view.resize(self.width, self.height)
+        view.show()
+        view.request = None
+        view.loadFinished.connect(lambda ok, view=view: self.on_load_finished(view, ok))
+        self.views.append(view)
+        return view
+
+    def load(self, view, request):
+        if request["abandoned"]:
+            self.next(view)
+            return
+        view.request = request
+        base_url = QUrl.fromLocalFile(request["base_path"].rstrip("/") + "/") if request["base_path"] else QUrl()
+        view.setHtml(request["html"], base_url)
+        # Pages that never finish loading are captured as they are
+        QTimer.singleShot(int(self.timeout * 1000), lambda: self.capture(view, request))
+
+    def on_load_finished(self, view, ok):
+        request = view.request
+        if request is not None:
+            QTimer.singleShot(self.settle_ms, lambda: self.capture(view, request))
+
+    def capture(self, view, request):
+        if view.request is not request:
+            return  # Already captured
+
+        try:
+            data = QByteArray()
+            buffer = QBuffer(data)
+            buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+            view.grab().save(buffer, "PNG")
+            buffer.close()
+            request["image"] = base64.b64encode(bytes(data)).decode("ascii")
+        except Exception as e:
+            print(f"HtmlRenderer: Failed to capture the page: {str(e)}")  # Debug print
+        request["latency"] = time.perf_counter() - request["started"]
+        request["done"].set()
+        if request["loop"] is not None:
+            request["loop"].quit()
+
+        view.request = None
+        self.next(view)
+
+    def next(self, view):
+        if self.queue:
+            self.load(view, self.queue.pop(0))
+        else:
+            self.idle.append(view)
@@ -3,7 +3,7 @@ Defines an `InterpreterThread` class that runs an interpreter in a separate thre
 
 The `InterpreterThread` class is responsible for running an interpreter in a separate thread and emitting signals to notify the main thread of the interpreter's progress and output. It takes an `interpreter` object and a `message` as input, and runs the interpreter's `chat` method in the separate thread, emitting the `output_received` signal for each response received from the interpreter, the `processing_started` signal when processing begins, and the `processing_finished` signal when processing completes.
 
-The `stop` method can be called to set the `is_running` flag to `False`, which will cause the thread to exit the next time it checks the flag.
+The `stop` method cancels the turn: it calls `interpreter.stop()`, which closes the LLM stream and interrupts running code. The interpreter then yields the end flags for whatever was partially streamed, so the thread emits those and finishes.
 """
 from PyQt6.QtCore import QThread, pyqtSignal
 import time
@@ -34,3 +34,4 @@ class InterpreterThread(QThread):
 
     def stop(self):
         self.is_running = False
+        self.interpreter.stop()
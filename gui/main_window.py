@@ -1,6 +1,6 @@
 import os
 from datetime import datetime
-from PyQt6.QtWidgets import QMainWindow, QVBoxLayout, QHBoxLayout, QWidget, QSplitter, QDialog, QTableWidget, QTableWidgetItem
+from PyQt6.QtWidgets import QMainWindow, QVBoxLayout, QHBoxLayout, QWidget, QSplitter, QDialog, QTableWidget, QTableWidgetItem, QLabel
 from PyQt6.QtGui import QAction, QIcon
 from PyQt6.QtCore import Qt
 from gui.chat_widget import ChatWidget
@@ -9,8 +9,11 @@ from gui.settings_dialog import SettingsDialog
 from gui.file_display_widget import FileDisplayWidget
 from core.usage_tracker import UsageTracker
 from gui.script_display_widget import ScriptDisplayWidget
+from gui.history_widget import HistoryWidget
 
 class MainWindow(QMainWindow):
+    max_display_chars = 1_000_000
+
     def __init__(self, interpreter, config_manager):
         super().__init__()
         self.interpreter = interpreter
@@ -22,6 +25,7 @@ class MainWindow(QMainWindow):
         self.file_list_widget = None
         self.file_display = None
         self.script_display = None
+        self.history_widget = None
 
         self.init_ui()
         self.create_menu_bar()
@@ -44,7 +48,10 @@ class MainWindow(QMainWindow):
         right_layout = QVBoxLayout(right_panel)
         
         top_right_splitter = QSplitter(Qt.Orientation.Vertical)
+        self.history_widget = HistoryWidget()
+        top_right_splitter.addWidget(self.history_widget)
         self.file_list_widget = FileListWidget(self.interpreter, self.chat_widget)
+        self.file_list_widget.setEnabled(self.interpreter is not None)
         self.file_display = FileDisplayWidget()
         top_right_splitter.addWidget(self.file_list_widget)
         top_right_splitter.addWidget(self.file_display)
@@ -63,12 +70,40 @@ class MainWindow(QMainWindow):
         main_layout.addWidget(splitter)
         self.setCentralWidget(main_widget)
 
+    def set_interpreter(self, interpreter):
+        """
+        Wires in the interpreter once `BackendLoader` has constructed it. Until then sending and uploading are disabled.
+        """
+        self.interpreter = interpreter
+        self.chat_widget.set_interpreter(interpreter)
+        self.file_list_widget.interpreter = interpreter
+        self.file_list_widget.set_workspace(getattr(interpreter, "workspace_path", None) or os.getcwd())
+        self.file_list_widget.setEnabled(True)
+        self.upload_action.setEnabled(True)
+        self.history_widget.set_catalog(interpreter.conversation_catalog)
+        interpreter.llm.accountant.subscribe(self.usage_tracker.track_tokens)
+        self.statusBar().showMessage("Ready")
+
     def connect_components(self):
         self.chat_widget.set_file_list_widget(self.file_list_widget)
         self.chat_widget.set_main_window(self)
         self.file_list_widget.file_uploaded.connect(self.chat_widget.handle_file_upload)
         self.file_list_widget.file_selected.connect(self.display_file)
         self.chat_widget.file_operation_occurred.connect(self.script_display.display_file_operation)
+        self.chat_widget.file_operation_occurred.connect(self.file_list_widget.workspace_tree.note_file_operation)
+        self.chat_widget.turn_finished.connect(self.history_widget.refresh)
+        self.history_widget.conversation_selected.connect(self.open_conversation)
+
+    def open_conversation(self, filename, messages):
+        if self.interpreter is None:
+            return
+        if not self.chat_widget.scheduler.cancel(wait=True):
+            self.chat_widget.append_message("System", "The current turn is still stopping, the conversation wasn't opened. Try again in a moment.")
+            return
+        self.interpreter.messages = messages
+        self.interpreter.conversation_filename = filename
+        self.chat_widget.load_conversation(messages)
+        self.statusBar().showMessage(f"Conversation: {filename}")
 
     def display_file(self, file_path):
         self.file_display.clear()
@@ -81,8 +116,12 @@ class MainWindow(QMainWindow):
             elif file_extension in ['mp4', 'avi', 'mov']:
                 self.file_display.display_video(file_path)
             else:
-                with open(file_path, 'r', encoding='utf-8') as file:
-                    content = file.read()
+                # Only as much as can be shown, files written by code can be huge
+                size = os.path.getsize(file_path)
+                with open(file_path, 'r', encoding='utf-8', errors='replace') as file:
+                    content = file.read(self.max_display_chars)
+                if size > len(content):
+                    content += f"\n\n[Showing the start of the file, it's {size} bytes]"
                 self.file_display.display_text(content)
         except Exception as e:
             self.file_display.display_error(f"Error displaying file: {str(e)}")
@@ -93,10 +132,11 @@ class MainWindow(QMainWindow):
         # File menu
         file_menu = menu_bar.addMenu("File")
         
-        upload_action = QAction(QIcon(), "Upload File", self)
-        upload_action.setShortcut("Ctrl+U")
-        upload_action.triggered.connect(self.file_list_widget.upload_files)
-        file_menu.addAction(upload_action)
+        self.upload_action = QAction(QIcon(), "Upload File", self)
+        self.upload_action.setShortcut("Ctrl+U")
+        self.upload_action.triggered.connect(self.file_list_widget.upload_files)
+        self.upload_action.setEnabled(self.interpreter is not None)
+        file_menu.addAction(self.upload_action)
 
         file_menu.addSeparator()
 
@@ -117,10 +157,11 @@ class MainWindow(QMainWindow):
         # File menu
         file_menu = menu_bar.addMenu("File")
         
-        upload_action = QAction(QIcon(), "Upload File", self)
-        upload_action.setShortcut("Ctrl+U")
-        upload_action.triggered.connect(self.file_list_widget.upload_files)
-        file_menu.addAction(upload_action)
+        self.upload_action = QAction(QIcon(), "Upload File", self)
+        self.upload_action.setShortcut("Ctrl+U")
+        self.upload_action.triggered.connect(self.file_list_widget.upload_files)
+        self.upload_action.setEnabled(self.interpreter is not None)
+        file_menu.addAction(self.upload_action)
 
         file_menu.addSeparator()
 
@@ -151,6 +192,24 @@ class MainWindow(QMainWindow):
             table_widget.setItem(i, 0, QTableWidgetItem(action))
             table_widget.setItem(i, 1, QTableWidgetItem(str(avg_duration)))
         layout.addWidget(table_widget)
+
+        token_stats = self.usage_tracker.get_token_statistics()
+        token_table = QTableWidget(len(token_stats), 5)
+        token_table.setHorizontalHeaderLabels(["Model", "Turns", "Prompt Tokens", "Completion Tokens", "Cost ($)"])
+        for i, (model, turns, prompt_tokens, completion_tokens, cost) in enumerate(token_stats):
+            token_table.setItem(i, 0, QTableWidgetItem(model))
+            token_table.setItem(i, 1, QTableWidgetItem(str(turns)))
+            token_table.setItem(i, 2, QTableWidgetItem(str(prompt_tokens)))
+            token_table.setItem(i, 3, QTableWidgetItem(str(completion_tokens)))
+            token_table.setItem(i, 4, QTableWidgetItem(f"{cost or 0:.4f}"))
+        layout.addWidget(token_table)
+
+        if self.interpreter is not None:
+            totals = self.interpreter.llm.accountant.totals()
+            layout.addWidget(QLabel(
+                f"This session: {totals['turns']} turns, {totals['prompt_tokens']} prompt tokens, "
+                f"{totals['completion_tokens']} completion tokens, ${totals['cost']:.4f}"
+            ))
         dialog.setLayout(layout)
         dialog.exec()
         chat_history = self.chat_widget.chat_display.toPlainText()
@@ -167,11 +226,13 @@ class MainWindow(QMainWindow):
             file.write(chat_history)
 
     def open_settings(self):
+        if self.interpreter is None:
+            return
         settings_dialog = SettingsDialog(self.interpreter, self.config_manager)
         settings_dialog.exec()
 
     def create_status_bar(self):
-        self.statusBar().showMessage("Ready")
+        self.statusBar().showMessage("Ready" if self.interpreter is not None else "Loading interpreter...")
 
     def update_status_bar(self, content_info):
         file_path = content_info['file_path'] or "Untitled"
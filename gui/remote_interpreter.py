@@ -0,0 +1,256 @@
+"""
+Defines a `RemoteInterpreter` that stands in for `OpenInterpreter` when the backend runs in a child process.
+
+It spawns `core.backend_process.serve` and talks to it over a local socket. It offers the part of the
+interpreter's interface the GUI uses (`chat`, `stop`, `messages`, `llm.apply_config`, `llm.accountant`,
+`file_tracker`...), so `TurnScheduler`, `ChatWidget` and `MainWindow` work the same with either one.
+A reader thread receives everything the child sends. Turn chunks go to the turn being streamed, replies
+to the call waiting for them, and events to the local `file_tracker` signal and accountant subscribers.
+"""
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+from multiprocessing.connection import Listener
+from queue import Empty, Queue
+from PyQt6.QtCore import QObject, pyqtSignal
+from core.backend_process import serve
+from core.conversation_catalog import ConversationCatalog
+from core.utils.environments import EnvironmentResolver
+
+class RemoteFileTracker(QObject):
+    file_operations = pyqtSignal(dict)
+
+class RemoteObject:
+    """
+    An attribute path in the child's interpreter. Calling it calls that method there.
+    """
+
+    def __init__(self, remote, path):
+        self._remote = remote
+        self._path = path
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return RemoteObject(self._remote, f"{self._path}.{name}")
+
+    def __call__(self, *args, **kwargs):
+        return self._remote.request("call", self._path, args=args, kwargs=kwargs)
+
+class RemoteAccountant:
+    def __init__(self, remote):
+        self.remote = remote
+        self.subscribers = []
+
+    def subscribe(self, callback):
+        self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self.subscribers:
+            self.subscribers.remove(callback)
+
+    def totals(self):
+        return self.remote.request("call", "llm.accountant.totals")
+
+class RemoteLlm(RemoteObject):
+    def __init__(self, remote):
+        super().__init__(remote, "llm")
+        self.accountant = RemoteAccountant(remote)
+
+class RemoteInterpreter:
+    def __init__(self, timeout=60):
+        self.timeout = timeout
+        authkey = os.urandom(32)
+        self._listener = Listener(authkey=authkey)
+        context = multiprocessing.get_context("spawn")
+        self.process = context.Process(target=serve, args=(self._listener.address, authkey), daemon=True)
+        self.process.start()
+        self._connection = self._accept()
+
+        self._send_lock = threading.Lock()
+        self._turn_lock = threading.Lock()
+        self._turn = None  # Queue of the turn being streamed
+        self._replies = {}
+        self._ids = itertools.count()
+        self._ready = Queue()
+
+        self.file_tracker = RemoteFileTracker()
+        self.llm = RemoteLlm(self)
+        self.environments = EnvironmentResolver()
+        self._conversation_catalog = None
+
+        threading.Thread(target=self._read, daemon=True).start()
+        event = self._ready.get(timeout=self.timeout)
+        if event["event"] == "failed":
+            self.close()
+            raise RuntimeError(event["error"])
+
+    # Interpreter interface
+
+    def chat(self, message=None, display=True, stream=False, blocking=True):
+        if stream:
+            return self._stream(message)
+        for _ in self._stream(message):
+            pass
+        return self.messages
+
+    def stop(self):
+        self._send({"op": "stop"})
+
+    def reset_stop(self):
+        # Sent on the same connection as `stop`, so the child sees them in the order they were called
+        self.request("call", "reset_stop")
+
+    @property
+    def messages(self):
+        return self.request("get", "messages")
+
+    @messages.setter
+    def messages(self, value):
+        self.request("set", "messages", value=value)
+
+    @property
+    def conversation_filename(self):
+        return self.request("get", "conversation_filename")
+
+    @conversation_filename.setter
+    def conversation_filename(self, value):
+        self.request("set", "conversation_filename", value=value)
+
+    @property
+    def conversation_catalog(self):
+        # Both processes can use the same SQLite index
+        if self._conversation_catalog is None:
+            self._conversation_catalog = ConversationCatalog(self.request("get", "conversation_history_path"))
+        return self._conversation_catalog
+
+    def close(self):
+        try:
+            self._send({"op": "close"})
+        except OSError:
+            pass
+        self.process.join(5)
+        if self.process.is_alive():
+            self.process.terminate()
+        self._connection.close()
+        self._listener.close()
+
+    # Plumbing
+
+    def _accept(self):
+        """
+        Waits for the child to connect. `Listener.accept` has no timeout, and would block forever if the
+        child died before connecting (e.g. a failed import), so it runs on a thread while the child is polled.
+        """
+        accepted = Queue()
+
+        def accept():
+            try:
+                accepted.put(self._listener.accept())
+            except Exception as e:
+                accepted.put(e)
+
+        threading.Thread(target=accept, daemon=True).start()
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                connection = accepted.get(timeout=0.1)
+            except Empty:
+                if not self.process.is_alive():
+                    error = f"The backend process exited with code {self.process.exitcode} before connecting."
+                elif time.monotonic() > deadline:
+                    self.process.terminate()
+                    error = f"The backend process didn't connect within {self.timeout}s."
+                else:
+                    continue
+            else:
+                if not isinstance(connection, Exception):
+                    return connection
+                self.process.terminate()
+                error = f"The backend process couldn't connect: {str(connection)}"
+            self._listener.close()
+            raise RuntimeError(error)
+
+    def request(self, op, path, **fields):
+        reply = Queue()
+        request_id = next(self._ids)
+        self._replies[request_id] = reply
+        try:
+            self._send({"op": op, "id": request_id, "path": path, **fields})
+            result = reply.get(timeout=self.timeout)
+        finally:
+            self._replies.pop(request_id, None)
+        if "error" in result:
+            raise RuntimeError(f"Backend process: {op} {path} failed:\n{result['error']}")
+        return result["value"]
+
+    def _send(self, message):
+        with self._send_lock:
+            self._connection.send(message)
+
+    def _stream(self, message):
+        with self._turn_lock:
+            turn = Queue()
+            self._turn = turn
+            finished = False
+            try:
+                self._send({"op": "chat", "message": message})
+                while True:
+                    item = turn.get()
+                    if "chunk" in item:
+                        yield item["chunk"]
+                    elif "done" in item:
+                        finished = True
+                        return
+                    else:
+                        finished = True
+                        raise RuntimeError(item["error"])
+            finally:
+                if not finished:
+                    # Abandoned mid-turn, let the child finish before the next one starts
+                    self.stop()
+                    while True:
+                        item = turn.get(timeout=self.timeout)
+                        if "chunk" not in item:
+                            break
+                self._turn = None
+
+    def _read(self):
+        while True:
+            try:
+                message = self._connection.recv()
+            except (EOFError, OSError):
+                break
+
+            if "reply" in message:
+                reply = self._replies.get(message["reply"])
+                if reply is not None:
+                    reply.put(message)
+            elif "event" in message:
+                self._handle_event(message)
+            elif self._turn is not None:
+                self._turn.put(message)
+
+        # The child is gone, fail whatever is waiting on it
+        error = {"error": "The backend process exited."}
+        self._ready.put({"event": "failed", **error})
+        if self._turn is not None:
+            self._turn.put(error)
+        for reply in list(self._replies.values()):
+            reply.put(error)
+
+    def _handle_event(self, message):
+        event = message["event"]
+        if event in ("ready", "failed"):
+            self._ready.put(message)
+        elif event == "file_operations":
+            # Queued to the receivers on the GUI thread
+            self.file_tracker.file_operations.emit(message["batch"])
+        elif event == "token_turn":
+            for callback in list(self.llm.accountant.subscribers):
+                try:
+                    callback(message["turn"])
+                except Exception as e:
+                    print(f"RemoteInterpreter: Token subscriber failed: {str(e)}")  # Debug print
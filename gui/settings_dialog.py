@@ -8,18 +8,22 @@ class SettingsDialog(QDialog):
         self.setWindowTitle("Settings")
         self.setGeometry(300, 300, 400, 450)
 
+        config = self.config_manager.load_config()
         layout = QVBoxLayout()
 
         # Model selector
         self.model_selector = QComboBox()
-        self.model_selector.addItems(self.config_manager.load_config()['available_models'])
+        self.model_selector.addItems(config['available_models'])
+        # Warm the model when the user picks it (not while scrolling through the list, or when the
+        # current setting is shown), so saving switches to it instantly
+        self.model_selector.textActivated.connect(self.interpreter.llm.model_registry.preload)
         layout.addWidget(QLabel("Model:"))
         layout.addWidget(self.model_selector)
 
         # Default Model selector
         layout.addWidget(QLabel("Default Language Model:"))
         self.default_model_selector = QComboBox()
-        self.default_model_selector.addItems(self.config_manager.load_config()['available_models'])
+        self.default_model_selector.addItems(config['available_models'])
         layout.addWidget(self.default_model_selector)
 
         # Context Window
@@ -61,12 +65,11 @@ class SettingsDialog(QDialog):
         layout.addWidget(save_button)
 
         self.setLayout(layout)
-        self.load_current_settings()
+        self.load_current_settings(config)
 
-    def load_current_settings(self):
-        config = self.config_manager.load_config()
-        self.model_selector.setCurrentText(config.get('model', 'gpt-4o'))
-        config = self.config_manager.load_config()
+    def load_current_settings(self, config=None):
+        if config is None:
+            config = self.config_manager.load_config()
         self.model_selector.setCurrentText(config.get('model', 'gpt-4o'))
         self.api_base_selector.setCurrentText(config.get('api_base', 'https://openrouter.ai/api/v1'))
         self.api_key.setText(config.get('api_key', ''))
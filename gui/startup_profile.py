@@ -0,0 +1,53 @@
+"""
+Defines a `StartupProfile` that measures cold start of the GUI.
+
+Run `python main.py --profile-startup` to print the time from process start to the first paint of
+the main window and to the first usable send (interpreter constructed and wired in), then exit.
+The exit code is 1 if either mark is over its budget, so it can be used as a regression check.
+"""
+import time
+from PyQt6.QtCore import QObject, QEvent, pyqtSignal
+
+class StartupProfile(QObject):
+    finished = pyqtSignal()
+
+    # Seconds from process start
+    budget = {
+        "first_paint": 1.0,
+        "first_usable_send": 10.0,
+    }
+
+    def __init__(self, started_at):
+        super().__init__()
+        self.started_at = started_at
+        self.marks = {}
+
+    def watch(self, window):
+        window.installEventFilter(self)
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Paint and "first_paint" not in self.marks:
+            obj.removeEventFilter(self)
+            self.mark("first_paint")
+        return False
+
+    def mark(self, name):
+        if name in self.marks:
+            return
+        self.marks[name] = time.perf_counter() - self.started_at
+        if all(key in self.marks for key in self.budget):
+            self.finished.emit()
+
+    def report(self):
+        """
+        Prints the marks and returns the names of the ones that are over budget.
+        """
+        over_budget = []
+        for name, limit in self.budget.items():
+            elapsed = self.marks.get(name)
+            if elapsed is None or elapsed > limit:
+                over_budget.append(name)
+            elapsed_text = "n/a" if elapsed is None else f"{elapsed:.3f}s"
+            status = "OVER BUDGET" if name in over_budget else "ok"
+            print(f"{name}: {elapsed_text} (budget {limit:.3f}s) {status}")
+        return over_budget
@@ -0,0 +1,94 @@
+"""
+Defines a `TableDisplayWindow` that shows a table result of the Python kernel (see core/computer/terminal/tabular.py).
+
+The kernel writes the whole table to an Arrow IPC file. `ArrowTableModel` memory-maps it, so opening a
+million-row table reads no rows, and the view asks only for the rows on screen. Those are converted to
+Python values `block_size` rows at a time, and the last `max_blocks` blocks are kept for scrolling.
+"""
+from collections import OrderedDict
+from PyQt6.QtWidgets import QDialog, QVBoxLayout, QTableView, QLabel, QHeaderView
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+class ArrowTableModel(QAbstractTableModel):
+    block_size = 256
+    max_blocks = 64
+
+    def __init__(self, path):
+        super().__init__()
+        import pyarrow as pa
+
+        self.source = pa.memory_map(path, "r")
+        self.table = pa.ipc.open_file(self.source).read_all()  # Buffers point into the mapped file
+        self.blocks = OrderedDict()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.table.num_rows
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.table.num_columns
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role != Qt.ItemDataRole.DisplayRole:
+            return None
+        columns = self.block(index.row() // self.block_size)
+        value = columns[index.column()][index.row() % self.block_size]
+        return "null" if value is None else str(value)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            field = self.table.schema.field(section)
+            return f"{field.name}\n{field.type}"
+        return str(section)
+
+    def block(self, number):
+        if number in self.blocks:
+            self.blocks.move_to_end(number)
+            return self.blocks[number]
+        rows = self.table.slice(number * self.block_size, self.block_size)
+        columns = [column.to_pylist() for column in rows.columns]
+        self.blocks[number] = columns
+        while len(self.blocks) > self.max_blocks:
+            self.blocks.popitem(last=False)
+        return columns
+
+    def close(self):
+        self.blocks.clear()
+        self.table = None
+        self.source.close()
+
+class TableDisplayWindow(QDialog):
+    def __init__(self, table_path, parent=None):
+        super().__init__(parent)
+        self.table_path = table_path
+        self.model = None
+        self.init_ui()
+
+    def init_ui(self):
+        self.setWindowTitle("Table Display")
+        layout = QVBoxLayout()
+
+        try:
+            self.model = ArrowTableModel(self.table_path)
+        except Exception as e:
+            layout.addWidget(QLabel(f"Failed to load table: {self.table_path}\n{str(e)}"))
+            self.setLayout(layout)
+            return
+
+        layout.addWidget(QLabel(f"{self.model.table.num_rows:,} rows x {self.model.table.num_columns} columns"))
+        self.table_view = QTableView()
+        self.table_view.setModel(self.model)
+        # Fixed row heights, so the view never measures rows it doesn't show
+        self.table_view.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.table_view.verticalHeader().setDefaultSectionSize(22)
+        layout.addWidget(self.table_view)
+
+        self.setLayout(layout)
+        self.resize(900, 600)
+
+    def closeEvent(self, event):
+        if self.model is not None:
+            self.table_view.setModel(None)
+            self.model.close()
+        super().closeEvent(event)
@@ -0,0 +1,128 @@
+"""
+Defines a `TurnScheduler` that runs one interpreter turn at a time for a chat session.
+
+Sends and uploads are queued instead of each starting its own `InterpreterThread`, which let two
+threads run `interpreter.chat` on the same interpreter at once and corrupt `messages`. Turns run in
+the order they were submitted, on one `InterpreterThread` at a time. Messages that go with a turn
+(like the note about an uploaded file) are added to the history on the GUI thread just before the
+turn starts, never while another turn is running.
+
+- Coalescing: a message sent within `coalesce_seconds` of the previous one, while that one is still
+  queued, is merged into the same turn, so a burst of follow-ups costs one LLM round trip.
+- Cancellation: `cancel` doesn't wait its turn. It stops the running turn right away and drops
+  everything queued.
+- Backpressure: `backpressure` is emitted with True when `max_pending` turns are queued (and `submit`
+  refuses more) and with False once there is room again, so the UI can disable sending.
+"""
+import time
+from collections import deque
+from PyQt6.QtCore import QObject, pyqtSignal
+from gui.interpreter_thread import InterpreterThread
+
+class TurnScheduler(QObject):
+    output_received = pyqtSignal(dict)
+    turn_started = pyqtSignal()
+    turn_finished = pyqtSignal()
+    queue_changed = pyqtSignal(int)  # Emit the number of turns waiting
+    backpressure = pyqtSignal(bool)
+
+    def __init__(self, interpreter=None, max_pending=5, coalesce_seconds=1.5):
+        super().__init__()
+        self.interpreter = interpreter
+        self.max_pending = max_pending
+        self.coalesce_seconds = coalesce_seconds
+        self.pending = deque()
+        self.thread = None
+        self.saturated = False
+
+    @property
+    def busy(self):
+        return self.thread is not None
+
+    def submit(self, message, context=None, coalesce=True):
+        """
+        Queues a turn for `message`. `context` is a list of messages to add to the history right before it.
+        Returns False if the queue is full.
+        """
+        now = time.monotonic()
+        if coalesce and self.pending:
+            last = self.pending[-1]
+            if last["coalesce"] and not context and now - last["submitted"] <= self.coalesce_seconds:
+                last["message"] += "\n\n" + message
+                last["submitted"] = now
+                print(f"TurnScheduler: Coalesced into the queued turn: {message}")  # Debug print
+                return True
+
+        if len(self.pending) >= self.max_pending:
+            self.update_backpressure()
+            return False
+
+        self.pending.append({
+            "message": message,
+            "context": list(context or []),
+            "coalesce": coalesce,
+            "submitted": now,
+        })
+        self.queue_changed.emit(len(self.pending))
+        self.update_backpressure()
+        self.start_next()
+        return True
+
+    def cancel(self, wait=False, timeout_ms=10000):
+        """
+        Stops the running turn and drops the queued ones. With `wait`, blocks until the running turn has
+        let go of the interpreter (e.g. before replacing its messages), for at most `timeout_ms`.
+        Returns whether no turn is running anymore. When it's False, the interpreter is still in use.
+        """
+        dropped = len(self.pending)
+        self.pending.clear()
+        if dropped:
+            print(f"TurnScheduler: Dropped {dropped} queued turn(s)")  # Debug print
+            self.queue_changed.emit(0)
+            self.update_backpressure()
+        if self.thread is None:
+            return True
+        self.thread.stop()
+        if not wait:
+            return False
+        if not self.thread.wait(timeout_ms):
+            print("TurnScheduler: The running turn didn't stop in time")  # Debug print
+            return False
+        return True
+
+    def start_next(self):
+        if self.thread is not None or not self.pending or self.interpreter is None:
+            return
+
+        turn = self.pending.popleft()
+        self.queue_changed.emit(len(self.pending))
+        self.update_backpressure()
+
+        # Nothing else is touching the history now. Assigned rather than extended, so it also
+        # works when the interpreter is a RemoteInterpreter
+        if turn["context"]:
+            self.interpreter.messages = self.interpreter.messages + turn["context"]
+
+        # Accepted: forget any stop meant for an earlier turn. A cancel from now on stops this one, even
+        # before its thread reaches `chat`
+        self.interpreter.reset_stop()
+        self.thread = InterpreterThread(self.interpreter, turn["message"])
+        self.thread.output_received.connect(self.output_received)
+        self.thread.processing_started.connect(self.turn_started)
+        self.thread.finished.connect(self.on_thread_finished)
+        self.thread.start()
+        print(f"TurnScheduler: Started turn: {turn['message']}")  # Debug print
+
+    def on_thread_finished(self):
+        # QThread.finished, so the thread is really done with the interpreter before the next turn starts
+        thread, self.thread = self.thread, None
+        if thread is not None:
+            thread.deleteLater()
+        self.turn_finished.emit()
+        self.start_next()
+
+    def update_backpressure(self):
+        saturated = len(self.pending) >= self.max_pending
+        if saturated != self.saturated:
+            self.saturated = saturated
+            self.backpressure.emit(saturated)
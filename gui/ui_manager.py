@@ -1,4 +1,3 @@
-import subprocess
 from PyQt6.QtWidgets import QWidget, QVBoxLayout, QTextEdit, QLineEdit, QPushButton, QHBoxLayout, QScrollBar, QProgressBar, QLabel
 from PyQt6.QtGui import QTextCursor, QColor, QTextCharFormat, QImage, QPixmap
 from PyQt6.QtCore import Qt, QTimer
@@ -6,17 +5,11 @@ from PyQt6.QtCore import Qt, QTimer
 class UIManager(QWidget):
     def __init__(self):
         super().__init__()
-        self.activate_conda_base()
         self.setup_ui()
         self.chat_widget = None
         self.setup_progress_bar()
 
-    def activate_conda_base(self):
-        try:
-            subprocess.run(["conda", "activate", "base"], check=True, shell=True)
-        except subprocess.CalledProcessError as e:
-            print(f"Failed to activate conda base environment: {e}")
-        layout = QVBoxLayout()
+    def setup_ui(self):
         layout = QVBoxLayout()
         self.api_key_label = QLabel("API Key: Not Set")
         layout.addWidget(self.api_key_label)
@@ -33,8 +26,7 @@ class UIManager(QWidget):
         input_layout.addWidget(self.send_button)
 
         layout.addLayout(input_layout)
-        self.setCentralWidget(self.ui_manager)
-        self.ui_manager.layout().addWidget(self.chat_widget)
+        self.setLayout(layout)
 
     def setup_progress_bar(self):
         self.progress_bar = QProgressBar(self)
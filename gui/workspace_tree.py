@@ -0,0 +1,292 @@
+"""
+Defines a `WorkspaceTreeWidget` that shows the workspace directory as a live file tree.
+
+Uploads aren't the only files that matter: code the interpreter runs creates and deletes files too, and
+`FileOperationTracker` only sees the ones written through its patched `open`. The tree is backed by the
+filesystem instead:
+
+- `WorkspaceModel` lists a directory only when it's expanded (`canFetchMore` / `fetchMore`), and hands
+  the entries of a big directory to the view `batch_size` at a time as it's scrolled. So a workspace
+  with 100k+ files costs what's on screen, not what's on disk.
+- A `QFileSystemWatcher` (inotify on Linux) watches just the directories that have been listed.
+- Change events only mark a directory dirty. A timer rescans the dirty directories at most every
+  `debounce_ms`, on a background thread (listing 100k files takes a few hundred ms), and the fresh
+  listing is diffed against the rows shown, inserting or removing only the rows that changed. So an
+  event storm (e.g. unpacking an archive) costs one rescan per directory, and doesn't block the UI.
+"""
+import bisect
+import os
+import threading
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QTreeView
+from PyQt6.QtCore import Qt, QAbstractItemModel, QModelIndex, QFileSystemWatcher, QTimer, pyqtSignal
+
+class Node:
+    __slots__ = ("name", "path", "is_dir", "parent", "row", "children", "pending", "listed", "rows_valid")
+
+    def __init__(self, name, path, is_dir, parent=None, row=0):
+        self.name = name
+        self.path = path
+        self.is_dir = is_dir
+        self.parent = parent
+        self.row = row
+        self.children = []
+        self.pending = []  # Listed, but not handed to the view yet
+        self.listed = False
+        self.rows_valid = True  # Whether the children's `row` is up to date
+
+    def sort_key(self):
+        return (not self.is_dir, self.name.lower())
+
+def list_directory(path):
+    """
+    Returns [(name, is_dir), ...], directories first, then by name.
+    """
+    entries = []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                entries.append((entry.name, is_dir))
+    except OSError:
+        return []
+    entries.sort(key=lambda entry: (not entry[1], entry[0].lower()))
+    return entries
+
+def runs(rows):
+    """
+    [1, 2, 3, 7, 8] -> [(1, 3), (7, 8)]
+    """
+    result = []
+    for row in rows:
+        if result and result[-1][1] == row - 1:
+            result[-1] = (result[-1][0], row)
+        else:
+            result.append((row, row))
+    return result
+
+class WorkspaceModel(QAbstractItemModel):
+    batch_size = 1000
+    listed = pyqtSignal(str, object)  # Emit a directory's path and its fresh listing (None if it's gone)
+    scan_finished = pyqtSignal()
+
+    def __init__(self, debounce_ms=200):
+        super().__init__()
+        self.root = None
+        self.nodes = {}  # Path -> listed directory node
+        self.dirty = set()
+        self.scanning = False
+        self.listed.connect(self.apply_listing)
+        self.scan_finished.connect(self.on_scan_finished)
+
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.directoryChanged.connect(self.mark_dirty)
+
+        self.debounce = QTimer(self)
+        self.debounce.setSingleShot(True)
+        self.debounce.setInterval(debounce_ms)
+        self.debounce.timeout.connect(self.apply_changes)
+
+    def set_root(self, path):
+        self.beginResetModel()
+        if self.watcher.directories():
+            self.watcher.removePaths(self.watcher.directories())
+        self.nodes = {}
+        self.dirty = set()
+        path = os.path.abspath(path)
+        self.root = Node(os.path.basename(path) or path, path, True)
+        self.endResetModel()
+
+    # Qt model interface
+
+    def index(self, row, column, parent=QModelIndex()):
+        node = self.node(parent)
+        if node is None or column != 0 or not 0 <= row < len(node.children):
+            return QModelIndex()
+        return self.createIndex(row, column, node.children[row])
+
+    def parent(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        parent = index.internalPointer().parent
+        if parent is None or parent is self.root:
+            return QModelIndex()
+        return self.index_of(parent)
+
+    def rowCount(self, parent=QModelIndex()):
+        node = self.node(parent)
+        return 0 if node is None else len(node.children)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 1
+
+    def hasChildren(self, parent=QModelIndex()):
+        node = self.node(parent)
+        return node is not None and node.is_dir and (not node.listed or bool(node.children or node.pending))
+
+    def canFetchMore(self, parent):
+        node = self.node(parent)
+        return node is not None and node.is_dir and (not node.listed or bool(node.pending))
+
+    def fetchMore(self, parent):
+        node = self.node(parent)
+        if node is None or not node.is_dir:
+            return
+        if not node.listed:
+            node.listed = True
+            node.pending = [Node(name, os.path.join(node.path, name), is_dir, node) for name, is_dir in list_directory(node.path)]
+            self.nodes[node.path] = node
+            self.watcher.addPath(node.path)
+
+        batch = node.pending[:self.batch_size]
+        if not batch:
+            return
+        first = len(node.children)
+        self.beginInsertRows(parent, first, first + len(batch) - 1)
+        for offset, child in enumerate(batch):
+            child.row = first + offset
+        node.children.extend(batch)
+        del node.pending[:len(batch)]
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        node = index.internalPointer()
+        if role == Qt.ItemDataRole.DisplayRole:
+            return node.name + ("/" if node.is_dir else "")
+        if role == Qt.ItemDataRole.ToolTipRole or role == Qt.ItemDataRole.UserRole:
+            return node.path
+        return None
+
+    def node(self, index):
+        if not index.isValid():
+            return self.root
+        return index.internalPointer()
+
+    def index_of(self, node):
+        if node is self.root:
+            return QModelIndex()
+        parent = node.parent
+        if not parent.rows_valid:
+            # Renumbered once after a batch of changes, not on every insert or remove
+            for row, child in enumerate(parent.children):
+                child.row = row
+            parent.rows_valid = True
+        return self.createIndex(node.row, 0, node)
+
+    # Live updates
+
+    def mark_dirty(self, path):
+        self.dirty.add(os.path.abspath(path))
+        # Not restarted by later events, so changes show up at most `debounce_ms` late even during a storm
+        if not self.debounce.isActive():
+            self.debounce.start()
+
+    def apply_changes(self):
+        if self.scanning:
+            return  # Picked up when the scan in progress is done
+        paths = [path for path in self.dirty if path in self.nodes]
+        self.dirty = set()
+        if not paths:
+            return
+        self.scanning = True
+        threading.Thread(target=self.scan, args=(paths,), daemon=True).start()
+
+    def scan(self, paths):
+        # Background thread, the results are queued to the GUI thread
+        for path in paths:
+            self.listed.emit(path, list_directory(path) if os.path.isdir(path) else None)
+        self.scan_finished.emit()
+
+    def on_scan_finished(self):
+        self.scanning = False
+        if self.dirty and not self.debounce.isActive():
+            self.debounce.start()
+
+    def apply_listing(self, path, entries):
+        node = self.nodes.get(path)
+        if node is None or entries is None:
+            return  # No longer shown, or removed (its parent's refresh drops it)
+        names = {name for name, _ in entries}
+        parent_index = self.index_of(node)
+
+        # Removed rows, in contiguous runs from the bottom so earlier row numbers stay valid
+        node.pending = [child for child in node.pending if child.name in names]
+        removed = [row for row, child in enumerate(node.children) if child.name not in names]
+        for first, last in reversed(runs(removed)):
+            self.beginRemoveRows(parent_index, first, last)
+            gone = node.children[first:last + 1]
+            del node.children[first:last + 1]
+            node.rows_valid = False
+            self.endRemoveRows()
+            for child in gone:
+                self.forget(child)
+
+        # New entries
+        known = {child.name for child in node.children}
+        known.update(child.name for child in node.pending)
+        added = [Node(name, os.path.join(node.path, name), is_dir, node) for name, is_dir in entries if name not in known]
+        if not added:
+            return
+        if node.pending:
+            node.pending.extend(added)  # Still being fetched, they'll come with the rest
+            return
+
+        # Group the new entries by where they go, and insert each group from the bottom up
+        keys = [child.sort_key() for child in node.children]
+        groups = {}
+        for child in added:
+            groups.setdefault(bisect.bisect_left(keys, child.sort_key()), []).append(child)
+        for row in sorted(groups, reverse=True):
+            group = groups[row]
+            self.beginInsertRows(parent_index, row, row + len(group) - 1)
+            node.children[row:row] = group
+            node.rows_valid = False
+            self.endInsertRows()
+
+    def forget(self, node):
+        """
+        Stops watching a removed directory and everything listed under it.
+        """
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            if current.path in self.nodes:
+                del self.nodes[current.path]
+                self.watcher.removePath(current.path)
+            stack.extend(child for child in current.children if child.is_dir)
+
+class WorkspaceTreeWidget(QWidget):
+    file_selected = pyqtSignal(str)  # Emit file path when a file is clicked
+
+    def __init__(self):
+        super().__init__()
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        self.model = WorkspaceModel()
+        self.tree_view = QTreeView()
+        self.tree_view.setModel(self.model)
+        self.tree_view.setHeaderHidden(True)
+        self.tree_view.setUniformRowHeights(True)
+        self.tree_view.clicked.connect(self.on_clicked)
+        layout.addWidget(self.tree_view)
+
+        self.setLayout(layout)
+
+    def set_root(self, path):
+        self.model.set_root(path)
+
+    def note_file_operation(self, operation, filename, content):
+        """
+        Files written through `FileOperationTracker` are known right away, without waiting for the watcher.
+        """
+        self.model.mark_dirty(os.path.dirname(os.path.abspath(filename)))
+
+    def on_clicked(self, index):
+        node = self.model.node(index)
+        if node is not None and not node.is_dir:
+            self.file_selected.emit(node.path)
@@ -1,15 +1,66 @@
+import time
+STARTED_AT = time.perf_counter()
+
 import sys
+import threading
+from PyQt6.QtCore import QCoreApplication, QTimer, Qt
 from PyQt6.QtWidgets import QApplication
 from gui.main_window import MainWindow
-from core.core import OpenInterpreter
+from gui.backend_loader import BackendLoader
 from gui.config_manager import ConfigManager
+from gui.startup_profile import StartupProfile
+from gui.frame_monitor import FrameMonitor
 
 def main():
+    profile_startup = "--profile-startup" in sys.argv
+    backend_process = "--backend-process" in sys.argv  # Run the interpreter in a child process
+    # Lets QtWebEngine (gui/html_renderer.py) be imported after the QApplication, off the startup path
+    QCoreApplication.setAttribute(Qt.ApplicationAttribute.AA_ShareOpenGLContexts)
     app = QApplication(sys.argv)
     config_manager = ConfigManager()
-    interpreter = OpenInterpreter()
-    main_window = MainWindow(interpreter, config_manager)
+
+    # Show the window first; the interpreter is constructed on a background thread
+    main_window = MainWindow(None, config_manager)
+    profile = StartupProfile(STARTED_AT)
+    if profile_startup:
+        profile.watch(main_window)
+        profile.finished.connect(lambda: app.exit(1 if profile.report() else 0))
     main_window.show()
+
+    if "--profile-frames" in sys.argv:
+        frame_monitor = FrameMonitor()
+        frame_monitor.start()
+        main_window.chat_widget.turn_finished.connect(lambda: print(frame_monitor.report()))
+
+    def on_loaded(interpreter):
+        config_manager.subscribe(interpreter.llm.apply_config)
+        interpreter.environments.discover_in_background()
+        if backend_process:
+            app.aboutToQuit.connect(interpreter.close)
+        else:
+            from core.computer.terminal.languages import html
+            from gui.html_renderer import HtmlRenderer
+            html.renderer = HtmlRenderer()
+            # Deletes blobs of deleted conversations (the backend process does this itself)
+            threading.Thread(target=interpreter.collect_blobs, daemon=True).start()
+        main_window.set_interpreter(interpreter)
+        profile.mark("first_usable_send")
+
+    def on_failed(error):
+        main_window.chat_widget.append_message("System", f"Failed to start the interpreter: {error}")
+        if profile_startup:
+            profile.report()
+            app.exit(1)
+
+    if backend_process:
+        from gui.remote_interpreter import RemoteInterpreter
+        loader = BackendLoader(RemoteInterpreter)
+    else:
+        loader = BackendLoader()
+    loader.loaded.connect(on_loaded)
+    loader.failed.connect(on_failed)
+    QTimer.singleShot(0, loader.start)
+
     sys.exit(app.exec())
 
 if __name__ == "__main__":